@@ -1,19 +1,30 @@
 # app.py
 from __future__ import annotations
 
-from flask import Flask, redirect, url_for, send_from_directory, current_app
+import mimetypes
+from flask import Flask, abort, redirect, url_for, current_app
 from pathlib import Path
+from werkzeug.security import safe_join
 from config import get_config
 from extensions import db, migrate, login_manager, csrf
 from flask_wtf.csrf import generate_csrf, CSRFError
+from utils.cli import LazyCommand, LazyGroup
 
+# Blueprints e serviços são importados dentro de create_app(): importar este
+# módulo não cria a aplicação nem carrega rotas, modelos, LDAP ou SMTP.
 
-# Blueprints
-from blueprints.auth import auth_bp
-from blueprints.tickets import tickets_bp
-from blueprints.admin import admin_bp
-from blueprints.kanban import kanban_bp  # <<<
-from blueprints.audit import audit_bp
+# CLI: o módulo de cada comando só é importado quando o comando é usado
+_CLI_COMMANDS = (
+    ("worker", "services.jobs:worker_command", "Executa os jobs de pós-processamento de anexos."),
+)
+_CLI_GROUPS = (
+    ("uploads", "services.storage:uploads_cli", "Manutenção dos arquivos de anexos."),
+    ("search", "services.search:search_cli", "Índice de busca dos chamados."),
+    ("sla", "services.sla:sla_cli", "Prazos de atendimento (SLA)."),
+    ("tickets", "services.assignment:tickets_cli", "Operações em lote sobre chamados."),
+    ("passwords", "services.passwords:passwords_cli", "Hash de senhas."),
+    ("digest", "services.digest:digest_cli", "Resumos de notificações por e-mail."),
+)
 
 
 # (opcional) tentar importar mail
@@ -26,7 +37,16 @@ def _ensure_dirs(app: Flask) -> None:
     base = Path(app.config.get("UPLOADS_DIR", "uploads"))
     (base / "tickets").mkdir(parents=True, exist_ok=True)
 
-def create_app() -> Flask:
+def create_app(web: bool = True) -> Flask:
+    """
+    Fábrica da aplicação.
+
+    web=False monta só config, extensões e CLI (sem blueprints/rotas/login):
+    boot mais rápido para worker, cron e migrações, ex.
+        flask --app "app:create_app(web=False)" db upgrade
+        flask --app "app:create_app(web=False)" worker
+    (para `db migrate` use a aplicação completa: os modelos vêm com as rotas)
+    """
     app = Flask(__name__)
     app.config.from_object(get_config())
 
@@ -44,12 +64,31 @@ def create_app() -> Flask:
     with app.app_context():
         _ensure_dirs(app)
 
-    # login
-    from models import User
+    # CLI: fila de pós-processamento de anexos / manutenção de uploads / índice de busca / SLA
+    for name, target, help_text in _CLI_COMMANDS:
+        app.cli.add_command(LazyCommand(name, target, help=help_text))
+    for name, target, help_text in _CLI_GROUPS:
+        app.cli.add_command(LazyGroup(name, target, help=help_text))
+
+    if web:
+        _init_web(app)
+    return app
+
+
+def _init_web(app: Flask) -> None:
+    """Login, blueprints e rotas básicas (só para quem atende HTTP)."""
+    from blueprints.auth import auth_bp
+    from blueprints.tickets import tickets_bp
+    from blueprints.admin import admin_bp
+    from blueprints.kanban import kanban_bp  # <<<
+    from blueprints.audit import audit_bp
+
+    # login: identidade leve em cache (services/identity.py), sem consultar User a cada requisição
+    from services.identity import load_identity
     @login_manager.user_loader
     def load_user(user_id: str):
         try:
-            return User.query.get(int(user_id))
+            return load_identity(int(user_id))
         except Exception:
             return None
 
@@ -68,9 +107,10 @@ def create_app() -> Flask:
     app.register_blueprint(kanban_bp)   # <<<
     app.register_blueprint(audit_bp)
 
-
     # rotas básicas
     from flask_login import current_user
+    from services.storage import resolve_upload
+    from services.delivery import send_upload
 
     @app.route("/", endpoint="index")
     def index():
@@ -80,9 +120,25 @@ def create_app() -> Flask:
 
     @app.route("/uploads/<path:filename>", endpoint="uploads")
     def uploads(filename: str):
+        mimetype = mimetypes.guess_type(filename)[0]
+        blob = resolve_upload(filename)
+        if blob is not None:
+            if not blob.exists():
+                abort(404)
+            return send_upload(blob, mimetype=mimetype, etag=blob.name, immutable=True)
         base = Path(current_app.config.get("UPLOADS_DIR", "uploads"))
-        return send_from_directory(base, filename, as_attachment=False)
-
-    return app
-
-app = create_app()
+        path = safe_join(str(base), filename)
+        if path is None or not Path(path).is_file():
+            abort(404)
+        return send_upload(Path(path), mimetype=mimetype)
+
+
+def __getattr__(name: str):
+    """
+    Compatibilidade com `flask --app app:app` e `from app import app`: a
+    aplicação completa é criada no primeiro acesso a `app`, não no import.
+    """
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
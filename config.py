@@ -10,6 +10,15 @@ def _as_bool(val: str | None, default=False):
         return default
     return str(val).strip().lower() in {'1', 'true', 'yes', 'on'}
 
+def _role_map(val: str | None):
+    """'urgent=gestor|admin;high=agent|gestor' -> {'urgent': ['gestor', 'admin'], ...}"""
+    out = {}
+    for part in (val or '').split(';'):
+        key, _, roles = part.partition('=')
+        if key.strip() and roles.strip():
+            out[key.strip().lower()] = [r.strip().lower() for r in roles.split('|') if r.strip()]
+    return out
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret')
 
@@ -30,6 +39,43 @@ class Config:
     MAX_CONTENT_MB = int(os.getenv('MAX_CONTENT_MB', '20'))
     MAX_CONTENT_LENGTH = MAX_CONTENT_MB * 1024 * 1024  # limite (bytes) do Flask
 
+    # Entrega de uploads: '' (Flask), 'accel' (nginx X-Accel-Redirect) ou 'sendfile' (X-Sendfile)
+    UPLOADS_OFFLOAD = os.getenv('UPLOADS_OFFLOAD', '').strip().lower()
+    UPLOADS_ACCEL_PREFIX = os.getenv('UPLOADS_ACCEL_PREFIX', '/_uploads/')
+    UPLOADS_CACHE_MAX_AGE = int(os.getenv('UPLOADS_CACHE_MAX_AGE', '31536000'))  # blobs (imutáveis)
+
+    # Upload em partes (retomável): cada PUT respeita MAX_CONTENT_LENGTH,
+    # o arquivo inteiro pode ir até CHUNKED_UPLOAD_MAX_MB
+    UPLOAD_CHUNK_MB = int(os.getenv('UPLOAD_CHUNK_MB', '5'))
+    CHUNKED_UPLOAD_MAX_MB = int(os.getenv('CHUNKED_UPLOAD_MAX_MB', '200'))
+    UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))  # `flask uploads gc`
+
+    # remoção de arquivos após exclusões: thread em segundo plano (True = na própria requisição)
+    UPLOADS_CLEANUP_INLINE = _as_bool(os.getenv('UPLOADS_CLEANUP_INLINE'), False)
+
+    # Pós-processamento de anexos (services/jobs.py, `flask worker`)
+    JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+    JOBS_STALE_MINUTES = int(os.getenv('JOBS_STALE_MINUTES', '10'))
+    ATTACHMENT_TEXT_MAX_CHARS = int(os.getenv('ATTACHMENT_TEXT_MAX_CHARS', '200000'))
+
+    # Miniaturas (services/thumbs.py): variantes em px, geradas pelo worker ou sob demanda
+    THUMBNAIL_SIZES = [int(s) for s in os.getenv('THUMBNAIL_SIZES', '128,320,1024').split(',') if s.strip()]
+    THUMBNAIL_EAGER_SIZES = [int(s) for s in os.getenv('THUMBNAIL_EAGER_SIZES', '128').split(',') if s.strip()]
+    THUMBNAIL_CACHE_MB = int(os.getenv('THUMBNAIL_CACHE_MB', '512'))          # cota em disco (LRU)
+    THUMBNAIL_EVICT_INTERVAL = int(os.getenv('THUMBNAIL_EVICT_INTERVAL', '300'))  # s entre varreduras
+
+    # Busca de chamados (services/search.py, `flask search reindex`)
+    SEARCH_PER_PAGE = int(os.getenv('SEARCH_PER_PAGE', '20'))
+    SEARCH_MAX_TERMS = int(os.getenv('SEARCH_MAX_TERMS', '8'))
+    SEARCH_AVG_DOC_LEN = int(os.getenv('SEARCH_AVG_DOC_LEN', '120'))  # termos (ponderados) por chamado
+    SEARCH_DOC_COUNT_TTL = int(os.getenv('SEARCH_DOC_COUNT_TTL', '300'))  # s: cache do total de chamados (idf)
+
+    # Chamados parecidos na abertura (services/similar.py)
+    SIMILAR_INDEX_TTL = int(os.getenv('SIMILAR_INDEX_TTL', '300'))       # s até reconstruir o índice
+    SIMILAR_MIN_SCORE = float(os.getenv('SIMILAR_MIN_SCORE', '0.2'))
+    SIMILAR_MAX_RESULTS = int(os.getenv('SIMILAR_MAX_RESULTS', '5'))
+    SIMILAR_SHOW_ALL_USERS = _as_bool(os.getenv('SIMILAR_SHOW_ALL_USERS'), False)
+
     # SLA targets (em horas)
     SLA_TARGETS_HOURS = {
         'low':    int(os.getenv('SLA_LOW_HOURS', '72')),
@@ -37,6 +83,63 @@ class Config:
         'high':   int(os.getenv('SLA_HIGH_HOURS', '24')),
         'urgent': int(os.getenv('SLA_URGENT_HOURS', '4')),
     }
+    # 1ª resposta da equipe (em horas)
+    SLA_RESPONSE_HOURS = {
+        'low':    int(os.getenv('SLA_RESPONSE_LOW_HOURS', '8')),
+        'medium': int(os.getenv('SLA_RESPONSE_MEDIUM_HOURS', '4')),
+        'high':   int(os.getenv('SLA_RESPONSE_HIGH_HOURS', '2')),
+        'urgent': int(os.getenv('SLA_RESPONSE_URGENT_HOURS', '1')),
+    }
+    # alertas de estouro (`flask sla scan`) além do atendente
+    SLA_ALERT_EMAILS = [e.strip() for e in os.getenv('SLA_ALERT_EMAILS', '').split(',') if e.strip()]
+
+    # Expediente para o SLA (services/business_hours.py); False = horas corridas
+    SLA_BUSINESS_HOURS = _as_bool(os.getenv('SLA_BUSINESS_HOURS'), True)
+    BUSINESS_TZ = os.getenv('BUSINESS_TZ', 'America/Sao_Paulo')
+    BUSINESS_HOURS = os.getenv('BUSINESS_HOURS', '08:00-12:00,13:00-18:00')
+    BUSINESS_DAYS = [int(d) for d in os.getenv('BUSINESS_DAYS', '0,1,2,3,4').split(',') if d.strip()]  # 0 = segunda
+    BUSINESS_HOLIDAYS = [d.strip() for d in os.getenv('BUSINESS_HOLIDAYS', '').split(',') if d.strip()]  # AAAA-MM-DD
+    BUSINESS_CALENDAR_TTL = int(os.getenv('BUSINESS_CALENDAR_TTL', '3600'))
+
+    # Métricas por atendente (services/metrics.py)
+    METRICS_CACHE_SECONDS = int(os.getenv('METRICS_CACHE_SECONDS', '300'))
+    METRICS_WINDOW_DAYS = int(os.getenv('METRICS_WINDOW_DAYS', '90'))
+
+    # Diretório de atendentes em cache (services/directory.py)
+    AGENT_DIRECTORY_TTL = int(os.getenv('AGENT_DIRECTORY_TTL', '300'))
+
+    # Identidade do usuário logado em cache (services/identity.py), em segundos
+    LOGIN_CACHE_TTL = int(os.getenv('LOGIN_CACHE_TTL', '60'))
+
+    # Atribuição automática (services/assignment.py): least_load | round_robin
+    AUTOASSIGN_ON_CREATE = _as_bool(os.getenv('AUTOASSIGN_ON_CREATE'), False)
+    AUTOASSIGN_STRATEGY = os.getenv('AUTOASSIGN_STRATEGY', 'least_load')
+    AUTOASSIGN_PRIORITY_ROLES = _role_map(os.getenv('AUTOASSIGN_PRIORITY_ROLES'))  # ex.: urgent=gestor|admin
+    AUTOASSIGN_EXCLUDE_IDS = [int(x) for x in os.getenv('AUTOASSIGN_EXCLUDE_IDS', '').split(',') if x.strip()]
+    AUTOASSIGN_LOAD_TTL = int(os.getenv('AUTOASSIGN_LOAD_TTL', '300'))  # s até recontar a carga no banco
+
+    # Kanban / fluxo: recusar ligações que criem ciclos
+    FLOW_REJECT_CYCLES = _as_bool(os.getenv('FLOW_REJECT_CYCLES', 'false'))
+
+    # Hash de senhas (services/passwords.py); `flask passwords bench` compara os custos
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+    PASSWORD_VERIFY_WORKERS = int(os.getenv('PASSWORD_VERIFY_WORKERS', '2'))   # KDFs simultâneos
+    PASSWORD_VERIFY_QUEUE = int(os.getenv('PASSWORD_VERIFY_QUEUE', '8'))       # espera por worker
+    PASSWORD_VERIFY_TIMEOUT = float(os.getenv('PASSWORD_VERIFY_TIMEOUT', '10'))
+
+    # Limite de requisições (services/ratelimit.py): 'memory' ou 'sqlite:///caminho.db' (vários workers)
+    RATELIMIT_ENABLED = _as_bool(os.getenv('RATELIMIT_ENABLED'), True)
+    RATELIMIT_STORAGE = os.getenv('RATELIMIT_STORAGE', 'memory')
+    RATELIMIT_TRUST_PROXY = _as_bool(os.getenv('RATELIMIT_TRUST_PROXY'), False)  # IP do X-Forwarded-For
+    RATELIMIT_LIMITS = {                          # 'tentativas/segundos'
+        'login_ip':        os.getenv('RATELIMIT_LOGIN_IP', '30/300'),
+        'login_account':   os.getenv('RATELIMIT_LOGIN_ACCOUNT', '5/300'),   # falhas por conta
+        'kanban_write':    os.getenv('RATELIMIT_KANBAN_WRITE', '300/60'),
+        'tickets_similar': os.getenv('RATELIMIT_TICKETS_SIMILAR', '120/60'),
+        'tickets_search':  os.getenv('RATELIMIT_TICKETS_SEARCH', '60/60'),
+        'tickets_upload':  os.getenv('RATELIMIT_TICKETS_UPLOAD', '30/60'),
+    }
 
     # LDAP
     LDAP_ENABLED = _as_bool(os.getenv('LDAP_ENABLED', 'false'))
@@ -49,6 +152,11 @@ class Config:
     LDAP_USER_ATTR = os.getenv('LDAP_USER_ATTR', 'uid')
     LDAP_MAIL_ATTR = os.getenv('LDAP_MAIL_ATTR', 'mail')
     LDAP_DOMAIN_SUFFIX = os.getenv('LDAP_DOMAIN_SUFFIX', '')
+    LDAP_DEFAULT_ROLE = os.getenv('LDAP_DEFAULT_ROLE', 'user')       # perfil dos usuários criados no 1º login
+    LDAP_POOL_SIZE = int(os.getenv('LDAP_POOL_SIZE', '4'))           # conexões de serviço reaproveitadas
+    LDAP_DN_CACHE_TTL = int(os.getenv('LDAP_DN_CACHE_TTL', '600'))   # s
+    LDAP_NEGATIVE_TTL = int(os.getenv('LDAP_NEGATIVE_TTL', '30'))    # s de recusa após falhas
+    LDAP_MAX_FAILURES = int(os.getenv('LDAP_MAX_FAILURES', '5'))
 
     # --- E-mail (usado pelo mailer.py) ---
     # Se usar Office 365: SERVER=smtp.office365.com, PORT=587, TLS=1, SSL=0
@@ -65,6 +173,13 @@ class Config:
     )
     # usado para montar links absolutos nos e-mails (visualizar chamado, etc.)
     MAIL_BASE_URL = os.getenv('MAIL_BASE_URL', '')          # ex.: http://192.168.0.26:5920
+    MAIL_MAX_RECIPIENTS = int(os.getenv('MAIL_MAX_RECIPIENTS', '50'))  # por transação SMTP
+    MAIL_RENDER_CACHE = int(os.getenv('MAIL_RENDER_CACHE', '256'))      # notificações prontas em memória
+
+    # Resumo de notificações (services/digest.py): eventos agrupados para quem escolheu hora/dia
+    DIGEST_ENABLED = _as_bool(os.getenv('DIGEST_ENABLED'), True)
+    DIGEST_EVENTS = [e.strip() for e in os.getenv('DIGEST_EVENTS', 'reply,status').split(',') if e.strip()]
+    DIGEST_RETENTION_DAYS = int(os.getenv('DIGEST_RETENTION_DAYS', '7'))
 
 
 class DevConfig(Config):
@@ -1,11 +1,12 @@
 from flask import render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
 
 from . import admin_bp
 from .forms import UserForm
 from extensions import db
 from models import User
+from services import directory, identity
+from services.passwords import hash_password
 
 def admin_required(fn):
     from functools import wraps
@@ -35,9 +36,10 @@ def users_new():
         else:
             u = User(name=form.name.data.strip(), email=form.email.data.lower(),
                      role=form.role.data, is_active=form.is_active.data,
-                     password_hash=generate_password_hash(form.password.data or 'changeme'))
+                     password_hash=hash_password(form.password.data or 'changeme'))
             db.session.add(u)
             db.session.commit()
+            directory.invalidate()
             flash('Usuário criado.', 'success')
             return redirect(url_for('admin.users_list'))
     return render_template('admin/user_form.html', form=form, mode='new')
@@ -54,8 +56,10 @@ def users_edit(user_id: int):
         u.role = form.role.data
         u.is_active = form.is_active.data
         if form.password.data:
-            u.password_hash = generate_password_hash(form.password.data)
+            u.password_hash = hash_password(form.password.data)
         db.session.commit()
+        directory.invalidate()
+        identity.invalidate(u.id)
         flash('Usuário atualizado.', 'success')
         return redirect(url_for('admin.users_list'))
     return render_template('admin/user_form.html', form=form, mode='edit', user=u)
@@ -70,5 +74,7 @@ def users_delete(user_id: int):
     u = User.query.get_or_404(user_id)
     db.session.delete(u)
     db.session.commit()
+    directory.invalidate()
+    identity.invalidate(user_id)
     flash('Usuário excluído.', 'success')
     return redirect(url_for('admin.users_list'))
@@ -1,13 +1,38 @@
+import secrets
+
 from flask import render_template, redirect, url_for, flash, request, current_app, session
-from flask_login import login_user, logout_user, current_user
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask_login import login_required, login_user, logout_user, current_user
 
 from . import auth_bp
 from .forms import LoginForm
 from models import User
 from extensions import db
+from services.ldap_auth import ldap_authenticate, normalize_suffix
+from services import ratelimit
+from services.digest import MODE_LABELS, MODES, get_mode, set_mode
+from services.passwords import VerifyBusy, hash_password, needs_rehash, verify_password
+
+
+def _ldap_authenticate(login: str, password: str):
+    """
+    Confere no LDAP e devolve o User local, criando-o no primeiro acesso
+    (perfil LDAP_DEFAULT_ROLE, senha local aleatória). None se recusado.
+    """
+    found = ldap_authenticate(login, password)
+    if found is None:
+        return None
+    suffix = normalize_suffix(current_app.config.get('LDAP_DOMAIN_SUFFIX'))
+    email = (found.email or (login if '@' in login else f"{login}{suffix}")).lower()
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        user = User(name=found.name or login, email=email,
+                    role=current_app.config.get('LDAP_DEFAULT_ROLE', 'user'), is_active=True,
+                    password_hash=hash_password(secrets.token_urlsafe(32)))
+        db.session.add(user)
+        db.session.commit()
+        current_app.logger.info("LDAP_PROVISION %s", email)
+    return user
 
-# ... [código _ldap_authenticate omitido para brevidade] ...
 
 @auth_bp.route('/')
 def auth_root():
@@ -20,14 +45,35 @@ def login():
         email = (request.form.get('email') or request.form.get('usuario') or '').strip().lower()
         password = request.form.get('password') or request.form.get('senha') or ''
 
+        # limites antes de qualquer consulta/hash: por IP (toda tentativa) e por conta (falhas)
+        ok_ip, retry_ip = ratelimit.hit('login_ip', ratelimit.client_ip())
+        ok_acc, retry_acc = ratelimit.check('login_account', email)
+        if not (ok_ip and ok_acc):
+            flash(f'Muitas tentativas. Aguarde {max(retry_ip, retry_acc)} s e tente novamente.', 'warning')
+            return render_template('auth/login.html'), 429
+
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        try:
+            local_ok = bool(user) and verify_password(user.password_hash, password)
+        except VerifyBusy:
+            flash('Muitos acessos no momento. Tente novamente em instantes.', 'warning')
+            return render_template('auth/login.html'), 503
+        if local_ok and needs_rehash(user.password_hash):
+            # parâmetros de hash mudaram: regrava com os atuais
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        if not local_ok:
+            # senha local não confere: tenta o diretório (se LDAP_ENABLED)
+            user = _ldap_authenticate(email, password)
+        if not user:
+            ratelimit.hit('login_account', email)
             flash('Credenciais inválidas.', 'danger')
             return render_template('auth/login.html'), 401
         if user and not user.is_active:
             flash('Conta inativa.', 'danger')
             return render_template('auth/login.html'), 401
 
+        ratelimit.reset('login_account', email)
         login_user(user)
         return redirect(url_for('tickets.dashboard'))
 
@@ -40,3 +86,19 @@ def logout():
         logout_user()
         flash('Sessão encerrada.', 'info')
     return redirect(url_for('auth.login'))
+
+@auth_bp.route('/notificacoes', methods=['GET', 'POST'], endpoint='notification_prefs')
+@login_required
+def notification_prefs():
+    """Entrega das notificações: imediata, resumo de hora em hora ou diário."""
+    if request.method == 'POST':
+        mode = (request.form.get('mode') or '').strip().lower()
+        if mode not in MODES:
+            flash('Opção inválida.', 'warning')
+        else:
+            set_mode(current_user.id, mode)
+            db.session.commit()
+            flash('Preferência de notificações salva.', 'success')
+        return redirect(url_for('auth.notification_prefs'))
+    return render_template('auth/notifications.html', mode=get_mode(current_user.id),
+                           modes=[(m, MODE_LABELS[m]) for m in MODES])
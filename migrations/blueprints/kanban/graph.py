@@ -0,0 +1,229 @@
+# blueprints/kanban/graph.py
+"""
+Análise do grafo de fluxo de uma subtarefa (SubtaskFlowNode/SubtaskFlowEdge).
+
+- carrega nós + arestas em UMA consulta (LEFT JOIN nós -> arestas de saída)
+- detecção de ciclo, ordem topológica (Kahn), alcançabilidade (BFS)
+- caminho crítico = caminho mais longo no DAG (peso 1 por nó)
+- resultados memoizados pela versão do fluxo (subtask_flow_versions), incrementada
+  na mesma transação de toda criação/remoção de nó ou aresta (bump_version)
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import SubtaskFlowNode, SubtaskFlowEdge
+
+_MEMO_MAX = 256
+_memo: "OrderedDict[Tuple[int, tuple], Tuple[FlowGraph, Dict]]" = OrderedDict()
+_memo_lock = Lock()
+
+
+class FlowVersion(db.Model):
+    """Contador por subtarefa: muda a cada alteração estrutural do fluxo."""
+    __tablename__ = "subtask_flow_versions"
+
+    subtask_id = db.Column(db.Integer, db.ForeignKey("subtasks.id", ondelete="CASCADE"), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FlowGraph:
+    """Lista de adjacência (sucessores e predecessores) de um fluxo."""
+
+    __slots__ = ("nodes", "succ", "pred")
+
+    def __init__(self, nodes: List[int], edges: List[Tuple[int, int]]):
+        self.nodes: List[int] = sorted(set(nodes))
+        self.succ: Dict[int, List[int]] = {n: [] for n in self.nodes}
+        self.pred: Dict[int, List[int]] = {n: [] for n in self.nodes}
+        for f, t in edges:
+            if f in self.succ and t in self.pred:
+                self.succ[f].append(t)
+                self.pred[t].append(f)
+
+    # ---------- ordem / ciclos ----------
+    def topo_order(self) -> Optional[List[int]]:
+        """Ordem topológica (Kahn, estável por id). None se houver ciclo."""
+        indeg = {n: len(p) for n, p in self.pred.items()}
+        queue = deque(n for n in self.nodes if indeg[n] == 0)
+        out: List[int] = []
+        while queue:
+            n = queue.popleft()
+            out.append(n)
+            for m in self.succ[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    queue.append(m)
+        return out if len(out) == len(self.nodes) else None
+
+    def find_cycle(self) -> Optional[List[int]]:
+        """Retorna um ciclo [a, b, ..., a] ou None (DFS iterativa, 3 cores)."""
+        WHITE, GRAY, BLACK = 0, 1, 2
+        color = dict.fromkeys(self.nodes, WHITE)
+        parent: Dict[int, int] = {}
+        for root in self.nodes:
+            if color[root] != WHITE:
+                continue
+            color[root] = GRAY
+            stack = [(root, iter(self.succ[root]))]
+            while stack:
+                node, it = stack[-1]
+                nxt = next(it, None)
+                if nxt is None:
+                    color[node] = BLACK
+                    stack.pop()
+                    continue
+                if color[nxt] == WHITE:
+                    color[nxt] = GRAY
+                    parent[nxt] = node
+                    stack.append((nxt, iter(self.succ[nxt])))
+                elif color[nxt] == GRAY:
+                    cycle = [nxt]
+                    cur = node
+                    while cur != nxt:
+                        cycle.append(cur)
+                        cur = parent[cur]
+                    cycle.append(nxt)
+                    cycle.reverse()
+                    return cycle
+        return None
+
+    # ---------- alcançabilidade ----------
+    def reachable(self, start: int, *, reverse: bool = False) -> Set[int]:
+        """
+        Nós alcançáveis a partir de `start` (sem incluir o próprio, salvo ciclo).
+        reverse=True segue as arestas ao contrário (quem chega em `start`).
+        """
+        adj = self.pred if reverse else self.succ
+        seen: Set[int] = set()
+        queue = deque(adj.get(start, ()))
+        while queue:
+            n = queue.popleft()
+            if n in seen:
+                continue
+            seen.add(n)
+            queue.extend(adj[n])
+        return seen
+
+    def would_create_cycle(self, from_id: int, to_id: int) -> bool:
+        """True se a aresta from_id -> to_id fecharia um ciclo."""
+        if from_id == to_id:
+            return True
+        return from_id in self.reachable(to_id)
+
+    # ---------- caminho crítico ----------
+    def critical_path(self) -> Tuple[int, List[int]]:
+        """
+        Caminho mais longo (em nós) no DAG. Retorna (tamanho, [ids]).
+        Em grafo com ciclo retorna (0, []).
+        """
+        order = self.topo_order()
+        if not order:
+            return 0, []
+        dist = dict.fromkeys(order, 1)
+        prev: Dict[int, int] = {}
+        for n in order:
+            for m in self.succ[n]:
+                if dist[n] + 1 > dist[m]:
+                    dist[m] = dist[n] + 1
+                    prev[m] = n
+        end = max(order, key=lambda n: (dist[n], -n))
+        path = [end]
+        while path[-1] in prev:
+            path.append(prev[path[-1]])
+        path.reverse()
+        return dist[end], path
+
+
+def load_flow(subtask_id: int) -> FlowGraph:
+    """Carrega o fluxo inteiro com uma única consulta."""
+    rows = db.session.execute(
+        select(SubtaskFlowNode.id, SubtaskFlowEdge.to_id)
+        .select_from(SubtaskFlowNode)
+        .outerjoin(
+            SubtaskFlowEdge,
+            and_(SubtaskFlowEdge.from_id == SubtaskFlowNode.id,
+                 SubtaskFlowEdge.subtask_id == subtask_id),
+        )
+        .where(SubtaskFlowNode.subtask_id == subtask_id)
+    ).all()
+    nodes = [nid for nid, _ in rows]
+    edges = [(nid, to) for nid, to in rows if to is not None]
+    return FlowGraph(nodes, edges)
+
+
+def flow_version(subtask_id: int) -> int:
+    """Versão atual do fluxo (0 se nunca alterado). Uma leitura pela chave primária."""
+    v = db.session.execute(
+        select(FlowVersion.version).where(FlowVersion.subtask_id == subtask_id)
+    ).scalar()
+    return int(v or 0)
+
+
+def bump_version(subtask_id: int) -> None:
+    """
+    Incrementa a versão (pendente de commit). Chamar em toda escrita que cria ou
+    remove nós/arestas: ids reaproveitados (SQLite) não enganam o cache.
+    """
+    stmt = (update(FlowVersion)
+            .where(FlowVersion.subtask_id == subtask_id)
+            .values(version=FlowVersion.version + 1))
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(FlowVersion(subtask_id=subtask_id, version=1))
+    except IntegrityError:
+        # outra requisição criou a linha no meio do caminho
+        db.session.execute(stmt)
+
+
+def _build(subtask_id: int) -> Tuple[FlowGraph, Dict]:
+    g = load_flow(subtask_id)
+    order = g.topo_order()
+    cycle = None if order is not None else g.find_cycle()
+    length, path = g.critical_path()
+    result = {
+        "subtask_id": subtask_id,
+        "nodes": len(g.nodes),
+        "edges": sum(len(v) for v in g.succ.values()),
+        "acyclic": order is not None,
+        "cycle": cycle,
+        "order": order,
+        "sources": [n for n in g.nodes if not g.pred[n]],
+        "sinks": [n for n in g.nodes if not g.succ[n]],
+        "critical_path": {"length": length, "nodes": path},
+    }
+    return g, result
+
+
+def _cached(subtask_id: int) -> Tuple[FlowGraph, Dict]:
+    key = (subtask_id, flow_version(subtask_id))
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None:
+            _memo.move_to_end(key)
+            return hit
+    entry = _build(subtask_id)
+    with _memo_lock:
+        _memo[key] = entry
+        _memo.move_to_end(key)
+        while len(_memo) > _MEMO_MAX:
+            _memo.popitem(last=False)
+    return entry
+
+
+def graph_for(subtask_id: int) -> FlowGraph:
+    """Grafo do fluxo (memoizado por versão). Não altere o objeto retornado."""
+    return _cached(subtask_id)[0]
+
+
+def analyze(subtask_id: int) -> Dict:
+    """Análise completa do fluxo (memoizada por versão)."""
+    return _cached(subtask_id)[1]
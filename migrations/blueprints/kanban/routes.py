@@ -1,14 +1,14 @@
 # blueprints/kanban/routes.py
 from __future__ import annotations
 
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from time import sleep
 from typing import Dict, List
 
-from flask import render_template, request, jsonify
+from flask import current_app, render_template, request, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import func, select, text
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import func, or_, select, text, update, delete
+from sqlalchemy.exc import IntegrityError, OperationalError
 
 from . import kanban_bp
 from extensions import db
@@ -16,19 +16,18 @@ from models import (
     User, Task, TaskLog, Subtask,
     SubtaskFlowNode, SubtaskFlowEdge
 )
+from services import directory
+from services.ratelimit import rate_limit
 from utils.audit import write_audit
+from .graph import analyze, bump_version, graph_for, load_flow
 
 # ---------- helpers ----------
 def _must_be_agent_like() -> bool:
     role = (getattr(current_user, "role", "") or "").lower()
     return current_user.is_authenticated and role in ("agent", "gestor", "admin")
 
-def _user_list_for_assign() -> List[User]:
-    return (
-        User.query.filter(User.role.in_(("agent", "gestor", "admin")))
-        .order_by(User.name.asc(), User.email.asc())
-        .all()
-    )
+def _user_list_for_assign() -> List[directory.Agent]:
+    return directory.agents()
 
 def _normalize_status(s: str) -> str:
     s = (s or "").strip().lower()
@@ -52,6 +51,54 @@ def _add_log(task_id: int, text_: str):
         log_date=date.today()
     ))
 
+def _reject_cycles(data: Dict | None = None) -> bool:
+    """Rejeita arestas que fecham ciclo (config FLOW_REJECT_CYCLES ou 'acyclic' no payload)."""
+    if data and "acyclic" in data:
+        return bool(data.get("acyclic"))
+    return bool(current_app.config.get("FLOW_REJECT_CYCLES", False))
+
+def _insert_edge_if_absent(subtask_id: int, from_id: int, to_id: int, label) -> bool:
+    """
+    INSERT apoiado na UNIQUE (subtask_id, from_id, to_id): sem leitura prévia.
+    Retorna True se a aresta foi criada, False se já existia.
+    """
+    tbl = SubtaskFlowEdge.__table__
+    values = dict(subtask_id=subtask_id, from_id=from_id, to_id=to_id, label=label)
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        # INSERT IGNORE: rowcount 0 se já existe. (ON DUPLICATE KEY UPDATE id=id não
+        # serve: com CLIENT_FOUND_ROWS, ligado pelo pymysql, o no-op também conta 1)
+        stmt = tbl.insert().prefix_with("IGNORE").values(**values)
+    elif dialect in ("postgresql", "sqlite"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(tbl).values(**values).on_conflict_do_nothing(
+            index_elements=["subtask_id", "from_id", "to_id"]
+        )
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(tbl.insert().values(**values))
+            return True
+        except IntegrityError:
+            return False
+    return db.session.execute(stmt).rowcount == 1
+
+def _delete_node_edges(node_ids) -> None:
+    """
+    Remove as arestas que tocam os nós (usa os índices de from_id/to_id).
+    Explícito: o SQLite só aplica ON DELETE CASCADE com PRAGMA foreign_keys=ON.
+    """
+    ids = list(node_ids)
+    if ids:
+        db.session.execute(
+            delete(SubtaskFlowEdge)
+            .where(or_(SubtaskFlowEdge.from_id.in_(ids), SubtaskFlowEdge.to_id.in_(ids)))
+            .execution_options(synchronize_session=False)
+        )
+
 def _normalize_sub_status(s: str) -> str:
     s = (s or "").strip().lower()
     return s if s in ("open", "done") else "open"
@@ -96,6 +143,7 @@ def api_list_tasks():
 # ---------- API: criar tarefa ----------
 @kanban_bp.route("/api/tasks", methods=["POST"], endpoint="api_create_task")
 @login_required
+@rate_limit("kanban_write")
 def api_create_task():
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -147,6 +195,7 @@ def api_create_task():
 # ---------- API: atualizar tarefa ----------
 @kanban_bp.route("/api/tasks/<int:task_id>", methods=["PUT"], endpoint="api_update_task")
 @login_required
+@rate_limit("kanban_write")
 def api_update_task(task_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -201,6 +250,7 @@ def api_update_task(task_id: int):
 # ---------- API: mover tarefa ----------
 @kanban_bp.route("/api/tasks/<int:task_id>/move", methods=["PUT"], endpoint="api_move_task")
 @login_required
+@rate_limit("kanban_write")
 def api_move_task(task_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -304,6 +354,7 @@ def api_move_task(task_id: int):
 # ---------- API: deletar tarefa ----------
 @kanban_bp.route("/api/tasks/<int:task_id>", methods=["DELETE"], endpoint="api_delete_task")
 @login_required
+@rate_limit("kanban_write")
 def api_delete_task(task_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -332,6 +383,115 @@ def api_delete_task(task_id: int):
     db.session.commit()
     return jsonify({"ok": True})
 
+# =========================
+# Atividade (TaskLog)
+# =========================
+_ACTIVITY_PAGE = 30
+
+def _encode_cursor(created_at: datetime, log_id: int) -> str:
+    return f"{created_at.isoformat()}|{log_id}"
+
+def _decode_cursor(raw: str):
+    try:
+        ts, lid = (raw or "").split("|", 1)
+        return datetime.fromisoformat(ts), int(lid)
+    except Exception:
+        return None
+
+@kanban_bp.route("/api/tasks/<int:task_id>/activity", methods=["GET"], endpoint="api_task_activity")
+@login_required
+def api_task_activity(task_id: int):
+    """
+    Histórico da tarefa, mais recente primeiro, paginado por keyset em
+    (task_id, created_at, id) — usa o índice ix_task_logs_task_created.
+    ?cursor=<valor de next_cursor>&limit=N
+    """
+    if not _must_be_agent_like():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        limit = max(1, min(100, int(request.args.get("limit", _ACTIVITY_PAGE))))
+    except Exception:
+        limit = _ACTIVITY_PAGE
+
+    q = (
+        select(TaskLog.id, TaskLog.created_at, TaskLog.log_date, TaskLog.note,
+               TaskLog.author_id, User.name, User.email)
+        .outerjoin(User, User.id == TaskLog.author_id)
+        .where(TaskLog.task_id == task_id)
+    )
+    cursor = request.args.get("cursor")
+    if cursor:
+        cur = _decode_cursor(cursor)
+        if not cur:
+            return jsonify({"error": "cursor inválido"}), 400
+        c_at, c_id = cur
+        q = q.where(
+            (TaskLog.created_at < c_at)
+            | ((TaskLog.created_at == c_at) & (TaskLog.id < c_id))
+        )
+    q = q.order_by(TaskLog.created_at.desc(), TaskLog.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(q).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{
+        "id": r.id,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "log_date": _iso_date_or_none(r.log_date),
+        "note": r.note,
+        "author_id": r.author_id,
+        "author_name": r.name or r.email,
+    } for r in rows]
+    next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id) if (has_more and rows) else None
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@kanban_bp.route("/api/worklog", methods=["GET"], endpoint="api_worklog")
+@login_required
+def api_worklog():
+    """
+    Worklog diário por atendente (agregado no banco):
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (padrão: últimos 14 dias) &author_id=N
+    """
+    if not _must_be_agent_like():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        d_to = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else date.today()
+        d_from = (datetime.strptime(request.args["from"], "%Y-%m-%d").date()
+                  if request.args.get("from") else d_to - timedelta(days=13))
+    except Exception:
+        return jsonify({"error": "datas inválidas (use YYYY-MM-DD)"}), 400
+
+    q = (
+        select(
+            TaskLog.log_date,
+            TaskLog.author_id,
+            User.name,
+            User.email,
+            func.count(TaskLog.id).label("entries"),
+            func.count(func.distinct(TaskLog.task_id)).label("tasks"),
+        )
+        .outerjoin(User, User.id == TaskLog.author_id)
+        .where(TaskLog.log_date >= d_from, TaskLog.log_date <= d_to)
+        .group_by(TaskLog.log_date, TaskLog.author_id, User.name, User.email)
+        .order_by(TaskLog.log_date.desc(), User.name.asc())
+    )
+    author_id = request.args.get("author_id")
+    if author_id and str(author_id).isdigit():
+        q = q.where(TaskLog.author_id == int(author_id))
+
+    rows = db.session.execute(q).all()
+    return jsonify({
+        "from": d_from.isoformat(),
+        "to": d_to.isoformat(),
+        "rows": [{
+            "date": _iso_date_or_none(r.log_date),
+            "author_id": r.author_id,
+            "author_name": r.name or r.email or "—",
+            "entries": int(r.entries),
+            "tasks": int(r.tasks),
+        } for r in rows],
+    })
+
 # =========================
 # SubTarefas
 # =========================
@@ -349,6 +509,7 @@ def api_list_subtasks(task_id: int):
 
 @kanban_bp.route("/api/tasks/<int:task_id>/subtasks", methods=["POST"], endpoint="api_create_subtask")
 @login_required
+@rate_limit("kanban_write")
 def api_create_subtask(task_id: int):
     if not _must_be_agent_like():
         return jsonify({"error":"forbidden"}), 403
@@ -397,6 +558,7 @@ def api_create_subtask(task_id: int):
 
 @kanban_bp.route("/api/subtasks/<int:subtask_id>", methods=["PUT"], endpoint="api_update_subtask")
 @login_required
+@rate_limit("kanban_write")
 def api_update_subtask(subtask_id: int):
     if not _must_be_agent_like():
         return jsonify({"error":"forbidden"}), 403
@@ -475,6 +637,7 @@ def api_update_subtask(subtask_id: int):
 
 @kanban_bp.route("/api/subtasks/<int:subtask_id>", methods=["DELETE"], endpoint="api_delete_subtask")
 @login_required
+@rate_limit("kanban_write")
 def api_delete_subtask(subtask_id: int):
     if not _must_be_agent_like():
         return jsonify({"error":"forbidden"}), 403
@@ -512,6 +675,7 @@ def api_flow_nodes_list(subtask_id: int):
 
 @kanban_bp.route("/api/subtasks/<int:subtask_id>/flow/nodes", methods=["POST"], endpoint="api_flow_nodes_create")
 @login_required
+@rate_limit("kanban_write")
 def api_flow_nodes_create(subtask_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -530,6 +694,7 @@ def api_flow_nodes_create(subtask_id: int):
         x, y = 40, 40
     node = SubtaskFlowNode(subtask_id=subtask_id, title=title, shape=shape, color=color, x=x, y=y, body=(data.get("body") or None))
     db.session.add(node)
+    bump_version(subtask_id)
     db.session.commit()
 
     write_audit(entity_type="FlowNode", entity_id=node.id, action="create",
@@ -539,6 +704,7 @@ def api_flow_nodes_create(subtask_id: int):
 
 @kanban_bp.route("/api/flow/nodes/<int:node_id>", methods=["PUT"], endpoint="api_flow_nodes_update")
 @login_required
+@rate_limit("kanban_write")
 def api_flow_nodes_update(node_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -578,6 +744,7 @@ def api_flow_nodes_update(node_id: int):
 
 @kanban_bp.route("/api/flow/nodes/<int:node_id>", methods=["DELETE"], endpoint="api_flow_nodes_delete")
 @login_required
+@rate_limit("kanban_write")
 def api_flow_nodes_delete(node_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -586,11 +753,14 @@ def api_flow_nodes_delete(node_id: int):
     write_audit(entity_type="FlowNode", entity_id=node_id, action="delete",
                 message=f"Nó removido da subtarefa #{sub_id}",
                 before=node.as_dict(), after=None)
-    SubtaskFlowEdge.query.filter(
-        SubtaskFlowEdge.subtask_id == sub_id,
-        ((SubtaskFlowEdge.from_id == node_id) | (SubtaskFlowEdge.to_id == node_id))
-    ).delete(synchronize_session=False)
-    db.session.delete(node)
+    _delete_node_edges([node_id])
+    db.session.execute(
+        delete(SubtaskFlowNode)
+        .where(SubtaskFlowNode.id == node_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expunge(node)
+    bump_version(sub_id)
     db.session.commit()
     return jsonify({"ok": True})
 
@@ -611,6 +781,7 @@ def api_flow_edges_list(subtask_id: int):
 
 @kanban_bp.route("/api/subtasks/<int:subtask_id>/flow/edges", methods=["POST"], endpoint="api_flow_edges_create")
 @login_required
+@rate_limit("kanban_write")
 def api_flow_edges_create(subtask_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
@@ -628,35 +799,270 @@ def api_flow_edges_create(subtask_id: int):
         return jsonify({"error": "nós não pertencem a esta subtarefa"}), 400
     label = (data.get("label") or "").strip() or None
 
-    exists = SubtaskFlowEdge.query.filter_by(subtask_id=subtask_id, from_id=from_id, to_id=to_id).first()
-    if exists:
-        if label != exists.label:
-            before = exists.as_dict()
-            exists.label = label
-            db.session.commit()
-            write_audit(entity_type="FlowEdge", entity_id=exists.id, action="update",
-                        message=f"Aresta {from_id}->{to_id} label alterada",
-                        before=before, after=exists.as_dict())
-        return jsonify(exists.as_dict()), 200
+    if _reject_cycles(data) and graph_for(subtask_id).would_create_cycle(from_id, to_id):
+        return jsonify({"error": "ligação criaria um ciclo no fluxo", "code": "cycle"}), 409
 
-    e = SubtaskFlowEdge(subtask_id=subtask_id, from_id=from_id, to_id=to_id, label=label)
-    db.session.add(e)
+    created = _insert_edge_if_absent(subtask_id, from_id, to_id, label)
+    e = SubtaskFlowEdge.query.filter_by(subtask_id=subtask_id, from_id=from_id, to_id=to_id).one()
+    if created:
+        bump_version(subtask_id)
+        write_audit(entity_type="FlowEdge", entity_id=e.id, action="link",
+                    message=f"Ligado {from_id} -> {to_id} (sub #{subtask_id})",
+                    after=e.as_dict())
+        db.session.commit()
+        return jsonify(e.as_dict()), 201
+
+    if label != e.label:
+        before = e.as_dict()
+        e.label = label
+        write_audit(entity_type="FlowEdge", entity_id=e.id, action="update",
+                    message=f"Aresta {from_id}->{to_id} label alterada",
+                    before=before, after=e.as_dict())
     db.session.commit()
-    write_audit(entity_type="FlowEdge", entity_id=e.id, action="link",
-                message=f"Ligado {from_id} -> {to_id} (sub #{subtask_id})",
-                after=e.as_dict())
-    return jsonify(e.as_dict()), 201
+    return jsonify(e.as_dict()), 200
 
 @kanban_bp.route("/api/flow/edges/<int:edge_id>", methods=["DELETE"], endpoint="api_flow_edges_delete")
 @login_required
+@rate_limit("kanban_write")
 def api_flow_edges_delete(edge_id: int):
     if not _must_be_agent_like():
         return jsonify({"error": "forbidden"}), 403
     e = SubtaskFlowEdge.query.get_or_404(edge_id)
     before = e.as_dict()
     db.session.delete(e)
+    bump_version(before["subtask_id"])
     db.session.commit()
     write_audit(entity_type="FlowEdge", entity_id=edge_id, action="unlink",
                 message=f"Aresta removida {before['from_id']}->{before['to_id']} (sub #{before['subtask_id']})",
                 before=before, after=None)
     return jsonify({"ok": True})
+
+# =========================
+# FLOW: SALVAR GRAFO (lote)
+# =========================
+_FLOW_SHAPES = ("rect", "diamond", "pill")
+
+def _flow_node_fields(data: Dict, *, defaults: bool) -> Dict:
+    """Normaliza campos de um nó vindos do editor (mesmas regras das rotas unitárias)."""
+    out: Dict = {}
+    if defaults or "title" in data:
+        t = (data.get("title") or "").strip()
+        if t:
+            out["title"] = t
+    if defaults or "shape" in data:
+        shp = (data.get("shape") or "rect").lower()
+        out["shape"] = shp if shp in _FLOW_SHAPES else "rect"
+    if defaults or "color" in data:
+        out["color"] = (data.get("color") or "#e5e7eb").strip()[:16] or "#e5e7eb"
+    if defaults or "body" in data:
+        out["body"] = data.get("body") or None
+    for k, dv in (("x", 40), ("y", 40)):
+        if defaults or k in data:
+            try:
+                out[k] = int(data.get(k, dv))
+            except Exception:
+                if defaults:
+                    out[k] = dv
+    return out
+
+@kanban_bp.route("/api/subtasks/<int:subtask_id>/flow", methods=["PUT"], endpoint="api_flow_save")
+@login_required
+@rate_limit("kanban_write")
+def api_flow_save(subtask_id: int):
+    """
+    Reconcilia o grafo do fluxo em UMA transação.
+    Payload:
+      {
+        "replace": bool,                # true = grafo completo (o que não vier é removido)
+        "nodes": [{id|tmp_id, title, body, shape, color, x, y}, ...],   # novo: só com tmp_id
+        "edges": [{id?, from_id, to_id, label}, ...],   # from/to aceitam tmp_id
+        "delete_nodes": [id, ...],      # modo diff
+        "delete_edges": [id, ...]       # modo diff
+      }
+    Retorna {"ok", "node_ids": {tmp_id: id}, "skipped_nodes", "nodes", "edges"}.
+    ids que não são desta subtarefa (removidos por outra pessoa, ou de outro
+    fluxo) são ignorados e voltam em skipped_nodes — nunca recriados.
+    """
+    if not _must_be_agent_like():
+        return jsonify({"error": "forbidden"}), 403
+    Subtask.query.get_or_404(subtask_id)
+
+    data = request.get_json(silent=True) or {}
+    replace = bool(data.get("replace"))
+    in_nodes = data.get("nodes") or []
+    in_edges = data.get("edges") or []
+    if not isinstance(in_nodes, list) or not isinstance(in_edges, list):
+        return jsonify({"error": "nodes/edges devem ser listas"}), 400
+
+    def _ids(v) -> set:
+        out = set()
+        for x in (v or []):
+            try:
+                out.add(int(x))
+            except Exception:
+                pass
+        return out
+
+    # estado atual em 2 consultas
+    cur_nodes = set(db.session.scalars(
+        select(SubtaskFlowNode.id).where(SubtaskFlowNode.subtask_id == subtask_id)
+    ))
+    cur_edges = {
+        (f, t): eid for eid, f, t in db.session.execute(
+            select(SubtaskFlowEdge.id, SubtaskFlowEdge.from_id, SubtaskFlowEdge.to_id)
+            .where(SubtaskFlowEdge.subtask_id == subtask_id)
+        )
+    }
+
+    # ---- nós: separa novos x existentes ----
+    new_nodes: List[tuple] = []      # (tmp_id, SubtaskFlowNode)
+    upd_rows: List[Dict] = []
+    seen_nodes = set()
+    skipped_nodes: List = []
+    for raw in in_nodes:
+        if not isinstance(raw, dict):
+            continue
+        nid = raw.get("id")
+        if isinstance(nid, int) and nid in cur_nodes:
+            fields = _flow_node_fields(raw, defaults=False)
+            seen_nodes.add(nid)
+            if fields:
+                fields["id"] = nid
+                upd_rows.append(fields)
+            continue
+        tmp = raw.get("tmp_id")
+        if tmp is None:
+            if nid is not None:
+                skipped_nodes.append(nid)
+                continue
+            return jsonify({"error": "nó novo sem tmp_id"}), 400
+        fields = _flow_node_fields(raw, defaults=True)
+        fields.setdefault("title", "Novo bloco")
+        new_nodes.append((str(tmp), SubtaskFlowNode(subtask_id=subtask_id, **fields)))
+
+    del_nodes = (cur_nodes - seen_nodes) if replace else (_ids(data.get("delete_nodes")) & cur_nodes)
+
+    try:
+        if upd_rows:
+            db.session.execute(update(SubtaskFlowNode), upd_rows)
+        if new_nodes:
+            db.session.add_all([n for _, n in new_nodes])
+            db.session.flush()  # INSERT em lote; obtém os ids
+        id_map = {tmp: n.id for tmp, n in new_nodes}
+        live_nodes = (cur_nodes - del_nodes) | set(id_map.values())
+
+        def _resolve(ref):
+            if ref is None:
+                return None
+            if str(ref) in id_map:
+                return id_map[str(ref)]
+            try:
+                ref = int(ref)
+            except Exception:
+                return None
+            return ref if ref in live_nodes else None
+
+        # ---- arestas ----
+        new_edges: List[Dict] = []
+        label_rows: List[Dict] = []
+        seen_edges = set()
+        for raw in in_edges:
+            if not isinstance(raw, dict):
+                continue
+            f, t = _resolve(raw.get("from_id")), _resolve(raw.get("to_id"))
+            if not f or not t or f == t or (f, t) in seen_edges:
+                continue
+            seen_edges.add((f, t))
+            label = (raw.get("label") or "").strip() or None
+            eid = cur_edges.get((f, t))
+            if eid:
+                if "label" in raw:
+                    label_rows.append({"id": eid, "label": label})
+            else:
+                new_edges.append({"subtask_id": subtask_id, "from_id": f, "to_id": t, "label": label})
+
+        if replace:
+            del_edges = {eid for key, eid in cur_edges.items() if key not in seen_edges}
+        else:
+            del_edges = _ids(data.get("delete_edges")) & set(cur_edges.values())
+
+        if del_edges:
+            db.session.execute(
+                delete(SubtaskFlowEdge)
+                .where(SubtaskFlowEdge.id.in_(del_edges))
+                .execution_options(synchronize_session=False)
+            )
+        if del_nodes:
+            _delete_node_edges(del_nodes)
+            db.session.execute(
+                delete(SubtaskFlowNode)
+                .where(SubtaskFlowNode.id.in_(del_nodes))
+                .execution_options(synchronize_session=False)
+            )
+        if label_rows:
+            db.session.execute(update(SubtaskFlowEdge), label_rows)
+        if new_edges:
+            db.session.execute(SubtaskFlowEdge.__table__.insert(), new_edges)
+
+        if _reject_cycles(data):
+            # lê o estado ainda não commitado desta transação
+            cycle = load_flow(subtask_id).find_cycle()
+            if cycle:
+                db.session.rollback()
+                return jsonify({"ok": False, "error": "fluxo contém ciclo", "code": "cycle",
+                                "cycle": cycle}), 409
+
+        if new_nodes or del_nodes or new_edges or del_edges:
+            bump_version(subtask_id)
+        write_audit(entity_type="Flow", entity_id=subtask_id, action="save",
+                    message=(f"Fluxo salvo (sub #{subtask_id}): "
+                             f"+{len(new_nodes)}/~{len(upd_rows)}/-{len(del_nodes)} nós, "
+                             f"+{len(new_edges)}/-{len(del_edges)} arestas"),
+                    after={"node_ids": id_map, "deleted_nodes": sorted(del_nodes),
+                           "deleted_edges": sorted(del_edges)})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "server_error"}), 500
+
+    nodes = (SubtaskFlowNode.query
+             .filter(SubtaskFlowNode.subtask_id == subtask_id)
+             .order_by(SubtaskFlowNode.id.asc())
+             .all())
+    edges = (SubtaskFlowEdge.query
+             .filter(SubtaskFlowEdge.subtask_id == subtask_id)
+             .order_by(SubtaskFlowEdge.id.asc())
+             .all())
+    return jsonify({
+        "ok": True,
+        "node_ids": id_map,
+        "skipped_nodes": skipped_nodes,
+        "nodes": [n.as_dict() for n in nodes],
+        "edges": [e.as_dict() for e in edges],
+    })
+
+# =========================
+# FLOW: ANÁLISE DO GRAFO
+# =========================
+@kanban_bp.route("/api/subtasks/<int:subtask_id>/flow/analysis", methods=["GET"], endpoint="api_flow_analysis")
+@login_required
+def api_flow_analysis(subtask_id: int):
+    """Ciclo, ordem topológica, origens/fins e caminho crítico do fluxo."""
+    if not _must_be_agent_like():
+        return jsonify({"error": "forbidden"}), 403
+    Subtask.query.get_or_404(subtask_id)
+    return jsonify(analyze(subtask_id))
+
+@kanban_bp.route("/api/subtasks/<int:subtask_id>/flow/reachable/<int:node_id>", methods=["GET"], endpoint="api_flow_reachable")
+@login_required
+def api_flow_reachable(subtask_id: int, node_id: int):
+    """Nós alcançáveis a partir de node_id (?reverse=1 para os que chegam nele)."""
+    if not _must_be_agent_like():
+        return jsonify({"error": "forbidden"}), 403
+    Subtask.query.get_or_404(subtask_id)
+    g = graph_for(subtask_id)
+    if node_id not in g.succ:
+        return jsonify({"error": "nó não pertence a esta subtarefa"}), 404
+    reverse = request.args.get("reverse") in ("1", "true", "yes")
+    nodes = g.reachable(node_id, reverse=reverse)
+    return jsonify({"node_id": node_id, "nodes": sorted(nodes)})
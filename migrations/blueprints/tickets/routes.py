@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import os
-import secrets
 import mimetypes
 import logging
 from datetime import datetime
@@ -10,16 +9,32 @@ from typing import List, Optional, Iterable
 
 from flask import (
     current_app, render_template, request, redirect, url_for,
-    flash, abort, send_file
+    flash, abort, jsonify
 )
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 
 from . import tickets_bp
 from extensions import db
-from models import Ticket, User, Attachment, TicketMessage
-from mailer import enviar_email  # envio SMTP direto
+from models import Ticket, Attachment, TicketMessage
 from utils.audit import write_audit  # <<< AUDITORIA
+from services import directory
+from services.assignment import assignee_of, choose_agent, note_assigned, note_status, set_assignee
+from services.jobs import enqueue_attachment_jobs, jobs_by_attachment
+from services.mail_render import status_pt
+from services.notify import notify_event
+from services.ratelimit import rate_limit
+from services.recipients import ticket_recipients
+from services.search import index_ticket
+from services.similar import forget_ticket, note_ticket, similar_tickets
+from services.sla import TicketSLA, apply_sla, mark_first_response, mark_status
+from services.storage import (
+    UploadChunkError, UploadSession, UploadTooLarge, abort_upload, append_chunk,
+    attachment_path, blob_sha, finalize_upload, new_upload_session, release, schedule_cleanup,
+    store_upload, uploads_base,
+)
+from services.delivery import send_upload
+from services.thumbs import ensure_thumbnail, pick_size, thumbs_base
 
 # ============================
 # Helpers
@@ -37,43 +52,18 @@ def _allowed_file(filename: str) -> bool:
     return bool(ext) and (ext in _ALLOWED_EXTS)
 
 
-def _agents_query() -> List[User]:
-    """
-    Retorna usuários com perfis que podem atender (agent/gestor/admin).
-    """
-    return (
-        User.query
-        .filter(User.role.in_(("agent", "gestor", "admin")))
-        .order_by(User.name.asc(), User.email.asc())
-        .all()
-    )
-
-
-def _file_size_of_upload(file_storage) -> int:
+def _agents_query() -> List[directory.Agent]:
     """
-    Tenta obter o tamanho do upload sem quebrar o stream.
+    Retorna usuários com perfis que podem atender (agent/gestor/admin),
+    do diretório em cache (services/directory.py).
     """
-    size = 0
-    try:
-        stream = getattr(file_storage, "stream", None) or file_storage
-        cur = stream.tell()
-        stream.seek(0, os.SEEK_END)
-        size = stream.tell()
-        stream.seek(cur)
-    except Exception:
-        try:
-            file_storage.seek(0, os.SEEK_END)
-            size = file_storage.tell()
-            file_storage.seek(0)
-        except Exception:
-            size = 0
-    return int(size or 0)
+    return directory.agents()
 
 
 def _save_file_for_ticket(ticket: Ticket, f) -> Optional[Attachment]:
     """
-    Salva o upload em /uploads/tickets/<ticket_id>/ e cria Attachment (pendente de commit).
-    Suporta modelos que usem 'uploaded_by' ou 'uploader_id'.
+    Salva o upload no blob store (services/storage: SHA-256, deduplicado) e cria
+    Attachment (pendente de commit). Suporta modelos que usem 'uploaded_by' ou 'uploader_id'.
     """
     if not f or not getattr(f, "filename", ""):
         return None
@@ -87,24 +77,21 @@ def _save_file_for_ticket(ticket: Ticket, f) -> Optional[Attachment]:
         flash(f"Extensão não permitida para {filename}.", "warning")
         return None
 
-    size = _file_size_of_upload(f)
     max_mb = current_app.config.get("MAX_CONTENT_MB", 20)
-    if size and size > max_mb * 1024 * 1024:
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        # hash + limite de tamanho calculados na mesma passada da gravação
+        stored, size, _sha = store_upload(f, ext, max_bytes=max_mb * 1024 * 1024)
+    except UploadTooLarge:
         flash(f"{filename} excede {max_mb}MB.", "warning")
         return None
 
-    ext = os.path.splitext(filename)[1].lower()
-    stored = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(6)}{ext}"
-
-    base = Path(current_app.config.get("UPLOADS_DIR", "uploads"))
-    folder = base / "tickets" / str(ticket.id)
-    folder.mkdir(parents=True, exist_ok=True)
-
-    dst = folder / stored
-    f.save(dst)
-
     ctype = getattr(f, "mimetype", None) or mimetypes.guess_type(filename)[0]
+    return _add_attachment(ticket, filename, stored, size, ctype)
 
+
+def _add_attachment(ticket: Ticket, filename: str, stored: str, size: int, ctype: Optional[str]) -> Attachment:
+    """Cria o Attachment de um arquivo já gravado e enfileira o pós-processamento."""
     # Monta kwargs compatível com o seu modelo (uploaded_by x uploader_id)
     att_kwargs = dict(
         ticket_id=ticket.id,
@@ -121,6 +108,9 @@ def _save_file_for_ticket(ticket: Ticket, f) -> Optional[Attachment]:
 
     att = Attachment(**att_kwargs)
     db.session.add(att)
+    db.session.flush()  # garante att.id
+    # checksum / texto / miniatura ficam para o `flask worker`
+    enqueue_attachment_jobs(att)
     return att
 
 
@@ -154,164 +144,15 @@ def _user_can_reply(ticket: Ticket) -> bool:
 
 
 # ============================
-# Helpers de URL / textos PT-BR
+# Helpers de textos PT-BR / notificações por e-mail
 # ============================
 
-def _abs_url(endpoint: str, **values) -> str:
-    """URL absoluta mesmo sem SERVER_NAME corretamente definido."""
-    try:
-        return url_for(endpoint, _external=True, **values)
-    except Exception:
-        base = (current_app.config.get("MAIL_BASE_URL") or request.url_root).rstrip("/")
-        return f"{base}{url_for(endpoint, **values)}"
-
-
-def _str_pt_status(status: str) -> str:
-    s = (status or "").lower()
-    return "Finalizado" if s == "closed" else ("Em andamento" if s == "in_progress" else "Aberto")
-
-
-def _str_pt_priority(priority: str) -> str:
-    p = (priority or "").lower()
-    if p == "low": return "Baixa"
-    if p == "medium": return "Média"
-    if p == "high": return "Alta"
-    if p == "urgent": return "Urgente"
-    return "—"
-
-
-# ============================
-# Notificações por e-mail (HTML com template)
-# ============================
-
-def _resolve_assignee_label(ticket: Ticket) -> Optional[str]:
-    """
-    Retorna o nome/e-mail do atendente, mesmo que só exista *_id.
-    Suporta 'assignee'/'assignee_id' ou 'agent'/'agent_id'.
-    """
-    user_obj = getattr(ticket, "assignee", None) or getattr(ticket, "agent", None)
-    if not user_obj:
-        uid = getattr(ticket, "assignee_id", None) or getattr(ticket, "agent_id", None)
-        if uid:
-            user_obj = User.query.get(uid)
-    if user_obj:
-        return user_obj.name or user_obj.email
-    return None
+_str_pt_status = status_pt
 
 
 def _ticket_recipients(ticket: Ticket, include_reporter=True, include_assignee=True, extra: Optional[Iterable[str]] = None) -> List[str]:
-    emails: List[str] = []
-
-    if include_reporter and getattr(ticket, "user", None) and ticket.user.email:
-        emails.append(ticket.user.email)
-
-    # assignee/agente
-    assignee_email = None
-    assignee_obj = getattr(ticket, "assignee", None) or getattr(ticket, "agent", None)
-    if assignee_obj and assignee_obj.email:
-        assignee_email = assignee_obj.email
-    else:
-        uid = getattr(ticket, "assignee_id", None) or getattr(ticket, "agent_id", None)
-        if uid:
-            u = User.query.get(uid)
-            if u and u.email:
-                assignee_email = u.email
-    if include_assignee and assignee_email:
-        emails.append(assignee_email)
-
-    # extras
-    if extra:
-        emails.extend([e for e in extra if e])
-
-    # unicidade / limpeza
-    uniq: List[str] = []
-    seen = set()
-    for e in emails:
-        e2 = (e or "").strip().lower()
-        if e2 and e2 not in seen:
-            seen.add(e2)
-            uniq.append(e)
-    return uniq
-
-
-def _mail_body(event: str, ticket: Ticket, extra: str | None = None) -> str:
-    """
-    Gera HTML bonito via template Jinja para as notificações.
-    Template: templates/email/notify.html
-    """
-    base_url = (current_app.config.get("MAIL_BASE_URL") or request.url_root).rstrip("/")
-    logo_url = f"{base_url}/static/images/sollus_logo_white.png"
-    cta_url = _abs_url('tickets.ticket_detail', ticket_id=ticket.id)
-
-    # PT-BR status/prioridade
-    status_pt = _str_pt_status(ticket.status)
-    priority_pt = _str_pt_priority(ticket.priority)
-
-    requester = ticket.user.name if (ticket.user and ticket.user.name) else (ticket.user.email if ticket.user else "-")
-    assignee = _resolve_assignee_label(ticket)
-
-    created_at = ticket.created_at.strftime("%d/%m/%Y %H:%M") if getattr(ticket, "created_at", None) else None
-    updated_at = ticket.updated_at.strftime("%d/%m/%Y %H:%M") if getattr(ticket, "updated_at", None) else None
-
-    titles = {
-        "created": ("Chamado criado", "Um novo chamado foi aberto."),
-        "assigned": ("Chamado atribuído", "O chamado foi atribuído a um atendente."),
-        "status": (f"Status alterado para {status_pt}", "O status do chamado foi atualizado."),
-        "reply": ("Nova resposta no chamado", "Uma nova mensagem foi adicionada ao chamado."),
-    }
-    title, subtitle = titles.get(event, ("Atualização no chamado", None))
-
-    last_message = (extra or "").strip() or None
-
-    return render_template(
-        "email/notify.html",
-        title=f"[Chamado #{ticket.id}] {title} — {ticket.title}",
-        subtitle=subtitle,
-        env_label=current_app.config.get("FLASK_ENV", "ticket").capitalize(),
-        logo_url=logo_url,
-        cta_url=cta_url,
-        cta_label="Abrir Chamado",
-        ticket=ticket,
-        status_pt=status_pt,
-        priority_pt=priority_pt,
-        requester=requester,
-        assignee=assignee,
-        created_at=created_at,
-        updated_at=updated_at,
-        description=ticket.description,
-        last_message=last_message,
-    )
-
-
-def _mail_subject(event: str, ticket: Ticket) -> str:
-    """
-    Assunto padronizado.
-    """
-    if event == "created":
-        mid = "Criado"
-    elif event == "assigned":
-        mid = "Atribuído"
-    elif event == "status":
-        mid = f"Status alterado para {_str_pt_status(ticket.status)}"
-    elif event == "reply":
-        mid = "Nova resposta"
-    else:
-        mid = "Atualização"
-    return f"[Chamado #{ticket.id}] {mid} — {ticket.title}"
-
-
-def _notify_event(event: str, ticket: Ticket, destinatarios: List[str], extra: str = "") -> None:
-    """
-    Dispara e-mail usando mailer.enviar_email. Não quebra o fluxo em caso de erro.
-    event: created | assigned | status | reply
-    """
-    if not destinatarios:
-        return
-    assunto = _mail_subject(event, ticket)
-    html = _mail_body(event, ticket, extra)
-    ok = enviar_email(destinatarios, assunto, html)
-    if not ok:
-        logging.warning(f"[mail] falha ao enviar '{assunto}' para {destinatarios}")
+    """Solicitante/atendente (+ extras) numa única consulta (services/recipients.py)."""
+    return ticket_recipients(ticket.id, reporter=include_reporter, assignee=include_assignee, extra=extra)
 
 
 # ============================
@@ -325,6 +166,30 @@ def new_ticket():
     return render_template('tickets/new.html', agents=agents)
 
 
+@tickets_bp.route('/similar', methods=['GET'], endpoint='similar')
+@login_required
+@rate_limit("tickets_similar")
+def similar():
+    """
+    Chamados em aberto parecidos com o texto digitado (tela de novo chamado).
+    Usuário comum só vê os próprios, salvo SIMILAR_SHOW_ALL_USERS.
+    """
+    text = (request.args.get('q') or '').strip()[:2000]
+    if len(text) < 3:
+        return jsonify({"results": []})
+    see_all = _user_can_assign() or current_app.config.get('SIMILAR_SHOW_ALL_USERS', False)
+    limit = int(current_app.config.get('SIMILAR_MAX_RESULTS', 5))
+    hits = similar_tickets(text, user_id=None if see_all else current_user.id, limit=limit)
+    return jsonify({"results": [{
+        "id": t.id,
+        "title": t.title,
+        "status": t.status,
+        "status_label": _str_pt_status(t.status),
+        "score": round(score, 3),
+        "url": url_for('tickets.ticket_detail', ticket_id=t.id),
+    } for t, score in hits]})
+
+
 @tickets_bp.route('/create', methods=['GET', 'POST'], endpoint='create_ticket')
 @login_required
 def create_ticket():
@@ -359,17 +224,28 @@ def create_ticket():
             ticket.assignee_id = assignee_id
         elif hasattr(ticket, 'agent_id'):
             ticket.agent_id = assignee_id
+    auto_assigned = False
+    if assignee_of(ticket) is None and current_app.config.get('AUTOASSIGN_ON_CREATE'):
+        # sem atendente escolhido: distribui pela carga (contabilizada após o commit)
+        picked = choose_agent(ticket, [(a.id, a.role) for a in _agents_query() if a.is_active])
+        if picked:
+            set_assignee(ticket, picked)
+            auto_assigned = True
 
     # aceita 1 ou vários arquivos (file, files, attachments, attachments[])
     for f in _collect_uploads_from_request():
         _save_file_for_ticket(ticket, f)
 
+    # índice de busca e prazos de SLA (no mesmo commit)
+    index_ticket(ticket)
+    apply_sla(ticket)
+
     # AUDIT: criação do chamado (no mesmo commit)
     write_audit(
         entity_type="Ticket",
         entity_id=ticket.id,
         action="create",
-        message=f"Criado '{ticket.title}'",
+        message=f"Criado '{ticket.title}'" + (" (atribuição automática)" if auto_assigned else ""),
         after={
             "id": ticket.id, "title": ticket.title, "status": ticket.status, "priority": ticket.priority,
             "user_id": ticket.user_id, "assignee_id": getattr(ticket, 'assignee_id', None) or getattr(ticket, 'agent_id', None)
@@ -377,11 +253,13 @@ def create_ticket():
     )
 
     db.session.commit()
+    note_ticket(ticket)
+    note_assigned(None, assignee_of(ticket), ticket.status)
     flash('Chamado criado com sucesso.', 'success')
 
     # Notificação: criado (para solicitante + atendente, se houver)
     dest = _ticket_recipients(ticket, include_reporter=True, include_assignee=True)
-    _notify_event("created", ticket, dest)
+    notify_event("created", ticket, dest)
 
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
@@ -404,10 +282,7 @@ def ticket_detail(ticket_id: int):
     agents = _agents_query()
 
     current_assignee_id = getattr(ticket, 'assignee_id', None) or getattr(ticket, 'agent_id', None)
-    current_assignee = next((u for u in agents if u.id == current_assignee_id), None)
-    current_assignee_label = None
-    if current_assignee:
-        current_assignee_label = current_assignee.name or getattr(current_assignee, 'username', None) or current_assignee.email
+    current_assignee_label = directory.agent_label(current_assignee_id)
 
     # mensagens do chamado (públicas), mais antigas primeiro
     messages = (
@@ -423,6 +298,8 @@ def ticket_detail(ticket_id: int):
         attachments = []
     else:
         attachments = attachments_rel.all() if hasattr(attachments_rel, "all") else list(attachments_rel)
+    attachment_jobs = jobs_by_attachment(a.id for a in attachments)
+    sla = db.session.get(TicketSLA, ticket.id)
 
     reply_url = url_for('tickets.reply', ticket_id=ticket.id)
 
@@ -435,6 +312,9 @@ def ticket_detail(ticket_id: int):
         can_reply=can_reply,
         messages=messages,
         attachments=attachments,  # <<--- PASSA A LISTA PRONTA
+        attachment_jobs=attachment_jobs,
+        sla=sla,
+        now=datetime.utcnow(),
         current_assignee_id=current_assignee_id,
         current_assignee_label=current_assignee_label,
         reply_url=reply_url,
@@ -457,6 +337,9 @@ def reply(ticket_id: int):
     db.session.add(TicketMessage(ticket_id=ticket.id, author_id=current_user.id, body=body, public=True))
     if hasattr(ticket, 'updated_at'):
         ticket.updated_at = datetime.utcnow()
+    db.session.flush()
+    index_ticket(ticket)
+    mark_first_response(ticket, current_user)
 
     # AUDIT: resposta no chamado
     write_audit(
@@ -476,7 +359,7 @@ def reply(ticket_id: int):
         dest = _ticket_recipients(ticket, include_reporter=False, include_assignee=True)
     else:
         dest = _ticket_recipients(ticket, include_reporter=True, include_assignee=False)
-    _notify_event("reply", ticket, dest, extra=body)
+    notify_event("reply", ticket, dest, extra=body)
 
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
@@ -514,11 +397,12 @@ def assign_agent(ticket_id: int):
     )
 
     db.session.commit()
+    note_assigned(before["assignee_id"], assignee_id, ticket.status)
     flash('Atendente atribuído com sucesso.', 'success')
 
     # Notificação: atribuído (para solicitante + novo atendente)
     dest = _ticket_recipients(ticket, include_reporter=True, include_assignee=True)
-    _notify_event("assigned", ticket, dest)
+    notify_event("assigned", ticket, dest)
 
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
@@ -539,6 +423,7 @@ def update_status(ticket_id: int):
     ticket.status = status
     if hasattr(ticket, 'updated_at'):
         ticket.updated_at = datetime.utcnow()
+    mark_status(ticket)
 
     # AUDIT: mudança de status
     write_audit(
@@ -551,18 +436,54 @@ def update_status(ticket_id: int):
     )
 
     db.session.commit()
+    note_ticket(ticket)
+    note_status(assignee_of(ticket), before["status"], ticket.status)
 
     flash('Status atualizado.', 'success')
 
     # Notificação: mudança de status (para solicitante + atendente)
     dest = _ticket_recipients(ticket, include_reporter=True, include_assignee=True)
-    _notify_event("status", ticket, dest)
+    notify_event("status", ticket, dest)
 
     if status == 'closed':
         return redirect(url_for('tickets.closed_list'))
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
 
+@tickets_bp.route('/<int:ticket_id>/priority', methods=['POST'], endpoint='update_priority')
+@login_required
+def update_priority(ticket_id: int):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    if not _user_can_assign():
+        abort(403)
+
+    priority = (request.form.get('priority') or '').strip().lower()
+    if priority not in ('low', 'medium', 'high', 'urgent'):
+        flash('Prioridade inválida.', 'warning')
+        return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
+
+    before = {"priority": ticket.priority}
+    ticket.priority = priority
+    if hasattr(ticket, 'updated_at'):
+        ticket.updated_at = datetime.utcnow()
+    # prazos de SLA acompanham a nova prioridade
+    apply_sla(ticket)
+
+    # AUDIT: mudança de prioridade
+    write_audit(
+        entity_type="Ticket",
+        entity_id=ticket.id,
+        action="priority",
+        message=f"Prioridade alterada para {priority}",
+        before=before,
+        after={"priority": ticket.priority}
+    )
+
+    db.session.commit()
+    flash('Prioridade atualizada.', 'success')
+    return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
+
+
 # ============================
 # Anexos
 # ============================
@@ -602,6 +523,114 @@ def attachments_upload(ticket_id: int):
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
 
+# ----------------------------
+# Upload em partes (retomável): init -> PUT parte(s) -> finalize
+# ----------------------------
+
+def _upload_session_or_404(ticket: Ticket, upload_id: str) -> UploadSession:
+    # a permissão é conferida a cada parte/finalize, não só no init: pode ter sido revogada no meio
+    if not _user_can_edit_ticket(ticket):
+        abort(403)
+    sess = UploadSession.query.get_or_404(upload_id)
+    if sess.ticket_id != ticket.id or sess.user_id != current_user.id:
+        abort(404)
+    return sess
+
+
+@tickets_bp.route('/<int:ticket_id>/uploads', methods=['POST'], endpoint='chunked_upload_init')
+@login_required
+@rate_limit("tickets_upload")
+def chunked_upload_init(ticket_id: int):
+    """JSON {filename, size, content_type} -> {upload_id, chunk_size, ...}."""
+    ticket = Ticket.query.get_or_404(ticket_id)
+    if not _user_can_edit_ticket(ticket):
+        abort(403)
+
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename or not _allowed_file(filename):
+        return jsonify({"error": "extensão não permitida"}), 400
+    try:
+        total = int(data.get("size"))
+    except Exception:
+        return jsonify({"error": "size inválido"}), 400
+    max_mb = current_app.config.get("CHUNKED_UPLOAD_MAX_MB", 200)
+    if total <= 0 or total > max_mb * 1024 * 1024:
+        return jsonify({"error": f"arquivo deve ter até {max_mb}MB"}), 413
+
+    ctype = (data.get("content_type") or "").strip()[:100] or mimetypes.guess_type(filename)[0]
+    sess = new_upload_session(ticket.id, current_user.id, filename, ctype, total)
+    db.session.commit()
+    out = sess.as_dict()
+    out["chunk_size"] = current_app.config.get("UPLOAD_CHUNK_MB", 5) * 1024 * 1024
+    return jsonify(out), 201
+
+
+@tickets_bp.route('/<int:ticket_id>/uploads/<upload_id>', methods=['GET'], endpoint='chunked_upload_status')
+@login_required
+def chunked_upload_status(ticket_id: int, upload_id: str):
+    """Quanto já foi recebido (para retomar após queda)."""
+    ticket = Ticket.query.get_or_404(ticket_id)
+    return jsonify(_upload_session_or_404(ticket, upload_id).as_dict())
+
+
+@tickets_bp.route('/<int:ticket_id>/uploads/<upload_id>', methods=['PUT'], endpoint='chunked_upload_put')
+@login_required
+def chunked_upload_put(ticket_id: int, upload_id: str):
+    """Corpo bruto da parte; ?offset=N (bytes já recebidos)."""
+    ticket = Ticket.query.get_or_404(ticket_id)
+    sess = _upload_session_or_404(ticket, upload_id)
+    try:
+        offset = int(request.args.get("offset", sess.received or 0))
+        append_chunk(sess, request.stream, offset)
+    except UploadChunkError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e), **sess.as_dict()}), 409
+    except ValueError:
+        return jsonify({"error": "offset inválido"}), 400
+    db.session.commit()
+    return jsonify(sess.as_dict())
+
+
+@tickets_bp.route('/<int:ticket_id>/uploads/<upload_id>/finalize', methods=['POST'], endpoint='chunked_upload_finalize')
+@login_required
+def chunked_upload_finalize(ticket_id: int, upload_id: str):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    sess = _upload_session_or_404(ticket, upload_id)
+    filename, ctype = sess.filename, sess.content_type
+    try:
+        stored, size, _sha = finalize_upload(sess, os.path.splitext(filename)[1].lower())
+    except UploadChunkError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+
+    att = _add_attachment(ticket, filename, stored, size, ctype)
+    write_audit(
+        entity_type="TicketAttachment",
+        entity_id=att.id,
+        action="upload",
+        message=f"Arquivo anexado ao ticket #{ticket.id} (upload em partes)",
+        after={
+            "ticket_id": ticket.id,
+            "original_name": att.original_name,
+            "stored_name": att.stored_name,
+            "size": att.size,
+            "content_type": att.content_type
+        }
+    )
+    db.session.commit()
+    return jsonify({"ok": True, "attachment_id": att.id, "size": size}), 201
+
+
+@tickets_bp.route('/<int:ticket_id>/uploads/<upload_id>', methods=['DELETE'], endpoint='chunked_upload_abort')
+@login_required
+def chunked_upload_abort(ticket_id: int, upload_id: str):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    abort_upload(_upload_session_or_404(ticket, upload_id))
+    db.session.commit()
+    return jsonify({"ok": True})
+
+
 @tickets_bp.route('/<int:ticket_id>/attachments/<int:att_id>/download', methods=['GET'], endpoint='attachments_download')
 @login_required
 def attachments_download(ticket_id: int, att_id: int):
@@ -610,20 +639,41 @@ def attachments_download(ticket_id: int, att_id: int):
     if att.ticket_id != ticket.id:
         abort(404)
 
-    base = Path(current_app.config.get('UPLOADS_DIR', 'uploads'))
-    fpath = base / 'tickets' / str(ticket.id) / att.stored_name
+    fpath = attachment_path(ticket.id, att.stored_name)
     if not fpath.exists():
         abort(404)
 
     download_name = att.original_name or att.filename or att.stored_name
-    return send_file(
-        str(fpath),
+    sha = blob_sha(att.stored_name)
+    # permissão já checada: a transferência pode ser entregue ao nginx/Apache
+    return send_upload(
+        fpath,
         as_attachment=True,
         download_name=download_name,
-        mimetype=att.content_type or mimetypes.guess_type(download_name)[0]
+        mimetype=att.content_type or mimetypes.guess_type(download_name)[0],
+        etag=sha,
+        immutable=bool(sha),
     )
 
 
+@tickets_bp.route('/<int:ticket_id>/attachments/<int:att_id>/thumb', methods=['GET'], endpoint='attachments_thumb')
+@login_required
+def attachments_thumb(ticket_id: int, att_id: int):
+    """Miniatura JPEG do anexo (?size=px, arredondado para a variante configurada)."""
+    att = Attachment.query.get_or_404(att_id)
+    if att.ticket_id != ticket_id:
+        abort(404)
+
+    size = pick_size(request.args.get("size"))
+    tpath = ensure_thumbnail(att, size)
+    if tpath is None:
+        abort(404)
+
+    # a miniatura é derivada do conteúdo: a chave (nome + tamanho) nunca muda
+    tag = f"{blob_sha(att.stored_name) or Path(att.stored_name).stem}-{size}"
+    return send_upload(tpath, mimetype="image/jpeg", etag=tag, immutable=True)
+
+
 @tickets_bp.route('/<int:ticket_id>/attachments/<int:att_id>/delete', methods=['POST'], endpoint='attachments_delete')
 @login_required
 def attachments_delete(ticket_id: int, att_id: int):
@@ -635,13 +685,9 @@ def attachments_delete(ticket_id: int, att_id: int):
     if att.ticket_id != ticket.id:
         abort(404)
 
-    base = Path(current_app.config.get('UPLOADS_DIR', 'uploads'))
-    fpath = base / 'tickets' / str(ticket.id) / att.stored_name
-    try:
-        if fpath.exists():
-            fpath.unlink()
-    except Exception:
-        pass
+    # só banco aqui: o arquivo sai em segundo plano depois do commit
+    released = release(att.stored_name)
+    legacy = [] if released else [attachment_path(ticket.id, att.stored_name)]
 
     # AUDIT: remoção de anexo
     write_audit(
@@ -661,6 +707,7 @@ def attachments_delete(ticket_id: int, att_id: int):
 
     db.session.delete(att)
     db.session.commit()
+    schedule_cleanup([released], legacy)
     flash('Anexo removido.', 'success')
     return redirect(url_for('tickets.ticket_detail', ticket_id=ticket.id))
 
@@ -690,22 +737,14 @@ def delete_ticket(ticket_id: int):
         "assignee_id": getattr(ticket, 'assignee_id', None) or getattr(ticket, 'agent_id', None)
     }
 
-    # tenta apagar arquivos físicos
-    base = Path(current_app.config.get('UPLOADS_DIR', 'uploads'))
-    folder = base / 'tickets' / str(ticket.id)
-    try:
-        if folder.exists() and folder.is_dir():
-            for p in folder.iterdir():
-                try:
-                    p.unlink()
-                except Exception:
-                    pass
-            try:
-                folder.rmdir()
-            except Exception:
-                pass
-    except Exception:
-        pass
+    # blobs: decrementa referências (arquivos só saem se ninguém mais usar)
+    released = [
+        release(name) for (name,) in
+        db.session.query(Attachment.stored_name).filter(Attachment.ticket_id == ticket.id)
+    ]
+
+    # pasta dos arquivos legados: removida em segundo plano depois do commit
+    folders = [uploads_base() / 'tickets' / str(ticket.id), thumbs_base() / 'tickets' / str(ticket.id)]
 
     # AUDIT: deleção do ticket
     write_audit(
@@ -717,7 +756,11 @@ def delete_ticket(ticket_id: int):
         after=None
     )
 
+    ticket_pk = ticket.id
     db.session.delete(ticket)
     db.session.commit()
+    forget_ticket(ticket_pk)
+    note_status(before["assignee_id"], before["status"], "closed")
+    schedule_cleanup(released, folders)
     flash(f'Chamado #{ticket.id} excluído.', 'success')
     return redirect(url_for('tickets.dashboard'))
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from flask import render_template
+from flask import current_app, jsonify, render_template, request, url_for
 from flask_login import login_required, current_user
 from sqlalchemy import func
 
 from . import tickets_bp
 from extensions import db
 from models import Ticket, User
+from services.metrics import agent_metrics
+from services.ratelimit import rate_limit
+from services.search import search_tickets
+from services.sla import summary as sla_summary
 
 
 def _role() -> str:
@@ -60,6 +64,50 @@ def closed_list():
     return render_template("tickets/closed_list.html", tickets=tickets)
 
 
+@tickets_bp.route("/search", methods=["GET"], endpoint="search")
+@login_required
+@rate_limit("tickets_search")
+def search():
+    """
+    Busca textual (título, descrição, respostas e texto de anexos), por relevância.
+    - Equipe: todos os chamados; usuário comum: somente os próprios.
+    - ?q=&status=&page= ; JSON com ?format=json ou Accept: application/json.
+    """
+    q = (request.args.get("q") or "").strip()
+    status = (request.args.get("status") or "").strip().lower() or None
+    if status not in (None, "open", "in_progress", "closed"):
+        status = None
+    try:
+        page = max(1, min(int(request.args.get("page", 1)), 50))
+    except ValueError:
+        page = 1
+    per_page = int(current_app.config.get("SEARCH_PER_PAGE", 20))
+
+    user_id = None if _role() in ("agent", "gestor", "admin") else current_user.id
+    results, has_more = search_tickets(q, user_id=user_id, status=status, page=page, per_page=per_page)
+
+    wants_json = request.args.get("format") == "json" or (
+        request.accept_mimetypes.best == "application/json")
+    if wants_json:
+        return jsonify({
+            "q": q,
+            "page": page,
+            "has_more": has_more,
+            "results": [{
+                "id": t.id,
+                "title": t.title,
+                "status": t.status,
+                "priority": t.priority,
+                "created_at": t.created_at.isoformat() if t.created_at else None,
+                "score": round(score, 3),
+                "url": url_for("tickets.ticket_detail", ticket_id=t.id),
+            } for t, score in results],
+        })
+
+    return render_template("tickets/search.html", q=q, status=status or "", page=page,
+                           has_more=has_more, results=results)
+
+
 @tickets_bp.route("/reports", methods=["GET"], endpoint="reports_overview")
 @login_required
 def reports_overview():
@@ -148,6 +196,12 @@ def reports_overview():
     )
     top_agents = [{"id": uid, "name": (name or "—"), "count": int(cnt)} for uid, name, cnt in top_rows]
 
+    # SLA (prazos pré-calculados em ticket_sla)
+    sla = sla_summary()
+
+    # carga por atendente (só equipe; cache de 5 min)
+    agents_panel = agent_metrics()["agents"] if role in ("agent", "gestor", "admin") else None
+
     return render_template(
         "tickets/reports.html",
         month_labels=month_labels,
@@ -157,4 +211,15 @@ def reports_overview():
         chart_prior_labels=chart_prior_labels,
         chart_prior_values=chart_prior_values,
         top_agents=top_agents,
+        sla=sla,
+        agents_panel=agents_panel,
     )
+
+
+@tickets_bp.route("/reports/agents", methods=["GET"], endpoint="reports_agents")
+@login_required
+def reports_agents():
+    """JSON: carga, medianas de 1ª resposta/solução e envelhecimento por atendente."""
+    if _role() not in ("agent", "gestor", "admin"):
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify(agent_metrics())
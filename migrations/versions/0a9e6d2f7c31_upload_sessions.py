@@ -0,0 +1,40 @@
+"""upload_sessions: upload de anexos em partes (retomável)
+
+Revision ID: 0a9e6d2f7c31
+Revises: f5d1a8c3e940
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0a9e6d2f7c31"
+down_revision = "f5d1a8c3e940"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=32), primary_key=True, nullable=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("content_type", sa.String(length=100), nullable=True),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("received", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    op.create_index("ix_upload_sessions_ticket_id", "upload_sessions", ["ticket_id"])
+
+
+def downgrade():
+    op.drop_index("ix_upload_sessions_ticket_id", table_name="upload_sessions")
+    op.drop_table("upload_sessions")
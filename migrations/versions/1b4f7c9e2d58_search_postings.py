@@ -0,0 +1,37 @@
+"""search_postings: índice invertido da busca de chamados
+
+Revision ID: 1b4f7c9e2d58
+Revises: 0a9e6d2f7c31
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "1b4f7c9e2d58"
+down_revision = "0a9e6d2f7c31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PK (term, ticket_id): a consulta 'term IN (...)' lê só o trecho do índice de cada termo
+    op.create_table(
+        "search_postings",
+        sa.Column("term", sa.String(length=40), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("term", "ticket_id"),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_bin",
+    )
+    op.create_index("ix_search_postings_ticket_id", "search_postings", ["ticket_id"])
+    # popular depois com: flask --app app:app search reindex
+
+
+def downgrade():
+    op.drop_index("ix_search_postings_ticket_id", table_name="search_postings")
+    op.drop_table("search_postings")
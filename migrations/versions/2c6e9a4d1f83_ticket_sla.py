@@ -0,0 +1,45 @@
+"""ticket_sla: prazos de SLA pré-calculados por chamado
+
+Revision ID: 2c6e9a4d1f83
+Revises: 1b4f7c9e2d58
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2c6e9a4d1f83"
+down_revision = "1b4f7c9e2d58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ticket_sla",
+        sa.Column("ticket_id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("priority", sa.String(length=20), nullable=False),
+        sa.Column("response_due_at", sa.DateTime(), nullable=False),
+        sa.Column("resolve_due_at", sa.DateTime(), nullable=False),
+        sa.Column("responded_at", sa.DateTime(), nullable=True),
+        sa.Column("resolved_at", sa.DateTime(), nullable=True),
+        sa.Column("response_breached_at", sa.DateTime(), nullable=True),
+        sa.Column("resolve_breached_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    # varredura: 'ainda pendente, não sinalizado, prazo < agora' = faixa no fim do índice
+    op.create_index("ix_ticket_sla_response_pending", "ticket_sla",
+                    ["responded_at", "response_breached_at", "response_due_at"])
+    op.create_index("ix_ticket_sla_resolve_pending", "ticket_sla",
+                    ["resolved_at", "resolve_breached_at", "resolve_due_at"])
+    # popular depois com: flask --app app:app sla recompute
+
+
+def downgrade():
+    op.drop_index("ix_ticket_sla_resolve_pending", table_name="ticket_sla")
+    op.drop_index("ix_ticket_sla_response_pending", table_name="ticket_sla")
+    op.drop_table("ticket_sla")
@@ -0,0 +1,30 @@
+"""business_holidays: feriados do calendário de expediente (SLA)
+
+Revision ID: 3d8b1e6f5a27
+Revises: 2c6e9a4d1f83
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3d8b1e6f5a27"
+down_revision = "2c6e9a4d1f83"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "business_holidays",
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("name", sa.String(length=120), nullable=True),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+
+
+def downgrade():
+    op.drop_table("business_holidays")
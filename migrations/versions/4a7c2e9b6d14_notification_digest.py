@@ -0,0 +1,52 @@
+"""notification_prefs + digest_events: resumo de notificações por usuário
+
+Revision ID: 4a7c2e9b6d14
+Revises: 3d8b1e6f5a27
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4a7c2e9b6d14"
+down_revision = "3d8b1e6f5a27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notification_prefs",
+        sa.Column("user_id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("mode", sa.String(length=16), nullable=False, server_default="immediate"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    op.create_table(
+        "digest_events",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("event", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("detail", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    # job: 'pendentes (sent_at NULL) por usuário' = faixa no início do índice
+    op.create_index("ix_digest_events_pending", "digest_events", ["sent_at", "user_id", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_digest_events_pending", table_name="digest_events")
+    op.drop_table("digest_events")
+    op.drop_table("notification_prefs")
@@ -0,0 +1,31 @@
+"""subtask_flow_versions: versão estrutural do fluxo (cache da análise do grafo)
+
+Revision ID: 6c1e8a3d5f90
+Revises: 4a7c2e9b6d14
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6c1e8a3d5f90"
+down_revision = "4a7c2e9b6d14"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "subtask_flow_versions",
+        sa.Column("subtask_id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["subtask_id"], ["subtasks.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+
+
+def downgrade():
+    op.drop_table("subtask_flow_versions")
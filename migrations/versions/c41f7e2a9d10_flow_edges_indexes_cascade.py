@@ -0,0 +1,108 @@
+"""flow edges: unique (subtask_id, from_id, to_id), index to_id, ON DELETE CASCADE
+
+Revision ID: c41f7e2a9d10
+Revises: 73e36742e29b
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c41f7e2a9d10"
+down_revision = "73e36742e29b"
+branch_labels = None
+depends_on = None
+
+NODES = "subtask_flow_nodes"
+EDGES = "subtask_flow_edges"
+UQ_EDGE = "uq_flow_edge"
+IX_TO = "ix_subtask_flow_edges_to_id"
+FK_FROM = "fk_flow_edges_from_node"
+FK_TO = "fk_flow_edges_to_node"
+
+
+def _table_exists(insp, name: str) -> bool:
+    try:
+        return name in insp.get_table_names()
+    except Exception:
+        return False
+
+
+def _index_exists(insp, table: str, index_name: str) -> bool:
+    try:
+        return any(i.get("name") == index_name for i in insp.get_indexes(table))
+    except Exception:
+        return False
+
+
+def _uq_exists(insp, table: str, uq_name: str) -> bool:
+    try:
+        return any(u.get("name") == uq_name for u in insp.get_unique_constraints(table))
+    except Exception:
+        return False
+
+
+def _node_fks(insp):
+    """FKs de EDGES apontando para NODES em from_id/to_id."""
+    try:
+        return [
+            fk for fk in insp.get_foreign_keys(EDGES)
+            if fk.get("referred_table") == NODES
+            and set(fk.get("constrained_columns") or []) & {"from_id", "to_id"}
+        ]
+    except Exception:
+        return []
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if not (_table_exists(insp, EDGES) and _table_exists(insp, NODES)):
+        return
+
+    # 1) remove arestas órfãs e duplicadas (mantém o menor id)
+    op.execute(
+        f"DELETE FROM {EDGES} WHERE from_id NOT IN (SELECT id FROM {NODES}) "
+        f"OR to_id NOT IN (SELECT id FROM {NODES})"
+    )
+    op.execute(
+        f"DELETE FROM {EDGES} WHERE id NOT IN ("
+        f"  SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {EDGES} "
+        f"  GROUP BY subtask_id, from_id, to_id) AS k)"
+    )
+
+    # 2) UNIQUE (subtask_id, from_id, to_id) — também atende 'subtask_id = ? AND from_id = ?'
+    if not _uq_exists(insp, EDGES, UQ_EDGE) and not _index_exists(insp, EDGES, UQ_EDGE):
+        op.create_index(UQ_EDGE, EDGES, ["subtask_id", "from_id", "to_id"], unique=True)
+
+    # 3) índice em to_id (lado 'to_id = ?' da exclusão de nó)
+    if not _index_exists(insp, EDGES, IX_TO):
+        op.create_index(IX_TO, EDGES, ["to_id"], unique=False)
+
+    # 4) FKs com ON DELETE CASCADE (recria se já existirem sem cascade)
+    with op.batch_alter_table(EDGES) as batch_op:
+        for fk in _node_fks(insp):
+            if fk.get("name"):
+                batch_op.drop_constraint(fk["name"], type_="foreignkey")
+        batch_op.create_foreign_key(FK_FROM, NODES, ["from_id"], ["id"], ondelete="CASCADE")
+        batch_op.create_foreign_key(FK_TO, NODES, ["to_id"], ["id"], ondelete="CASCADE")
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if not _table_exists(insp, EDGES):
+        return
+
+    with op.batch_alter_table(EDGES) as batch_op:
+        for name in (FK_FROM, FK_TO):
+            try:
+                batch_op.drop_constraint(name, type_="foreignkey")
+            except Exception:
+                pass
+
+    if _index_exists(insp, EDGES, IX_TO):
+        op.drop_index(IX_TO, table_name=EDGES)
+    if _index_exists(insp, EDGES, UQ_EDGE):
+        op.drop_index(UQ_EDGE, table_name=EDGES)
@@ -0,0 +1,44 @@
+"""task_logs: índices para feed de atividade e worklog
+
+Revision ID: d7a3b9e15c62
+Revises: c41f7e2a9d10
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7a3b9e15c62"
+down_revision = "c41f7e2a9d10"
+branch_labels = None
+depends_on = None
+
+TBL = "task_logs"
+IX_TASK_CREATED = "ix_task_logs_task_created"
+IX_DATE_AUTHOR = "ix_task_logs_date_author"
+
+
+def _index_exists(insp, table: str, index_name: str) -> bool:
+    try:
+        return any(i.get("name") == index_name for i in insp.get_indexes(table))
+    except Exception:
+        return False
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    # keyset (task_id, created_at, id) do feed de atividade
+    if not _index_exists(insp, TBL, IX_TASK_CREATED):
+        op.create_index(IX_TASK_CREATED, TBL, ["task_id", "created_at", "id"], unique=False)
+    # agregação diária por atendente (faixa de log_date)
+    if not _index_exists(insp, TBL, IX_DATE_AUTHOR):
+        op.create_index(IX_DATE_AUTHOR, TBL, ["log_date", "author_id"], unique=False)
+
+
+def downgrade():
+    insp = sa.inspect(op.get_bind())
+    if _index_exists(insp, TBL, IX_DATE_AUTHOR):
+        op.drop_index(IX_DATE_AUTHOR, table_name=TBL)
+    if _index_exists(insp, TBL, IX_TASK_CREATED):
+        op.drop_index(IX_TASK_CREATED, table_name=TBL)
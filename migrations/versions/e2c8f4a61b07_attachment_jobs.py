@@ -0,0 +1,47 @@
+"""attachment_jobs: fila de pós-processamento de anexos
+
+Revision ID: e2c8f4a61b07
+Revises: d7a3b9e15c62
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "e2c8f4a61b07"
+down_revision = "d7a3b9e15c62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "attachment_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("attachment_id", sa.Integer(), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result", sa.Text().with_variant(mysql.LONGTEXT(), "mysql"), nullable=True),  # texto extraído (até ATTACHMENT_TEXT_MAX_CHARS)
+        sa.Column("error", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["attachment_id"], ["attachments.id"], ondelete="CASCADE"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    op.create_index("ix_attachment_jobs_attachment_id", "attachment_jobs", ["attachment_id"])
+    op.create_index("ix_attachment_jobs_ticket_id", "attachment_jobs", ["ticket_id"])
+    op.create_index("ix_attachment_jobs_status_id", "attachment_jobs", ["status", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_attachment_jobs_status_id", table_name="attachment_jobs")
+    op.drop_index("ix_attachment_jobs_ticket_id", table_name="attachment_jobs")
+    op.drop_index("ix_attachment_jobs_attachment_id", table_name="attachment_jobs")
+    op.drop_table("attachment_jobs")
@@ -0,0 +1,34 @@
+"""attachment_blobs: blob store deduplicado (SHA-256 + contador de referências)
+
+Revision ID: f5d1a8c3e940
+Revises: e2c8f4a61b07
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f5d1a8c3e940"
+down_revision = "e2c8f4a61b07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "attachment_blobs",
+        sa.Column("sha256", sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_unicode_ci",
+    )
+    op.create_index("ix_attachment_blobs_refcount", "attachment_blobs", ["refcount"])
+
+
+def downgrade():
+    op.drop_index("ix_attachment_blobs_refcount", table_name="attachment_blobs")
+    op.drop_table("attachment_blobs")
@@ -0,0 +1,210 @@
+# services/assignment.py
+"""
+Atribuição automática de chamados.
+
+Estratégias (AUTOASSIGN_STRATEGY):
+  - least_load   : atendente com menos chamados não finalizados (empate: rodízio)
+  - round_robin  : rodízio simples entre os candidatos
+Regras por prioridade (AUTOASSIGN_PRIORITY_ROLES): limita os papéis elegíveis,
+ex.: {"urgent": ["gestor", "admin"]}. AUTOASSIGN_EXCLUDE_IDS tira atendentes da fila.
+
+A carga fica em memória (por processo): montada com um GROUP BY e depois
+ajustada a cada atribuição/mudança de status — nenhuma contagem por decisão.
+Reconstruída a cada AUTOASSIGN_LOAD_TTL s para corrigir desvios entre processos.
+
+    flask --app app:app tickets autoassign             # distribui os chamados sem atendente
+    flask --app app:app tickets autoassign --dry-run   # só mostra a distribuição
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from extensions import db
+from models import Ticket
+from services.directory import agents
+from utils.audit import write_audit
+
+Candidate = Tuple[int, str]  # (user_id, role)
+
+
+def assignee_of(ticket) -> Optional[int]:
+    return getattr(ticket, "assignee_id", None) or getattr(ticket, "agent_id", None)
+
+
+def set_assignee(ticket, user_id: Optional[int]) -> None:
+    if hasattr(ticket, "assignee_id"):
+        ticket.assignee_id = user_id
+    elif hasattr(ticket, "agent_id"):
+        ticket.agent_id = user_id
+
+
+def _assignee_col():
+    col = getattr(Ticket, "assignee_id", None)
+    return col if col is not None else getattr(Ticket, "agent_id")
+
+
+class _LoadBoard:
+    def __init__(self):
+        self.lock = Lock()
+        self.loads: Dict[int, int] = {}
+        self.built_at = 0.0
+        self.rr_last: Optional[int] = None
+
+    def _ensure(self) -> None:
+        ttl = int(current_app.config.get("AUTOASSIGN_LOAD_TTL", 300))
+        if self.built_at and time.time() - self.built_at <= ttl:
+            return
+        col = _assignee_col()
+        rows = (db.session.query(col, func.count(Ticket.id))
+                .filter(col.isnot(None), Ticket.status != "closed")
+                .group_by(col))
+        self.loads = {int(a): int(n) for a, n in rows}
+        self.built_at = time.time()
+
+    def bump(self, agent_id: Optional[int], delta: int) -> None:
+        if not agent_id:
+            return
+        with self.lock:
+            if not self.built_at:
+                return  # ainda não montado: a próxima decisão lê do banco
+            self.loads[agent_id] = max(0, self.loads.get(agent_id, 0) + delta)
+
+    def snapshot(self) -> Dict[int, int]:
+        with self.lock:
+            self._ensure()
+            return dict(self.loads)
+
+    def pick(self, candidates: Sequence[int], strategy: str,
+             pending: Optional[Dict[int, int]] = None) -> Optional[int]:
+        """Não altera a carga: quem grava chama note_assigned depois do commit.
+        pending: atribuições ainda não gravadas (lote), somadas à carga só nesta decisão."""
+        if not candidates:
+            return None
+        ordered = sorted(candidates)
+        with self.lock:
+            self._ensure()
+            # rodízio: próximo id depois do último escolhido
+            start = 0
+            if self.rr_last is not None:
+                start = next((i for i, a in enumerate(ordered) if a > self.rr_last), 0)
+            rotation = ordered[start:] + ordered[:start]
+            if strategy == "round_robin":
+                chosen = rotation[0]
+            else:
+                extra = pending or {}
+                # min é estável: empate segue o rodízio
+                chosen = min(rotation, key=lambda a: self.loads.get(a, 0) + extra.get(a, 0))
+            self.rr_last = chosen
+            return chosen
+
+
+_board = _LoadBoard()
+
+
+def _eligible(candidates: Iterable[Candidate], priority: Optional[str]) -> List[int]:
+    cfg = current_app.config
+    excluded = {int(x) for x in cfg.get("AUTOASSIGN_EXCLUDE_IDS") or []}
+    roles = (cfg.get("AUTOASSIGN_PRIORITY_ROLES") or {}).get((priority or "").lower())
+    out = []
+    for uid, role in candidates:
+        if uid in excluded:
+            continue
+        if roles and (role or "").lower() not in roles:
+            continue
+        out.append(uid)
+    return out
+
+
+def choose_agent(ticket, candidates: Iterable[Candidate],
+                 pending: Optional[Dict[int, int]] = None) -> Optional[int]:
+    """Escolhe o atendente. None se não houver elegível. A carga só muda com
+    note_assigned após o commit; pending soma atribuições de um lote ainda não gravado."""
+    strategy = (current_app.config.get("AUTOASSIGN_STRATEGY") or "least_load").lower()
+    return _board.pick(_eligible(candidates, getattr(ticket, "priority", None)), strategy, pending)
+
+
+def current_loads() -> Dict[int, int]:
+    return _board.snapshot()
+
+
+# ============================
+# Ajustes incrementais (chamar após o commit)
+# ============================
+
+def note_assigned(old_id: Optional[int], new_id: Optional[int], status: Optional[str]) -> None:
+    if old_id == new_id or (status or "") == "closed":
+        return
+    _board.bump(old_id, -1)
+    _board.bump(new_id, +1)
+
+
+def note_status(agent_id: Optional[int], old: Optional[str], new: Optional[str]) -> None:
+    was_open, is_open = (old or "") != "closed", (new or "") != "closed"
+    if was_open and not is_open:
+        _board.bump(agent_id, -1)
+    elif is_open and not was_open:
+        _board.bump(agent_id, +1)
+
+
+# ============================
+# CLI
+# ============================
+
+tickets_cli = AppGroup("tickets", help="Operações em lote sobre chamados.")
+
+
+@tickets_cli.command("autoassign")
+@click.option("--limit", default=500, show_default=True, help="Máximo de chamados na varredura.")
+@click.option("--dry-run", is_flag=True, help="Só mostra a distribuição, sem gravar.")
+@click.option("--notify/--no-notify", default=True, show_default=True, help="Envia o e-mail de atribuição.")
+def autoassign_command(limit: int, dry_run: bool, notify: bool):
+    """Atribui os chamados não finalizados sem atendente (mais antigos primeiro)."""
+    col = _assignee_col()
+    tickets = (Ticket.query
+               .filter(col.is_(None), Ticket.status != "closed")
+               .order_by(Ticket.created_at.asc(), Ticket.id.asc())
+               .limit(limit)
+               .all())
+    candidates = [(a.id, a.role) for a in agents() if a.is_active]
+    plan = []
+    per_agent: Counter = Counter()
+    for t in tickets:
+        agent_id = choose_agent(t, candidates, per_agent)
+        if agent_id:
+            plan.append((t, agent_id))
+            per_agent[agent_id] += 1
+    if dry_run:
+        for t, agent_id in plan:
+            click.echo(f"#{t.id} [{t.priority}] -> usuário #{agent_id}")
+    else:
+        for t, agent_id in plan:
+            set_assignee(t, agent_id)
+            write_audit(
+                entity_type="Ticket",
+                entity_id=t.id,
+                action="assign",
+                message=f"Atribuído para usuário #{agent_id} (atribuição automática)",
+                before={"assignee_id": None},
+                after={"assignee_id": agent_id},
+            )
+        db.session.commit()
+        for t, agent_id in plan:
+            note_assigned(None, agent_id, t.status)
+        if notify and plan:
+            # links dos e-mails saem de MAIL_BASE_URL (services/mail_render.ticket_url)
+            from services.notify import notify_event
+            from services.recipients import ticket_recipients
+
+            for t, _ in plan:
+                notify_event("assigned", t, ticket_recipients(t.id, reporter=True, assignee=True))
+    click.echo(f"autoassign: {len(plan)}/{len(tickets)} chamado(s) "
+               f"{'seriam atribuídos' if dry_run else 'atribuídos'} "
+               + ", ".join(f"#{a}={n}" for a, n in sorted(per_agent.items())))
@@ -0,0 +1,188 @@
+# services/business_hours.py
+"""
+Calendário de expediente para os prazos de SLA.
+
+- expediente por dia da semana (BUSINESS_HOURS / BUSINESS_DAYS), no fuso BUSINESS_TZ
+- feriados: BUSINESS_HOLIDAYS (config) + tabela business_holidays
+- tabela pré-calculada: minutos úteis ACUMULADOS até o início de cada dia
+  (2000–2100). "somar horas úteis" vira uma busca binária nessa tabela e
+  "horas úteis entre a e b" é uma subtração — nada de iterar minuto a minuto.
+
+As datas do banco são UTC ingênuas (datetime.utcnow); a conversão é feita aqui.
+"""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import current_app
+
+from extensions import db
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # Python < 3.9
+    ZoneInfo = None
+
+_EPOCH = date(2000, 1, 1)
+_LAST = date(2100, 12, 31)
+
+Interval = Tuple[int, int]  # minutos desde 00:00 (início, fim)
+
+
+class BusinessHoliday(db.Model):
+    __tablename__ = "business_holidays"
+
+    day = db.Column(db.Date, primary_key=True)
+    name = db.Column(db.String(120), nullable=True)
+
+
+def parse_hours(spec: str) -> List[Interval]:
+    """'08:00-12:00,13:00-18:00' -> [(480, 720), (780, 1080)]"""
+    out: List[Interval] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        a, b = part.split("-")
+        ha, ma = (int(x) for x in a.strip().split(":"))
+        hb, mb = (int(x) for x in b.strip().split(":"))
+        start, end = ha * 60 + ma, hb * 60 + mb
+        if end > start:
+            out.append((start, end))
+    return sorted(out)
+
+
+class BusinessCalendar:
+    def __init__(self, week: Dict[int, List[Interval]], holidays: Iterable[date], tz=None):
+        self.week = {wd: sorted(week.get(wd, [])) for wd in range(7)}
+        self.holidays: Set[date] = set(holidays)
+        self.tz = tz
+        ndays = (_LAST - _EPOCH).days + 1
+        self.cum: List[int] = [0] * (ndays + 1)
+        total = 0
+        for i in range(ndays):
+            self.cum[i] = total
+            total += self._day_minutes(_EPOCH + timedelta(days=i))
+        self.cum[ndays] = total
+
+    def _intervals(self, d: date) -> List[Interval]:
+        return [] if d in self.holidays else self.week[d.weekday()]
+
+    def _day_minutes(self, d: date) -> int:
+        return sum(e - s for s, e in self._intervals(d))
+
+    # --- fuso ---
+    def _to_local(self, dt: datetime) -> datetime:
+        if self.tz is None:
+            return dt.replace(tzinfo=None)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(self.tz).replace(tzinfo=None)
+
+    def _to_utc(self, local: datetime) -> datetime:
+        if self.tz is None:
+            return local
+        return local.replace(tzinfo=self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+    # --- tabela ---
+    def _index(self, d: date) -> int:
+        i = (d - _EPOCH).days
+        if i < 0 or i >= len(self.cum) - 1:
+            raise ValueError(f"data fora do calendário: {d}")
+        return i
+
+    def _cum_at(self, local: datetime) -> float:
+        """Minutos úteis desde _EPOCH até `local`."""
+        d = local.date()
+        m = local.hour * 60 + local.minute + local.second / 60 + local.microsecond / 60e6
+        worked = sum(min(max(m - s, 0), e - s) for s, e in self._intervals(d))
+        return self.cum[self._index(d)] + worked
+
+    def _from_cum(self, target: float) -> datetime:
+        """Instante local em que o acumulado atinge `target` (fim do expediente se exato)."""
+        i = bisect_left(self.cum, target)
+        day = max(i - 1, 0)
+        d = _EPOCH + timedelta(days=day)
+        r = target - self.cum[day]
+        for s, e in self._intervals(d):
+            if r <= e - s:
+                return datetime.combine(d, datetime.min.time()) + timedelta(minutes=s + r)
+            r -= e - s
+        return datetime.combine(d, datetime.min.time())  # não ocorre com tabela consistente
+
+    # --- API ---
+    def add(self, start: datetime, hours: float) -> datetime:
+        """start (UTC) + `hours` horas úteis -> UTC."""
+        local = self._to_local(start)
+        return self._to_utc(self._from_cum(self._cum_at(local) + hours * 60))
+
+    def between(self, a: datetime, b: datetime) -> float:
+        """Horas úteis entre a e b (UTC); negativo se b < a."""
+        return (self._cum_at(self._to_local(b)) - self._cum_at(self._to_local(a))) / 60
+
+
+# ============================
+# Calendário da aplicação (em cache)
+# ============================
+
+_cache: Dict[str, object] = {"cal": None, "at": 0.0}
+_cache_lock = Lock()
+
+
+def _load_holidays() -> Set[date]:
+    days: Set[date] = set()
+    for raw in current_app.config.get("BUSINESS_HOLIDAYS") or []:
+        try:
+            days.add(date.fromisoformat(str(raw).strip()))
+        except ValueError:
+            current_app.logger.warning("BUSINESS_HOLIDAY_INVALID %r", raw)
+    try:
+        days.update(d for (d,) in db.session.query(BusinessHoliday.day))
+    except Exception:
+        db.session.rollback()  # tabela ainda não migrada
+    return days
+
+
+def _build() -> BusinessCalendar:
+    cfg = current_app.config
+    hours = parse_hours(cfg.get("BUSINESS_HOURS", "08:00-12:00,13:00-18:00"))
+    workdays = {int(x) for x in cfg.get("BUSINESS_DAYS", (0, 1, 2, 3, 4))}
+    week = {wd: (hours if wd in workdays else []) for wd in range(7)}
+    tz = None
+    tz_name = cfg.get("BUSINESS_TZ")
+    if tz_name and ZoneInfo is not None:
+        try:
+            tz = ZoneInfo(tz_name)
+        except Exception:
+            current_app.logger.warning("BUSINESS_TZ inválido: %s (usando UTC)", tz_name)
+    return BusinessCalendar(week, _load_holidays(), tz)
+
+
+def calendar() -> BusinessCalendar:
+    """Calendário atual; reconstruído a cada BUSINESS_CALENDAR_TTL s (novos feriados)."""
+    ttl = int(current_app.config.get("BUSINESS_CALENDAR_TTL", 3600))
+    with _cache_lock:
+        cal = _cache["cal"]
+        if cal is None or time.time() - float(_cache["at"]) > ttl:
+            cal = _build()
+            _cache["cal"], _cache["at"] = cal, time.time()
+        return cal
+
+
+def invalidate() -> None:
+    with _cache_lock:
+        _cache["cal"] = None
+
+
+def add_business_hours(start: datetime, hours: float) -> datetime:
+    return calendar().add(start, hours)
+
+
+def business_hours_between(a: datetime, b: Optional[datetime]) -> Optional[float]:
+    if a is None or b is None:
+        return None
+    return calendar().between(a, b)
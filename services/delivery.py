@@ -0,0 +1,88 @@
+# services/delivery.py
+"""
+Entrega de arquivos de upload.
+
+UPLOADS_OFFLOAD define quem transfere os bytes depois da checagem de permissão:
+  - ""         -> o próprio Flask (send_file com Range/ETag/Last-Modified/304)
+  - "accel"    -> nginx: X-Accel-Redirect para UPLOADS_ACCEL_PREFIX (location internal)
+  - "sendfile" -> Apache/lighttpd: X-Sendfile com o caminho absoluto
+
+Exemplo nginx:
+    location /_uploads/ { internal; alias /srv/chamados/uploads/; }
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from flask import current_app, send_file
+
+from services.storage import uploads_base
+
+
+def _content_disposition(as_attachment: bool, download_name: Optional[str]) -> Optional[str]:
+    if not download_name:
+        return "attachment" if as_attachment else None
+    kind = "attachment" if as_attachment else "inline"
+    try:
+        download_name.encode("ascii")
+        safe = download_name.replace("\\", "\\\\").replace('"', '\\"')
+        return f'{kind}; filename="{safe}"'
+    except UnicodeEncodeError:
+        ascii_name = download_name.encode("ascii", "ignore").decode("ascii") or "arquivo"
+        return f"{kind}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}"
+
+
+def send_upload(
+    path: Path,
+    *,
+    download_name: Optional[str] = None,
+    mimetype: Optional[str] = None,
+    as_attachment: bool = False,
+    etag: Optional[str] = None,
+    immutable: bool = False,
+):
+    """
+    Responde com o arquivo `path` (dentro de UPLOADS_DIR).
+    etag: use o SHA-256 do blob quando houver (ETag forte, estável entre servidores).
+    immutable: conteúdo endereçado por hash -> cache longo no navegador.
+    """
+    cfg = current_app.config
+    mode = (cfg.get("UPLOADS_OFFLOAD") or "").strip().lower()
+    max_age = int(cfg.get("UPLOADS_CACHE_MAX_AGE", 31536000)) if immutable else 0
+
+    if mode in ("accel", "sendfile"):
+        st = path.stat()
+        resp = current_app.response_class(status=200)
+        resp.headers["Content-Type"] = mimetype or "application/octet-stream"
+        disp = _content_disposition(as_attachment, download_name)
+        if disp:
+            resp.headers["Content-Disposition"] = disp
+        if mode == "accel":
+            rel = path.resolve().relative_to(uploads_base().resolve()).as_posix()
+            prefix = (cfg.get("UPLOADS_ACCEL_PREFIX") or "/_uploads/").rstrip("/")
+            resp.headers["X-Accel-Redirect"] = f"{prefix}/{quote(rel)}"
+        else:
+            resp.headers["X-Sendfile"] = str(path.resolve())
+        resp.set_etag(etag or f"{int(st.st_mtime)}-{st.st_size}")
+        resp.last_modified = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        resp.cache_control.private = True
+        if max_age:
+            resp.cache_control.max_age = max_age
+        return resp
+
+    # fallback em Python: conditional=True trata Range (206), If-None-Match e
+    # If-Modified-Since (304) sem ler o arquivo inteiro
+    resp = send_file(
+        str(path),
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=etag if etag else True,
+        max_age=max_age or None,
+    )
+    resp.cache_control.private = True
+    return resp
@@ -0,0 +1,252 @@
+# services/digest.py
+"""
+Resumo (digest) de notificações por usuário.
+
+Cada usuário escolhe a entrega: imediata (padrão), de hora em hora ou diária.
+Para quem não é imediato, os eventos de DIGEST_EVENTS (padrão: respostas e
+mudanças de status) vão para a tabela digest_events em vez de virar um e-mail
+cada; o job junta tudo numa única mensagem por usuário e período.
+
+    flask --app app:app digest send --mode hourly   # cron: 0 * * * *
+    flask --app app:app digest send --mode daily    # cron: 0 8 * * *
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from extensions import db
+from models import Ticket, User
+from services.mail_render import status_pt, ticket_url
+
+MODES = ("immediate", "hourly", "daily")
+MODE_LABELS = {"immediate": "Imediato", "hourly": "Resumo a cada hora", "daily": "Resumo diário"}
+EVENT_LABELS = {
+    "created": "Chamado criado",
+    "assigned": "Atribuído",
+    "status": "Status alterado",
+    "reply": "Nova resposta",
+    "attachment": "Novo anexo",
+}
+
+
+class NotificationPref(db.Model):
+    __tablename__ = "notification_prefs"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    mode = db.Column(db.String(16), nullable=False, default="immediate")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DigestEvent(db.Model):
+    __tablename__ = "digest_events"
+    __table_args__ = (
+        db.Index("ix_digest_events_pending", "sent_at", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False)
+    event = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=True)   # status do chamado no momento do evento
+    detail = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+
+# ============================
+# Preferência
+# ============================
+
+def get_mode(user_id: int) -> str:
+    pref = db.session.get(NotificationPref, user_id)
+    return pref.mode if pref else "immediate"
+
+
+def set_mode(user_id: int, mode: str) -> None:
+    if mode not in MODES:
+        raise ValueError(mode)
+    pref = db.session.get(NotificationPref, user_id)
+    if pref is None:
+        pref = NotificationPref(user_id=user_id)
+        db.session.add(pref)
+    pref.mode = mode
+    pref.updated_at = datetime.utcnow()
+
+
+# ============================
+# Enfileiramento
+# ============================
+
+def defer_recipients(event: str, ticket: Ticket, recipients: Iterable[str], detail: str = "") -> List[str]:
+    """
+    Guarda o evento para os destinatários em modo resumo e devolve os que
+    continuam recebendo na hora (inclusive e-mails sem usuário cadastrado).
+
+    Roda depois do commit da ação: qualquer erro aqui é desfeito e logado, e
+    todos recebem na hora — a notificação nunca derruba a requisição.
+    """
+    recipients = [e for e in recipients if e]
+    cfg = current_app.config
+    if not recipients or not cfg.get("DIGEST_ENABLED", True) or event not in (cfg.get("DIGEST_EVENTS") or ()):
+        return recipients
+    try:
+        return _defer(event, ticket, recipients, detail)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("DIGEST_DEFER_FAIL ticket=%s event=%s", getattr(ticket, "id", None), event)
+        return recipients
+
+
+def _defer(event: str, ticket: Ticket, recipients: List[str], detail: str) -> List[str]:
+    lowered = {e.strip().lower() for e in recipients}
+    rows = (db.session.query(User.id, func.lower(User.email))
+            .join(NotificationPref, NotificationPref.user_id == User.id)
+            .filter(func.lower(User.email).in_(lowered), NotificationPref.mode != "immediate")
+            .all())
+    if not rows:
+        return recipients
+    now = datetime.utcnow()
+    db.session.add_all([
+        DigestEvent(user_id=uid, ticket_id=ticket.id, event=event, status=ticket.status,
+                    detail=(detail or "").strip()[:2000] or None, created_at=now)
+        for uid, _ in rows
+    ])
+    db.session.commit()
+    deferred = {email for _, email in rows}
+    return [e for e in recipients if e.strip().lower() not in deferred]
+
+
+# ============================
+# Envio dos resumos
+# ============================
+
+def _pending_users(mode: str, limit: int) -> List[int]:
+    q = (db.session.query(DigestEvent.user_id)
+         .outerjoin(NotificationPref, NotificationPref.user_id == DigestEvent.user_id)
+         .filter(DigestEvent.sent_at.is_(None)))
+    if mode == "daily":
+        q = q.filter(NotificationPref.mode == "daily")
+    else:
+        # de hora em hora leva também o que sobrou de quem voltou para "imediato"
+        q = q.filter((NotificationPref.mode.is_(None)) | (NotificationPref.mode != "daily"))
+    return [uid for (uid,) in q.group_by(DigestEvent.user_id).order_by(DigestEvent.user_id).limit(limit)]
+
+
+def _render(user: User, tickets: "OrderedDict[int, Tuple[Ticket, List[DigestEvent]]]", mode: str) -> Tuple[str, str, str]:
+    total = sum(len(evs) for _, evs in tickets.values())
+    period = "da última hora" if mode == "hourly" else "do dia"
+    subject = f"[Chamados] Resumo {period}: {total} atualização(ões) em {len(tickets)} chamado(s)"
+    items = []
+    text = [subject, ""]
+    for ticket, evs in tickets.values():
+        link = ticket_url(ticket.id)
+        rows = [{
+            "label": EVENT_LABELS.get(e.event, e.event),
+            "at": e.created_at.strftime("%d/%m %H:%M"),
+            "status": status_pt(e.status) if e.event == "status" else None,
+            "detail": e.detail,
+        } for e in evs]
+        items.append({"ticket": ticket, "status": status_pt(ticket.status), "link": link, "events": rows})
+        text.append(f"#{ticket.id} {ticket.title} — {status_pt(ticket.status)}")
+        for r in rows:
+            text.append(f"  {r['at']} {r['label']}" + (f": {r['status']}" if r["status"] else ""))
+            if r["detail"]:
+                text.append(f"    {r['detail'][:300]}")
+        text += [f"  {link}", ""]
+    html = current_app.jinja_env.get_template("email/digest.html").render(
+        subject=subject, user=user, items=items, period=period)
+    return subject, html, "\n".join(text)
+
+
+def _release(ids: List[int], claimed_at: datetime) -> None:
+    """Desfaz a reserva feita por esta execução (sent_at = horário da reserva)."""
+    (DigestEvent.query
+     .filter(DigestEvent.id.in_(ids), DigestEvent.sent_at == claimed_at)
+     .update({DigestEvent.sent_at: None}, synchronize_session=False))
+    db.session.commit()
+
+
+def send_digests(mode: str, *, max_users: int = 500) -> Tuple[int, int]:
+    """Envia um resumo por usuário com eventos pendentes. Retorna (usuários, eventos)."""
+    from services.notify import send_email
+
+    if not current_app.config.get("MAIL_ENABLED", False):
+        # sem envio possível: os eventos ficam pendentes para a próxima execução
+        current_app.logger.info("DIGEST_SKIP_MAIL_DISABLED %s", mode)
+        return 0, 0
+    users_sent = events_sent = 0
+    for uid in _pending_users(mode, max_users):
+        user = db.session.get(User, uid)
+        events = (DigestEvent.query
+                  .filter(DigestEvent.user_id == uid, DigestEvent.sent_at.is_(None))
+                  .order_by(DigestEvent.ticket_id.asc(), DigestEvent.id.asc())
+                  .all())
+        if not events:
+            continue
+        # reserva antes de enviar: outra execução concorrente não pega os mesmos
+        # (sem microssegundos: DATETIME do MySQL os descarta e _release compara por igualdade)
+        now = datetime.utcnow().replace(microsecond=0)
+        claimed_ids = [e.id for e in events]
+        claimed = (DigestEvent.query
+                   .filter(DigestEvent.id.in_(claimed_ids), DigestEvent.sent_at.is_(None))
+                   .update({DigestEvent.sent_at: now}, synchronize_session=False))
+        db.session.commit()
+        if claimed != len(events):
+            _release(claimed_ids, now)  # outra execução pegou parte; ela ou a próxima envia
+            continue
+        if user is None or not user.email:
+            continue
+        by_id: Dict[int, Ticket] = {t.id: t for t in Ticket.query.filter(Ticket.id.in_({e.ticket_id for e in events}))}
+        grouped: "OrderedDict[int, Tuple[Ticket, List[DigestEvent]]]" = OrderedDict()
+        for e in events:
+            t = by_id.get(e.ticket_id)
+            if t is not None:
+                grouped.setdefault(t.id, (t, []))[1].append(e)
+        if not grouped:
+            continue
+        try:
+            subject, html, text = _render(user, grouped, mode)
+            sent = send_email(subject, [user.email], html, text)
+        except Exception:
+            current_app.logger.exception("DIGEST_RENDER_FAIL user=%s", uid)
+            sent = False
+        if not sent:
+            _release(claimed_ids, now)  # volta para a fila: a próxima execução tenta de novo
+            continue
+        users_sent += 1
+        events_sent += len(events)
+    return users_sent, events_sent
+
+
+def prune(days: int) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    n = (DigestEvent.query
+         .filter(DigestEvent.sent_at.isnot(None), DigestEvent.sent_at < cutoff)
+         .delete(synchronize_session=False))
+    db.session.commit()
+    return n
+
+
+# ============================
+# CLI
+# ============================
+
+digest_cli = AppGroup("digest", help="Resumos de notificações por e-mail.")
+
+
+@digest_cli.command("send")
+@click.option("--mode", type=click.Choice(["hourly", "daily"]), required=True,
+              help="Período dos usuários a atender.")
+@click.option("--max-users", default=500, show_default=True)
+def send_command(mode: str, max_users: int):
+    """Envia os resumos pendentes (uma mensagem por usuário)."""
+    users, events = send_digests(mode, max_users=max_users)
+    removed = prune(int(current_app.config.get("DIGEST_RETENTION_DAYS", 7)))
+    click.echo(f"digest: {users} resumo(s), {events} evento(s); {removed} antigo(s) removido(s)")
@@ -0,0 +1,81 @@
+# services/directory.py
+"""
+Diretório de atendentes (agent/gestor/admin) em cache por processo.
+
+Substitui a consulta de User filtrada por perfil e ordenada que as telas de
+chamado e o kanban faziam a cada requisição:
+  - agents()      : lista ordenada por nome/e-mail (para os <select>)
+  - agent(id)     : busca O(1) por id
+  - agent_label() : nome exibido do atendente
+
+Recarregado a cada AGENT_DIRECTORY_TTL s; invalidate() após criar/editar/excluir
+usuário no admin (os demais processos pegam a mudança pelo TTL).
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from extensions import db
+from models import User
+from services.sla import STAFF_ROLES
+
+
+@dataclass(frozen=True)
+class Agent:
+    id: int
+    name: Optional[str]
+    email: Optional[str]
+    role: str
+    is_active: bool = True
+
+    @property
+    def label(self) -> str:
+        return self.name or self.email or f"#{self.id}"
+
+
+_cache: Dict[str, object] = {"list": None, "by_id": None, "at": 0.0}
+_cache_lock = Lock()
+
+
+def _load() -> Tuple[List[Agent], Dict[int, Agent]]:
+    rows = (db.session.query(User.id, User.name, User.email, User.role, User.is_active)
+            .filter(User.role.in_(STAFF_ROLES))
+            .order_by(User.name.asc(), User.email.asc()))
+    ordered = [Agent(uid, name, email, (role or "").lower(), active is not False)
+               for uid, name, email, role, active in rows]
+    return ordered, {a.id: a for a in ordered}
+
+
+def _snapshot() -> Tuple[List[Agent], Dict[int, Agent]]:
+    ttl = int(current_app.config.get("AGENT_DIRECTORY_TTL", 300))
+    with _cache_lock:
+        if _cache["list"] is None or time.time() - float(_cache["at"]) > ttl:
+            _cache["list"], _cache["by_id"] = _load()
+            _cache["at"] = time.time()
+        return _cache["list"], _cache["by_id"]  # type: ignore[return-value]
+
+
+def agents() -> List[Agent]:
+    """Atendentes ordenados por nome/e-mail (lista compartilhada: não alterar)."""
+    return _snapshot()[0]
+
+
+def agent(user_id: Optional[int]) -> Optional[Agent]:
+    if not user_id:
+        return None
+    return _snapshot()[1].get(user_id)
+
+
+def agent_label(user_id: Optional[int]) -> Optional[str]:
+    a = agent(user_id)
+    return a.label if a else None
+
+
+def invalidate() -> None:
+    with _cache_lock:
+        _cache["list"] = _cache["by_id"] = None
@@ -0,0 +1,85 @@
+# services/identity.py
+"""
+Identidade do usuário logado em cache (user_loader do Flask-Login).
+
+O user_loader rodava User.query.get() em toda requisição autenticada — inclusive
+nas chamadas JSON do kanban. Agora devolve um objeto leve e imutável
+(id, nome, e-mail, perfil, ativo) guardado por LOGIN_CACHE_TTL s por processo.
+
+current_user deixa de ser um objeto do ORM: quem precisar alterar o usuário
+deve carregá-lo (db.session.get(User, current_user.id)). Edição/exclusão no
+admin chama invalidate(id); nos demais processos vale o TTL.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+
+from extensions import db
+from models import User
+
+_MAX_ENTRIES = 5000
+
+
+@dataclass(frozen=True)
+class Identity:
+    id: int
+    name: Optional[str]
+    email: Optional[str]
+    role: Optional[str]
+    is_active: bool = True
+    username: Optional[str] = None
+
+    # interface esperada pelo Flask-Login
+    is_authenticated = True
+    is_anonymous = False
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+
+_cache: Dict[int, Tuple[Identity, float]] = {}
+_cache_lock = Lock()
+
+
+def _fetch(user_id: int) -> Optional[Identity]:
+    cols = [User.id, User.name, User.email, User.role, User.is_active]
+    username = getattr(User, "username", None)
+    if username is not None:
+        cols.append(username)
+    row = db.session.query(*cols).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return Identity(row[0], row[1], row[2], row[3], row[4] is not False,
+                    row[5] if len(row) > 5 else None)
+
+
+def load_identity(user_id: int) -> Optional[Identity]:
+    ttl = float(current_app.config.get("LOGIN_CACHE_TTL", 60))
+    now = time.time()
+    with _cache_lock:
+        hit = _cache.get(user_id)
+        if hit and hit[1] > now:
+            return hit[0]
+    ident = _fetch(user_id)
+    if ident is None:
+        invalidate(user_id)
+        return None
+    with _cache_lock:
+        if len(_cache) >= _MAX_ENTRIES:
+            _cache.clear()
+        _cache[user_id] = (ident, now + ttl)
+    return ident
+
+
+def invalidate(user_id: Optional[int] = None) -> None:
+    """Esquece um usuário (ou todos, sem argumento)."""
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
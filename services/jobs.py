@@ -0,0 +1,261 @@
+# services/jobs.py
+"""
+Fila de pós-processamento de anexos (tabela attachment_jobs) + comando `flask worker`.
+
+O upload só grava o arquivo e enfileira os jobs na MESMA transação do Attachment;
+o worker (processo separado) executa checksum, extração de texto e miniaturas.
+
+    flask --app app:app worker            # loop contínuo
+    flask --app app:app worker --once     # processa o que houver e sai
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+from extensions import db
+from models import Attachment, Ticket
+from services.storage import attachment_path, blob_sha, uploads_base
+from services.search import index_ticket
+from services.thumbs import ensure_thumbnail
+
+# Bibliotecas opcionais (o job correspondente é ignorado se ausentes)
+try:
+    from pypdf import PdfReader
+except Exception:
+    PdfReader = None
+
+_IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+_TEXT_EXTS = {".txt", ".log", ".csv"}
+_PDF_EXTS = {".pdf"}
+
+
+class AttachmentJob(db.Model):
+    __tablename__ = "attachment_jobs"
+    __table_args__ = (db.Index("ix_attachment_jobs_status_id", "status", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    attachment_id = db.Column(db.Integer, db.ForeignKey("attachments.id", ondelete="CASCADE"),
+                              nullable=False, index=True)
+    ticket_id = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text().with_variant(LONGTEXT(), "mysql"), nullable=True)  # TEXT do MySQL para em 64 KB
+    error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def as_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "attachment_id": self.attachment_id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# ============================
+# Caminhos
+# ============================
+
+def attachment_file(att) -> Path:
+    return attachment_path(att.ticket_id, att.stored_name)
+
+
+def _ext_of(att) -> str:
+    return Path(att.original_name or att.stored_name or "").suffix.lower()
+
+
+# ============================
+# Handlers
+# ============================
+
+def _job_checksum(att, path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _job_text(att, path: Path) -> Optional[str]:
+    limit = int(current_app.config.get("ATTACHMENT_TEXT_MAX_CHARS", 200_000))
+    ext = _ext_of(att)
+    if ext in _TEXT_EXTS:
+        with path.open("r", encoding="utf-8", errors="replace") as fh:
+            return fh.read(limit)
+    if ext in _PDF_EXTS:
+        if PdfReader is None:
+            return None
+        parts: List[str] = []
+        total = 0
+        for page in PdfReader(str(path)).pages:
+            txt = page.extract_text() or ""
+            parts.append(txt)
+            total += len(txt)
+            if total >= limit:
+                break
+        return "\n".join(parts)[:limit]
+    return None
+
+
+def _job_thumbnail(att, path: Path) -> Optional[str]:
+    # gera antecipadamente as variantes mais usadas; as demais saem sob demanda
+    done = {}
+    for size in current_app.config.get("THUMBNAIL_EAGER_SIZES", (128,)):
+        dst = ensure_thumbnail(att, int(size))
+        if dst is not None:
+            done[int(size)] = str(dst.relative_to(uploads_base()))
+    return json.dumps(done) if done else None
+
+
+HANDLERS: Dict[str, Callable] = {
+    "checksum": _job_checksum,
+    "text": _job_text,
+    "thumbnail": _job_thumbnail,
+}
+
+
+def kinds_for(att) -> List[str]:
+    ext = _ext_of(att)
+    # no blob store o SHA-256 já é o nome do arquivo
+    kinds = [] if blob_sha(att.stored_name) else ["checksum"]
+    if ext in _TEXT_EXTS or ext in _PDF_EXTS:
+        kinds.append("text")
+    if ext in _IMAGE_EXTS:
+        kinds.append("thumbnail")
+    return kinds
+
+
+# ============================
+# Fila
+# ============================
+
+def enqueue_attachment_jobs(att) -> List[AttachmentJob]:
+    """Enfileira os jobs do anexo (pendente de commit, mesma transação do upload)."""
+    if att.id is None:
+        db.session.flush()
+    jobs = [AttachmentJob(attachment_id=att.id, ticket_id=att.ticket_id, kind=k) for k in kinds_for(att)]
+    db.session.add_all(jobs)
+    return jobs
+
+
+def jobs_by_attachment(att_ids: Iterable[int]) -> Dict[int, List[AttachmentJob]]:
+    """Status dos jobs por anexo (uma consulta) para a tela do chamado."""
+    ids = [i for i in att_ids if i]
+    if not ids:
+        return {}
+    out: Dict[int, List[AttachmentJob]] = {}
+    rows = (AttachmentJob.query
+            .filter(AttachmentJob.attachment_id.in_(ids))
+            .order_by(AttachmentJob.id.asc())
+            .all())
+    for j in rows:
+        out.setdefault(j.attachment_id, []).append(j)
+    return out
+
+
+def claim_jobs(limit: int) -> List[AttachmentJob]:
+    """
+    Reserva até `limit` jobs (FOR UPDATE SKIP LOCKED: vários workers não pegam o mesmo).
+    Jobs 'running' há mais de JOBS_STALE_MINUTES voltam a ser elegíveis (worker morreu);
+    os que já esgotaram JOBS_MAX_ATTEMPTS viram 'failed'.
+    """
+    cfg = current_app.config
+    max_attempts = int(cfg.get("JOBS_MAX_ATTEMPTS", 3))
+    stale_minutes = int(cfg.get("JOBS_STALE_MINUTES", 10))
+    stale = datetime.utcnow() - timedelta(minutes=stale_minutes)
+    (AttachmentJob.query
+     .filter(AttachmentJob.status == "running", AttachmentJob.started_at < stale,
+             AttachmentJob.attempts >= max_attempts)
+     .update({"status": "failed", "finished_at": datetime.utcnow(),
+              "error": f"worker não concluiu em {stale_minutes} min após {max_attempts} tentativa(s)"},
+             synchronize_session=False))
+    rows = (
+        AttachmentJob.query
+        .filter(AttachmentJob.attempts < max_attempts)
+        .filter((AttachmentJob.status == "queued")
+                | ((AttachmentJob.status == "running") & (AttachmentJob.started_at < stale)))
+        .order_by(AttachmentJob.id.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    now = datetime.utcnow()
+    for j in rows:
+        j.status = "running"
+        j.started_at = now
+        j.attempts = (j.attempts or 0) + 1
+    db.session.commit()
+    return rows
+
+
+def process_job(job: AttachmentJob) -> None:
+    max_attempts = int(current_app.config.get("JOBS_MAX_ATTEMPTS", 3))
+    try:
+        att = Attachment.query.get(job.attachment_id)
+        if att is None:
+            raise FileNotFoundError("anexo removido")
+        path = attachment_file(att)
+        if not path.exists():
+            raise FileNotFoundError(f"arquivo ausente: {path.name}")
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"tipo de job desconhecido: {job.kind}")
+        job.result = handler(att, path)
+        job.status = "done"
+        job.error = None
+        if job.kind == "text" and job.result:
+            # texto extraído passa a ser encontrado pela busca
+            db.session.flush()
+            ticket = Ticket.query.get(att.ticket_id)
+            if ticket is not None:
+                index_ticket(ticket)
+    except Exception as e:
+        db.session.rollback()
+        job.status = "queued" if (job.attempts or 0) < max_attempts else "failed"
+        job.error = str(e)[:500]
+        current_app.logger.warning("JOB_ERROR #%s (%s): %s", job.id, job.kind, e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_pending(batch: int = 20) -> int:
+    """Processa um lote de jobs. Retorna quantos foram executados."""
+    jobs = claim_jobs(batch)
+    for j in jobs:
+        process_job(j)
+    return len(jobs)
+
+
+@click.command("worker")
+@click.option("--once", is_flag=True, help="Processa a fila uma vez e sai.")
+@click.option("--batch", default=20, show_default=True, help="Jobs reservados por rodada.")
+@click.option("--interval", default=2.0, show_default=True, help="Espera (s) quando a fila está vazia.")
+@with_appcontext
+def worker_command(once: bool, batch: int, interval: float):
+    """Executa os jobs de pós-processamento de anexos."""
+    click.echo("worker: iniciado")
+    while True:
+        n = run_pending(batch)
+        if n:
+            click.echo(f"worker: {n} job(s) processado(s)")
+        if once and not n:
+            break
+        if not n:
+            db.session.remove()
+            time.sleep(interval)
@@ -0,0 +1,264 @@
+# services/ldap_auth.py
+"""
+Autenticação LDAP (ldap3) para o login.
+
+- conexões de serviço (LDAP_BIND_DN) em pool, reaproveitadas entre requisições
+  só para BUSCAR o DN do usuário; a senha é conferida num bind próprio, descartado
+- cache do DN/atributos por usuário (LDAP_DN_CACHE_TTL)
+- cache negativo curto (LDAP_NEGATIVE_TTL): a mesma senha errada não volta ao
+  servidor e, após LDAP_MAX_FAILURES falhas na janela, o usuário é recusado
+  sem consultar o LDAP até a janela expirar
+- sem LDAP_BIND_DN: bind direto com usuario + LDAP_DOMAIN_SUFFIX (estilo AD)
+
+Testável com o servidor simulado do ldap3:
+
+    server = Server("fake")
+    backend = LdapBackend(server, client_strategy=MOCK_SYNC, bind_dn=..., ...)
+    Connection(server, client_strategy=MOCK_SYNC).strategy.add_entry(dn, attrs)
+
+Cenários prontos: `python -m pytest tests/test_ldap_auth.py`.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass
+from queue import Empty, Full, Queue
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+
+# ldap3 só é importado no primeiro uso (_load_ldap3): boot de workers, CLI e
+# `flask db upgrade` não pagam por ele. As constantes do ldap3 são strings.
+RESTARTABLE, SUBTREE = "RESTARTABLE", "SUBTREE"
+Connection = Server = None
+_ldap3_loaded = False
+
+
+class LDAPException(Exception):
+    pass
+
+
+_FILTER_ESCAPES = {"\\": r"\5c", "*": r"\2a", "(": r"\28", ")": r"\29", "\0": r"\00"}
+
+
+def escape_filter_chars(text: str) -> str:
+    """Escapa um valor para filtro de busca (RFC 4515). Local: não depende do ldap3 carregado."""
+    return "".join(_FILTER_ESCAPES.get(c, c) for c in text)
+
+
+def _load_ldap3() -> bool:
+    """Importa o ldap3 uma vez. False se ausente (LDAP fica indisponível)."""
+    global Connection, Server, LDAPException, _ldap3_loaded
+    if not _ldap3_loaded:
+        try:
+            from ldap3 import Connection, Server
+            from ldap3.core.exceptions import LDAPException
+        except Exception:
+            pass
+        _ldap3_loaded = True
+    return Server is not None
+
+
+def normalize_suffix(suffix: Optional[str]) -> str:
+    """'empresa.local' ou '@empresa.local' -> '@empresa.local' ('' se vazio)."""
+    suffix = (suffix or "").strip().lstrip("@")
+    return f"@{suffix}" if suffix else ""
+
+
+@dataclass(frozen=True)
+class LdapUser:
+    username: str
+    dn: Optional[str]
+    email: Optional[str]
+    name: Optional[str]
+
+
+class LdapBackend:
+    def __init__(self, server, *, client_strategy=RESTARTABLE, bind_dn: str = "", bind_password: str = "",
+                 base_dn: str = "", user_attr: str = "uid", mail_attr: str = "mail",
+                 domain_suffix: str = "", pool_size: int = 4, dn_ttl: float = 600,
+                 negative_ttl: float = 30, max_failures: int = 5, timeout: int = 5):
+        _load_ldap3()
+        self.server = server
+        self.client_strategy = client_strategy
+        self.bind_dn, self.bind_password = bind_dn, bind_password
+        self.base_dn, self.user_attr, self.mail_attr = base_dn, user_attr, mail_attr
+        self.domain_suffix = normalize_suffix(domain_suffix)
+        self.dn_ttl, self.negative_ttl, self.max_failures = dn_ttl, negative_ttl, max_failures
+        self.timeout = timeout
+        self._pool: Queue = Queue(maxsize=max(1, pool_size))
+        self._lock = Lock()
+        self._dn_cache: Dict[str, Tuple[LdapUser, float]] = {}
+        self._bad: Dict[Tuple[str, str], float] = {}            # (usuario, hash da senha) -> expira
+        self._failures: Dict[str, Tuple[int, float]] = {}      # usuario -> (falhas, início da janela)
+
+    # --- pool de conexões de serviço ---
+    def _service_conn(self):
+        try:
+            return self._pool.get_nowait()
+        except Empty:
+            conn = Connection(self.server, user=self.bind_dn, password=self.bind_password,
+                              client_strategy=self.client_strategy,
+                              receive_timeout=self.timeout, read_only=True)
+            if not conn.bind():
+                raise LDAPException(f"bind de serviço recusado: {conn.result}")
+            return conn
+
+    def _release(self, conn, broken: bool = False) -> None:
+        if broken:
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except Full:
+            conn.unbind()
+
+    # --- caches ---
+    def _blocked(self, username: str, pw_key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._bad.get((username, pw_key), 0) > now:
+                return True
+            count, since = self._failures.get(username, (0, now))
+            return count >= self.max_failures and now - since < self.negative_ttl
+
+    def _fail(self, username: str, pw_key: str) -> None:
+        now = time.time()
+        with self._lock:
+            if len(self._bad) > 10000:
+                self._bad = {k: v for k, v in self._bad.items() if v > now}
+            self._bad[(username, pw_key)] = now + self.negative_ttl
+            count, since = self._failures.get(username, (0, now))
+            if now - since >= self.negative_ttl:
+                count, since = 0, now
+            self._failures[username] = (count + 1, since)
+
+    def _ok(self, username: str) -> None:
+        with self._lock:
+            self._failures.pop(username, None)
+
+    # --- busca do DN ---
+    def lookup(self, username: str) -> Optional[LdapUser]:
+        now = time.time()
+        with self._lock:
+            hit = self._dn_cache.get(username)
+            if hit and hit[1] > now:
+                return hit[0]
+        attr = self.mail_attr if "@" in username else self.user_attr
+        flt = f"({attr}={escape_filter_chars(username)})"
+        conn = self._service_conn()
+        try:
+            conn.search(self.base_dn, flt, search_scope=SUBTREE,
+                        attributes=[self.user_attr, self.mail_attr, "cn", "displayName"], size_limit=2)
+            entries = list(conn.entries)
+        except LDAPException:
+            self._release(conn, broken=True)
+            raise
+        self._release(conn)
+        if len(entries) != 1:
+            return None  # inexistente ou ambíguo
+        e = entries[0]
+        found = LdapUser(username=username, dn=e.entry_dn,
+                         email=_first(e, self.mail_attr), name=_first(e, "displayName") or _first(e, "cn"))
+        with self._lock:
+            self._dn_cache[username] = (found, now + self.dn_ttl)
+        return found
+
+    def _bind_as(self, user_dn: str, password: str) -> bool:
+        conn = Connection(self.server, user=user_dn, password=password,
+                          client_strategy=self.client_strategy, receive_timeout=self.timeout)
+        try:
+            return bool(conn.bind())
+        finally:
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+
+    # --- API ---
+    def authenticate(self, username: str, password: str) -> Optional[LdapUser]:
+        username = (username or "").strip().lower()
+        if not username or not password:
+            return None  # senha vazia viraria bind anônimo
+        pw_key = hashlib.sha256(f"{username}\0{password}".encode()).hexdigest()
+        if self._blocked(username, pw_key):
+            return None
+        if self.bind_dn:
+            found = self.lookup(username)
+            ok = found is not None and self._bind_as(found.dn, password)
+        else:
+            principal = username if "@" in username else f"{username}{self.domain_suffix}"
+            found = LdapUser(username=username, dn=None,
+                             email=principal if "@" in principal else None, name=None)
+            ok = self._bind_as(principal, password)
+        if not ok:
+            self._fail(username, pw_key)
+            return None
+        self._ok(username)
+        return found
+
+    def forget(self, username: Optional[str] = None) -> None:
+        with self._lock:
+            if username is None:
+                self._dn_cache.clear()
+            else:
+                self._dn_cache.pop(username.strip().lower(), None)
+
+
+def _first(entry, attr: str) -> Optional[str]:
+    try:
+        val = entry[attr].value
+    except Exception:
+        return None
+    if isinstance(val, (list, tuple)):
+        val = val[0] if val else None
+    return str(val) if val else None
+
+
+# ============================
+# Backend da aplicação
+# ============================
+
+_backend: Dict[str, Optional[LdapBackend]] = {"b": None}
+_backend_lock = Lock()
+
+
+def backend() -> Optional[LdapBackend]:
+    """Backend configurado (um por processo) ou None se LDAP desligado/indisponível."""
+    cfg = current_app.config
+    if not cfg.get("LDAP_ENABLED") or not _load_ldap3():
+        return None
+    with _backend_lock:
+        if _backend["b"] is None:
+            server = Server(cfg.get("LDAP_SERVER"), port=int(cfg.get("LDAP_PORT", 389)),
+                            use_ssl=bool(cfg.get("LDAP_USE_SSL")), connect_timeout=5)
+            _backend["b"] = LdapBackend(
+                server,
+                bind_dn=cfg.get("LDAP_BIND_DN", ""),
+                bind_password=cfg.get("LDAP_BIND_PASSWORD", ""),
+                base_dn=cfg.get("LDAP_BASE_DN", ""),
+                user_attr=cfg.get("LDAP_USER_ATTR", "uid"),
+                mail_attr=cfg.get("LDAP_MAIL_ATTR", "mail"),
+                domain_suffix=cfg.get("LDAP_DOMAIN_SUFFIX", ""),
+                pool_size=int(cfg.get("LDAP_POOL_SIZE", 4)),
+                dn_ttl=float(cfg.get("LDAP_DN_CACHE_TTL", 600)),
+                negative_ttl=float(cfg.get("LDAP_NEGATIVE_TTL", 30)),
+                max_failures=int(cfg.get("LDAP_MAX_FAILURES", 5)),
+            )
+        return _backend["b"]
+
+
+def ldap_authenticate(username: str, password: str) -> Optional[LdapUser]:
+    b = backend()
+    if b is None:
+        return None
+    try:
+        return b.authenticate(username, password)
+    except LDAPException as e:
+        current_app.logger.warning("LDAP_ERROR %s", e)
+        return None
@@ -0,0 +1,186 @@
+# services/mail_render.py
+"""
+Renderização única dos e-mails de notificação de chamados.
+
+Usada pelos dois caminhos de notificação (services/notify.notify_event e
+services/notify.notify_ticket_event):
+  - template email/notify.html carregado uma vez por aplicação (sem passar por
+    render_template / context processors a cada envio)
+  - rótulos PT-BR, link e atendente (diretório em cache) calculados uma vez
+  - sai assunto + HTML + texto alternativo do MESMO contexto
+  - mensagens prontas em LRU (MAIL_RENDER_CACHE): o mesmo evento pedido por
+    mais de um caminho, ou reenviado, não é renderizado de novo
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, has_request_context, request, url_for
+
+from services import directory
+
+STATUS_PT = {"open": "Aberto", "in_progress": "Em andamento", "closed": "Finalizado"}
+PRIORITY_PT = {"low": "Baixa", "medium": "Média", "high": "Alta", "urgent": "Urgente"}
+
+_TITLES = {
+    "created": ("Chamado criado", "Um novo chamado foi aberto."),
+    "assigned": ("Chamado atribuído", "O chamado foi atribuído a um atendente."),
+    "status": (None, "O status do chamado foi atualizado."),
+    "reply": ("Nova resposta no chamado", "Uma nova mensagem foi adicionada ao chamado."),
+    "attachment": ("Novo anexo no chamado", "Um arquivo foi anexado ao chamado."),
+}
+_SUBJECTS = {"created": "Criado", "assigned": "Atribuído", "reply": "Nova resposta", "attachment": "Novo anexo"}
+
+
+def status_pt(s: Optional[str]) -> str:
+    return STATUS_PT.get((s or "").lower(), "Aberto")
+
+
+def priority_pt(p: Optional[str]) -> str:
+    return PRIORITY_PT.get((p or "").lower(), "—")
+
+
+@dataclass(frozen=True)
+class RenderedMail:
+    subject: str
+    html: str
+    text: str
+
+
+def base_url() -> str:
+    base = current_app.config.get("MAIL_BASE_URL")
+    if not base and has_request_context():
+        base = request.url_root
+    return (base or "").rstrip("/")
+
+
+def ticket_url(ticket_id: int) -> str:
+    try:
+        if has_request_context():
+            path = url_for("tickets.ticket_detail", ticket_id=ticket_id)
+        else:  # CLI/worker: monta só o caminho pelo mapa de rotas, o host vem de MAIL_BASE_URL
+            path = current_app.url_map.bind("localhost").build("tickets.ticket_detail", {"ticket_id": ticket_id})
+    except Exception:  # rota não registrada (create_app(web=False))
+        path = f"/tickets/{ticket_id}"
+    return f"{base_url()}{path}"
+
+
+def assignee_label(ticket) -> Optional[str]:
+    uid = getattr(ticket, "assignee_id", None) or getattr(ticket, "agent_id", None)
+    label = directory.agent_label(uid)
+    if label:
+        return label
+    obj = getattr(ticket, "assignee", None) or getattr(ticket, "agent", None)
+    return (getattr(obj, "name", None) or getattr(obj, "email", None)) if obj else None
+
+
+def _requester_label(ticket) -> str:
+    u = getattr(ticket, "user", None)
+    return (getattr(u, "name", None) or getattr(u, "email", None) or "-") if u else "-"
+
+
+def subject_for(event: str, ticket) -> str:
+    mid = f"Status alterado para {status_pt(ticket.status)}" if event == "status" else _SUBJECTS.get(event, "Atualização")
+    return f"[Chamado #{ticket.id}] {mid} — {ticket.title}"
+
+
+# ============================
+# Template e cache
+# ============================
+
+_templates: Dict[str, object] = {}
+_lru: "OrderedDict[Tuple, RenderedMail]" = OrderedDict()
+_lock = Lock()
+
+
+def _template():
+    app = current_app._get_current_object()
+    if app.jinja_env.auto_reload:
+        return app.jinja_env.get_template("email/notify.html")  # desenvolvimento: respeita edições
+    with _lock:
+        tpl = _templates.get(app.import_name)
+        if tpl is None:
+            tpl = _templates[app.import_name] = app.jinja_env.get_template("email/notify.html")
+        return tpl
+
+
+def _key(event: str, ticket, extra: str, actor_label: Optional[str]) -> Tuple:
+    return (event, ticket.id, ticket.title, hash(ticket.description or ""), ticket.status, ticket.priority,
+            getattr(ticket, "assignee_id", None) or getattr(ticket, "agent_id", None),
+            getattr(ticket, "updated_at", None), extra, actor_label)
+
+
+def render_notification(event: str, ticket, *, extra: Optional[str] = None, actor=None) -> RenderedMail:
+    """Assunto, HTML e texto da notificação `event` (created|assigned|status|reply|attachment)."""
+    extra = (extra or "").strip()
+    actor_label = (getattr(actor, "name", None) or getattr(actor, "email", None)) if actor else None
+    key = _key(event, ticket, extra, actor_label)
+    with _lock:
+        hit = _lru.get(key)
+        if hit is not None:
+            _lru.move_to_end(key)
+            return hit
+
+    st, pr = status_pt(ticket.status), priority_pt(ticket.priority)
+    title, subtitle = _TITLES.get(event, ("Atualização no chamado", None))
+    if event == "status":
+        title = f"Status alterado para {st}"
+    if actor_label and subtitle:
+        subtitle = f"{subtitle} Por {actor_label}."
+    link = ticket_url(ticket.id)
+    created = getattr(ticket, "created_at", None)
+    updated = getattr(ticket, "updated_at", None)
+    ctx = dict(
+        title=f"[Chamado #{ticket.id}] {title} — {ticket.title}",
+        subtitle=subtitle,
+        env_label=current_app.config.get("FLASK_ENV", "ticket").capitalize(),
+        logo_url=f"{base_url()}/static/images/sollus_logo_white.png",
+        cta_url=link,
+        cta_label="Abrir Chamado",
+        ticket=ticket,
+        status_pt=st,
+        priority_pt=pr,
+        requester=_requester_label(ticket),
+        assignee=assignee_label(ticket),
+        created_at=created.strftime("%d/%m/%Y %H:%M") if created else None,
+        updated_at=updated.strftime("%d/%m/%Y %H:%M") if updated else None,
+        description=ticket.description,
+        last_message=extra or None,
+    )
+    html = _template().render(**ctx)
+    lines = [
+        ctx["title"],
+        subtitle or "",
+        "",
+        f"Status: {st}",
+        f"Prioridade: {pr}",
+        f"Solicitante: {ctx['requester']}",
+    ]
+    if ctx["assignee"]:
+        lines.append(f"Atribuído para: {ctx['assignee']}")
+    if extra:
+        lines += ["", "Última resposta:" if event == "reply" else "Detalhe:", extra]
+    lines += ["", f"Abrir: {link}", ""]
+    mail = RenderedMail(subject_for(event, ticket), html, "\n".join(lines))
+
+    size = int(current_app.config.get("MAIL_RENDER_CACHE", 256))
+    with _lock:
+        _lru[key] = mail
+        while len(_lru) > size:
+            _lru.popitem(last=False)
+    return mail
+
+
+def batches(recipients: Iterable[str]) -> List[List[str]]:
+    """Destinatários únicos em lotes de MAIL_MAX_RECIPIENTS (uma transação SMTP por lote)."""
+    seen, uniq = set(), []
+    for e in recipients:
+        e2 = (e or "").strip().lower()
+        if e2 and e2 not in seen:
+            seen.add(e2)
+            uniq.append(e.strip())
+    n = max(1, int(current_app.config.get("MAIL_MAX_RECIPIENTS", 50)))
+    return [uniq[i:i + n] for i in range(0, len(uniq), n)]
@@ -0,0 +1,148 @@
+# services/metrics.py
+"""
+Métricas por atendente para decisões de atribuição.
+
+- carga: chamados abertos / em andamento (GROUP BY atendente, status)
+- mediana de 1ª resposta e de solução (janela METRICS_WINDOW_DAYS), calculadas
+  no banco com ROW_NUMBER()/COUNT() OVER (PARTITION BY atendente)
+- envelhecimento dos não finalizados: < 1 dia, 1–3, 3–7, > 7 dias
+
+Diferença de datas por dialeto (MySQL/MariaDB, PostgreSQL e SQLite, usado nos
+testes). Sem suporte a funções de janela (MySQL 5.7) a mediana sai em Python.
+Resultado em cache por intervalo de METRICS_CACHE_SECONDS (padrão 5 min).
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from statistics import median
+from threading import Lock
+from typing import Dict, List
+
+from flask import current_app
+from sqlalchemy import case, func, select, text
+from sqlalchemy.exc import DBAPIError
+
+from extensions import db
+from models import Ticket, User
+from services.sla import STAFF_ROLES, TicketSLA
+
+_cache: Dict[str, object] = {"bucket": None, "data": None}
+_cache_lock = Lock()
+
+
+def _assignee_col():
+    col = getattr(Ticket, "assignee_id", None)
+    return col if col is not None else getattr(Ticket, "agent_id")
+
+
+def _seconds(a, b):
+    """Expressão SQL com os segundos entre a e b no dialeto atual."""
+    name = db.session.get_bind().dialect.name
+    if name in ("mysql", "mariadb"):
+        return func.timestampdiff(text("SECOND"), a, b)
+    if name == "postgresql":
+        return func.extract("epoch", b - a)
+    if name == "sqlite":
+        return (func.julianday(b) - func.julianday(a)) * 86400.0
+    raise ValueError(f"dialeto sem suporte: {name}")
+
+
+def _durations(end_col, since: datetime):
+    """Subconsulta (agent_id, dur) dos chamados com `end_col` preenchido desde `since`."""
+    assignee = _assignee_col()
+    return (select(assignee.label("agent_id"), _seconds(Ticket.created_at, end_col).label("dur"))
+            .select_from(Ticket)
+            .join(TicketSLA, TicketSLA.ticket_id == Ticket.id)
+            .where(assignee.isnot(None), end_col.isnot(None), end_col >= since)
+            .subquery())
+
+
+def _medians(end_col, since: datetime) -> Dict[int, float]:
+    """Mediana (em horas) por atendente."""
+    d = _durations(end_col, since)
+    ranked = select(
+        d.c.agent_id, d.c.dur,
+        func.row_number().over(partition_by=d.c.agent_id, order_by=d.c.dur).label("rn"),
+        func.count().over(partition_by=d.c.agent_id).label("cnt"),
+    ).subquery()
+    # linha(s) do meio: 2*rn entre cnt e cnt+2 (1 linha se ímpar, 2 se par)
+    q = (select(ranked.c.agent_id, func.avg(ranked.c.dur))
+         .where((ranked.c.rn * 2).between(ranked.c.cnt, ranked.c.cnt + 2))
+         .group_by(ranked.c.agent_id))
+    try:
+        rows = db.session.execute(q).all()
+    except DBAPIError:
+        # servidor sem funções de janela: mediana em Python
+        db.session.rollback()
+        by_agent: Dict[int, List[float]] = {}
+        for agent_id, dur in db.session.execute(select(d.c.agent_id, d.c.dur)):
+            by_agent.setdefault(agent_id, []).append(float(dur))
+        return {a: round(median(v) / 3600, 1) for a, v in by_agent.items()}
+    return {a: round(float(m) / 3600, 1) for a, m in rows if m is not None}
+
+
+def _workload() -> Dict[int, Dict[str, int]]:
+    assignee = _assignee_col()
+    now = datetime.utcnow()
+    d1, d3, d7 = (now - timedelta(days=n) for n in (1, 3, 7))
+    rows = (db.session.query(
+                assignee,
+                func.sum(case((Ticket.status == "open", 1), else_=0)),
+                func.sum(case((Ticket.status == "in_progress", 1), else_=0)),
+                func.sum(case((Ticket.created_at >= d1, 1), else_=0)),
+                func.sum(case(((Ticket.created_at < d1) & (Ticket.created_at >= d3), 1), else_=0)),
+                func.sum(case(((Ticket.created_at < d3) & (Ticket.created_at >= d7), 1), else_=0)),
+                func.sum(case((Ticket.created_at < d7, 1), else_=0)))
+            .filter(assignee.isnot(None), Ticket.status != "closed")
+            .group_by(assignee)
+            .all())
+    return {
+        agent_id: {
+            "open": int(o or 0), "in_progress": int(p or 0),
+            "ageing": {"lt_1d": int(a or 0), "1_3d": int(b or 0), "3_7d": int(c or 0), "gt_7d": int(e or 0)},
+        }
+        for agent_id, o, p, a, b, c, e in rows
+    }
+
+
+def compute_agent_metrics() -> List[Dict]:
+    since = datetime.utcnow() - timedelta(days=int(current_app.config.get("METRICS_WINDOW_DAYS", 90)))
+    load = _workload()
+    first = _medians(TicketSLA.responded_at, since)
+    resolve = _medians(TicketSLA.resolved_at, since)
+    agents = (User.query.filter(User.role.in_(STAFF_ROLES))
+              .order_by(User.name.asc(), User.email.asc()).all())
+    empty = {"open": 0, "in_progress": 0, "ageing": {"lt_1d": 0, "1_3d": 0, "3_7d": 0, "gt_7d": 0}}
+    out = []
+    for u in agents:
+        w = load.get(u.id, empty)
+        out.append({
+            "id": u.id,
+            "name": u.name or getattr(u, "username", None) or u.email,
+            "open": w["open"],
+            "in_progress": w["in_progress"],
+            "backlog": w["open"] + w["in_progress"],
+            "median_first_response_h": first.get(u.id),
+            "median_resolution_h": resolve.get(u.id),
+            "ageing": w["ageing"],
+        })
+    out.sort(key=lambda r: (-r["backlog"], r["name"] or ""))
+    return out
+
+
+def agent_metrics() -> Dict:
+    """Métricas do intervalo atual de METRICS_CACHE_SECONDS (calculadas uma vez por intervalo)."""
+    span = max(1, int(current_app.config.get("METRICS_CACHE_SECONDS", 300)))
+    bucket = int(time.time() // span)
+    with _cache_lock:
+        if _cache["bucket"] == bucket and _cache["data"] is not None:
+            return _cache["data"]  # type: ignore[return-value]
+    data = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "window_days": int(current_app.config.get("METRICS_WINDOW_DAYS", 90)),
+        "agents": compute_agent_metrics(),
+    }
+    with _cache_lock:
+        _cache["bucket"], _cache["data"] = bucket, data
+    return data
@@ -1,89 +1,36 @@
 # services/notify.py
 from __future__ import annotations
 
-import smtplib
-from email.message import EmailMessage
-from typing import Iterable, List, Optional, Dict
+from typing import List, Optional, Dict
 
-from flask import current_app, url_for, request
-from markupsafe import escape
+from flask import current_app
 
-def _pt_status(s: Optional[str]) -> str:
-    s = (s or '').lower()
-    return {'open': 'Aberto', 'in_progress': 'Em andamento', 'closed': 'Finalizado'}.get(s, '—')
-
-def _pt_priority(p: Optional[str]) -> str:
-    p = (p or '').lower()
-    return {'low': 'Baixa', 'medium': 'Média', 'high': 'Alta', 'urgent': 'Urgente'}.get(p, '—')
-
-def _base_url() -> str:
-    # Usa MAIL_BASE_URL se houver; senão, tenta derivar do request
-    cfg = current_app.config
-    return (cfg.get('MAIL_BASE_URL') or request.url_root.rstrip('/')).rstrip('/')
-
-def _uniq_emails(items: Iterable[str]) -> List[str]:
-    out, seen = [], set()
-    for e in items:
-        if not e:
-            continue
-        e = e.strip().lower()
-        if e and e not in seen:
-            seen.add(e)
-            out.append(e)
-    return out
+from services.digest import defer_recipients
+from services.mail_render import batches, render_notification
+from services.recipients import ticket_recipients
 
 def recipients_for_ticket(ticket, *, include_actor: bool, actor=None) -> List[str]:
-    """Coleta e-mails de pessoas 'vinculadas' ao ticket:
-       - solicitante (ticket.user)
-       - atendente (ticket.assignee, se existir)
-       - autores de mensagens anteriores (se houver relação/consulta)
+    """E-mails de solicitante, atendente e autores de mensagens (uma consulta).
        Remove o ator (quem executou a ação) quando include_actor=False.
     """
-    emails: List[str] = []
-
-    # solicitante
-    try:
-        if getattr(ticket, 'user', None) and getattr(ticket.user, 'email', None):
-            emails.append(ticket.user.email)
-    except Exception:
-        pass
-
-    # atendente
-    try:
-        assignee = getattr(ticket, 'assignee', None)
-        if assignee and getattr(assignee, 'email', None):
-            emails.append(assignee.email)
-    except Exception:
-        pass
+    exclude = []
+    if not include_actor and actor is not None and getattr(actor, 'email', None):
+        exclude.append(actor.email)
+    return ticket_recipients(ticket.id, authors=True, exclude=exclude)
 
-    # autores de mensagens
-    try:
-        msgs = getattr(ticket, 'messages', None)
-        if msgs is None:
-            # busca direta para evitar depender do relacionamento
-            from models import TicketMessage
-            msgs = TicketMessage.query.filter_by(ticket_id=ticket.id).all()
-        for m in msgs or []:
-            if getattr(m, 'author', None) and getattr(m.author, 'email', None):
-                emails.append(m.author.email)
-    except Exception:
-        pass
-
-    # remove o ator, se for o caso
-    if not include_actor and actor and getattr(actor, 'email', None):
-        actor_email = actor.email.strip().lower()
-        emails = [e for e in emails if e.strip().lower() != actor_email]
-
-    return _uniq_emails(emails)
-
-def send_email(subject: str, recipients: List[str], html_body: str, text_body: Optional[str] = None) -> None:
+def send_email(subject: str, recipients: List[str], html_body: str, text_body: Optional[str] = None) -> bool:
+    """Envia via SMTP. True só se o servidor aceitou a mensagem (erros são logados, não propagados)."""
     cfg = current_app.config
     if not cfg.get('MAIL_ENABLED', False):
         current_app.logger.info('MAIL_DISABLED: %s -> %s', subject, recipients)
-        return
+        return False
     if not recipients:
         current_app.logger.info('MAIL_SKIP_EMPTY_RECIPIENTS: %s', subject)
-        return
+        return False
+
+    # smtplib/email só quando há o que enviar: não pesam no boot da aplicação
+    import smtplib
+    from email.message import EmailMessage
 
     msg = EmailMessage()
     msg['Subject'] = subject
@@ -96,15 +43,33 @@ def send_email(subject: str, recipients: List[str], html_body: str, text_body: O
     msg.add_alternative(html_body, subtype='html')
 
     try:
-        with smtplib.SMTP(cfg.get('MAIL_SERVER', 'localhost'), cfg.get('MAIL_PORT', 25), timeout=30) as smtp:
-            if cfg.get('MAIL_USE_TLS', False):
+        smtp_cls = smtplib.SMTP_SSL if cfg.get('MAIL_USE_SSL', False) else smtplib.SMTP
+        with smtp_cls(cfg.get('MAIL_SERVER', 'localhost'), cfg.get('MAIL_PORT', 25), timeout=30) as smtp:
+            if cfg.get('MAIL_USE_TLS', False) and not cfg.get('MAIL_USE_SSL', False):
                 smtp.starttls()
             if cfg.get('MAIL_USERNAME') and cfg.get('MAIL_PASSWORD'):
                 smtp.login(cfg['MAIL_USERNAME'], cfg['MAIL_PASSWORD'])
             smtp.send_message(msg)
         current_app.logger.info('MAIL_SENT "%s" -> %s', subject, recipients)
+        return True
     except Exception as e:
         current_app.logger.exception('MAIL_ERROR sending "%s" to %s: %s', subject, recipients, e)
+        return False
+
+def notify_event(event: str, ticket, recipients: List[str], extra: str = "") -> None:
+    """
+    E-mail de evento do chamado (HTML + texto) para uma lista pronta de destinatários.
+    event: created | assigned | status | reply. Não quebra o fluxo em caso de erro.
+    Links saem de MAIL_BASE_URL: funciona fora de requisição (CLI, worker).
+    """
+    # quem escolheu resumo (hora/dia) recebe depois, pelo `flask digest send`
+    recipients = defer_recipients(event, ticket, recipients, extra)
+    if not recipients:
+        return
+    mail = render_notification(event, ticket, extra=extra)  # uma renderização para todos os lotes
+    for lote in batches(recipients):
+        if not send_email(mail.subject, lote, mail.html, mail.text):
+            current_app.logger.warning("[mail] falha ao enviar '%s' para %s", mail.subject, lote)
 
 def notify_ticket_event(ticket, *, action: str, actor=None, extra: Optional[Dict] = None) -> None:
     """action: 'created' | 'reply' | 'assigned' | 'status' | 'attachment'"""
@@ -113,60 +78,17 @@ def notify_ticket_event(ticket, *, action: str, actor=None, extra: Optional[Dict
     if not recips:
         return
 
-    actor_name = (getattr(actor, 'name', None) or getattr(actor, 'email', None) or 'Sistema')
-    base = _base_url()
-    link = f"{base}{url_for('tickets.ticket_detail', ticket_id=ticket.id)}"
-
-    ev_label = {
-        'created': 'criado',
-        'reply': 'atualizado com uma nova resposta',
-        'assigned': 'atribuído',
-        'status': 'atualizado',
-        'attachment': 'atualizado com novo anexo',
-    }.get(action, 'atualizado')
-
-    subject = f"[Chamados] #{ticket.id} — {escape(ticket.title or 'Sem título')} ({_pt_status(getattr(ticket,'status',None))})"
-
-    # Blocos opcionais
-    extra_html = ""
-    if action == 'reply' and 'body' in extra:
-        body = escape(extra.get('body') or '')  # simples; pode enriquecer
-        extra_html += f'<p><strong>Mensagem:</strong><br><div style="white-space:pre-wrap">{body}</div></p>'
-    if action == 'assigned':
-        assignee = getattr(ticket, 'assignee', None)
-        who = escape(getattr(assignee, 'name', None) or getattr(assignee, 'email', None) or '—')
-        extra_html += f'<p><strong>Novo atendente:</strong> {who}</p>'
-    if action == 'status':
-        extra_html += f'<p><strong>Novo status:</strong> {_pt_status(getattr(ticket,"status",None))}</p>'
-    if action == 'attachment' and 'filename' in extra:
-        extra_html += f'<p><strong>Anexo:</strong> {escape(extra["filename"])}</p>'
+    detail = None
+    if action == 'reply':
+        detail = extra.get('body')
+    elif action == 'attachment' and extra.get('filename'):
+        detail = f"Anexo: {extra['filename']}"
 
-    html = f"""
-    <div style="font-family:system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif">
-      <p>Olá,</p>
-      <p>O chamado <strong>#{ticket.id} — {escape(ticket.title or 'Sem título')}</strong> foi {ev_label} por <strong>{escape(actor_name)}</strong>.</p>
-
-      <table cellpadding="6" cellspacing="0" style="border-collapse:collapse">
-        <tr><td><strong>Status</strong></td><td>{_pt_status(getattr(ticket,'status',None))}</td></tr>
-        <tr><td><strong>Prioridade</strong></td><td>{_pt_priority(getattr(ticket,'priority',None))}</td></tr>
-        <tr><td><strong>Solicitante</strong></td><td>{escape(getattr(getattr(ticket,'user',None),'name',None) or getattr(getattr(ticket,'user',None),'email',None) or '—')}</td></tr>
-        <tr><td><strong>Atendente</strong></td><td>{escape(getattr(getattr(ticket,'assignee',None),'name',None) or getattr(getattr(ticket,'assignee',None),'email',None) or '—')}</td></tr>
-      </table>
-
-      {extra_html}
-
-      <p><a href="{link}">Abrir o chamado no sistema</a></p>
-      <hr>
-      <small>Mensagem automática do sistema de chamados.</small>
-    </div>
-    """
-
-    text = (
-        f"Chamado #{ticket.id} — {ticket.title or 'Sem título'}\n"
-        f"Ação: {ev_label} por {actor_name}\n"
-        f"Status: {_pt_status(getattr(ticket,'status',None))}\n"
-        f"Prioridade: {_pt_priority(getattr(ticket,'priority',None))}\n"
-        f"Abrir: {link}\n"
-    )
+    recips = defer_recipients(action, ticket, recips, detail or "")
+    if not recips:
+        return
 
-    send_email(subject, recips, html, text)
+    # mesma renderização (e cache) das notificações de tickets/routes
+    mail = render_notification(action, ticket, extra=detail, actor=actor)
+    for lote in batches(recips):
+        send_email(mail.subject, lote, mail.html, mail.text)
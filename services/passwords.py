@@ -0,0 +1,127 @@
+# services/passwords.py
+"""
+Hash de senhas com custo configurável.
+
+- PASSWORD_HASH_METHOD: método do werkzeug, ex. 'scrypt:32768:8:1' (padrão do
+  werkzeug 3) ou 'pbkdf2:sha256:260000' (mais leve para VMs pequenas)
+- rehash no login: se o hash gravado usa outros parâmetros, é refeito com os
+  atuais depois da senha conferir (needs_rehash)
+- conferência num pool limitado (PASSWORD_VERIFY_WORKERS): no pico de logins
+  (troca de turno) no máximo N KDFs rodam ao mesmo tempo e os workers do
+  servidor continuam atendendo as outras rotas; fila cheia além de
+  PASSWORD_VERIFY_TIMEOUT s vira VerifyBusy (login responde 503)
+
+    flask --app app:app passwords bench                        # logins/s por método
+    flask --app app:app passwords bench -m pbkdf2:sha256:260000 -m scrypt:16384:8:1
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class VerifyBusy(RuntimeError):
+    """Fila de conferência de senhas cheia."""
+
+
+def _method() -> str:
+    return current_app.config.get("PASSWORD_HASH_METHOD") or _DEFAULT_METHOD
+
+
+def hash_password(password: str) -> str:
+    return generate_password_hash(password, method=_method(),
+                                  salt_length=int(current_app.config.get("PASSWORD_SALT_LENGTH", 16)))
+
+
+_prefixes: Dict[str, str] = {}
+
+
+def _prefix(method: str) -> str:
+    """Prefixo gravado pelo werkzeug para `method` (normaliza parâmetros omitidos)."""
+    if method not in _prefixes:
+        _prefixes[method] = generate_password_hash("x", method=method).split("$", 1)[0]
+    return _prefixes[method]
+
+
+def needs_rehash(pwhash: Optional[str]) -> bool:
+    if not pwhash or "$" not in pwhash:
+        return True
+    return pwhash.split("$", 1)[0] != _prefix(_method())
+
+
+# ============================
+# Conferência em pool limitado
+# ============================
+
+_pool_lock = Lock()
+_pool: Dict[str, object] = {"ex": None, "sem": None}
+
+
+def _executor():
+    with _pool_lock:
+        if _pool["ex"] is None:
+            workers = max(1, int(current_app.config.get("PASSWORD_VERIFY_WORKERS", 2)))
+            _pool["ex"] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwverify")
+            # em execução + aguardando: acima disso recusa em vez de enfileirar sem fim
+            _pool["sem"] = BoundedSemaphore(workers * int(current_app.config.get("PASSWORD_VERIFY_QUEUE", 8)))
+        return _pool["ex"], _pool["sem"]
+
+
+def verify_password(pwhash: Optional[str], password: str) -> bool:
+    """check_password_hash no pool; VerifyBusy se a fila não andar a tempo."""
+    if not pwhash:
+        return False
+    timeout = float(current_app.config.get("PASSWORD_VERIFY_TIMEOUT", 10))
+    ex, sem = _executor()
+    if not sem.acquire(timeout=timeout):
+        raise VerifyBusy()
+    try:
+        fut = ex.submit(check_password_hash, pwhash, password)
+    except BaseException:
+        sem.release()
+        raise
+    # a vaga só volta quando o KDF termina, mesmo se quem esperava já desistiu
+    fut.add_done_callback(lambda _f: sem.release())
+    try:
+        return fut.result(timeout=timeout)
+    except FutureTimeout:
+        raise VerifyBusy() from None
+
+
+# ============================
+# CLI
+# ============================
+
+passwords_cli = AppGroup("passwords", help="Hash de senhas.")
+
+
+@passwords_cli.command("bench")
+@click.option("-m", "--method", "methods", multiple=True,
+              help="Método a medir (repita). Padrão: o configurado + alternativas comuns.")
+@click.option("--seconds", default=2.0, show_default=True, help="Tempo de medição por método.")
+def bench_command(methods, seconds: float):
+    """Mede logins/s (conferências de senha por segundo, 1 núcleo) por método."""
+    methods = methods or (_method(), "scrypt:32768:8:1", "scrypt:16384:8:1",
+                          "pbkdf2:sha256:600000", "pbkdf2:sha256:260000")
+    seen = set()
+    for m in methods:
+        if m in seen:
+            continue
+        seen.add(m)
+        h = generate_password_hash("senha-de-teste", method=m)
+        n, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            check_password_hash(h, "senha-de-teste")
+            n += 1
+        elapsed = time.perf_counter() - start
+        mark = " (atual)" if m == _method() else ""
+        click.echo(f"{m:<24} {n / elapsed:8.1f} logins/s  {1000 * elapsed / n:7.1f} ms/login{mark}")
@@ -0,0 +1,213 @@
+# services/ratelimit.py
+"""
+Limite de requisições por janela deslizante (contra força bruta e rajadas).
+
+Contador de janela deslizante aproximado: por chave guarda só
+(janela atual, contagem anterior, contagem atual) e estima
+    anterior * (fração restante da janela anterior) + atual
+— memória constante por chave, sem lista de horários.
+
+Armazenamento (RATELIMIT_STORAGE):
+  - 'memory'                      : por processo (padrão)
+  - 'sqlite:///caminho/arquivo.db': compartilhado entre workers da mesma máquina
+
+Limites nomeados em RATELIMIT_LIMITS ('N/segundos'), ex.: {'login_ip': '30/300'}.
+
+    @tickets_bp.route(...)
+    @login_required
+    @rate_limit("tickets_similar")          # por usuário logado (ou IP)
+    def similar(): ...
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+import time
+from functools import wraps
+from pathlib import Path
+from threading import Lock, local
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+
+_MAX_KEYS = 50000
+
+
+def parse_limit(spec: str) -> Tuple[int, int]:
+    """'30/300' -> (30, 300)"""
+    n, _, secs = str(spec).partition("/")
+    return int(n), int(secs or 60)
+
+
+def _estimate(prev: int, curr: int, window: int, now: float) -> float:
+    return prev * (1 - (now % window) / window) + curr
+
+
+def _retry_after(prev: int, curr: int, limit: int, window: int, now: float) -> int:
+    """Segundos até a estimativa abrir espaço para mais 1."""
+    elapsed = now % window
+    if curr + 1 > limit:
+        # só a virada da janela ajuda; a atual passa a ser a anterior
+        nxt = 1 - (limit - 1) / curr if curr else 0
+        return max(1, math.ceil(window - elapsed + max(0.0, nxt) * window))
+    if prev <= 0:
+        return 1
+    needed = 1 - (limit - 1 - curr) / prev  # fração da janela que precisa ter passado
+    return max(1, math.ceil(needed * window - elapsed))
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.lock = Lock()
+        self.state: Dict[str, List[int]] = {}  # chave -> [janela, anterior, atual]
+
+    def _roll(self, key: str, idx: int) -> List[int]:
+        st = self.state.get(key)
+        if st is None:
+            if len(self.state) >= _MAX_KEYS:
+                self.state = {k: v for k, v in self.state.items() if v[0] >= idx - 1}
+            st = self.state[key] = [idx, 0, 0]
+        elif st[0] != idx:
+            st[1] = st[2] if st[0] == idx - 1 else 0
+            st[0], st[2] = idx, 0
+        return st
+
+    def hit(self, key: str, limit: int, window: int, now: float, count: bool = True) -> Tuple[bool, int]:
+        idx = int(now // window)
+        with self.lock:
+            st = self._roll(key, idx)
+            if _estimate(st[1], st[2], window, now) + 1 > limit:
+                return False, _retry_after(st[1], st[2], limit, window, now)
+            if count:
+                st[2] += 1
+            return True, 0
+
+    def reset(self, key: str) -> None:
+        with self.lock:
+            self.state.pop(key, None)
+
+
+class SQLiteBackend:
+    """Mesmo algoritmo num arquivo SQLite (transação IMMEDIATE por acesso)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tls = local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS rate_limits "
+                      "(k TEXT PRIMARY KEY, idx INTEGER NOT NULL, prev INTEGER NOT NULL, curr INTEGER NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.tls.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: int, now: float, count: bool = True) -> Tuple[bool, int]:
+        idx = int(now // window)
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            row = c.execute("SELECT idx, prev, curr FROM rate_limits WHERE k = ?", (key,)).fetchone()
+            prev = curr = 0
+            if row:
+                if row[0] == idx:
+                    prev, curr = row[1], row[2]
+                elif row[0] == idx - 1:
+                    prev = row[2]
+            if _estimate(prev, curr, window, now) + 1 > limit:
+                c.execute("COMMIT")
+                return False, _retry_after(prev, curr, limit, window, now)
+            if count:
+                c.execute("INSERT OR REPLACE INTO rate_limits (k, idx, prev, curr) VALUES (?, ?, ?, ?)",
+                          (key, idx, prev, curr + 1))
+                if idx % 64 == 0:
+                    c.execute("DELETE FROM rate_limits WHERE idx < ? AND k LIKE ?", (idx - 1, key.split(":", 1)[0] + ":%"))
+            c.execute("COMMIT")
+            return True, 0
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+    def reset(self, key: str) -> None:
+        self._conn().execute("DELETE FROM rate_limits WHERE k = ?", (key,))
+
+
+_backend: Dict[str, object] = {"b": None}
+_backend_lock = Lock()
+
+
+def _store():
+    with _backend_lock:
+        if _backend["b"] is None:
+            spec = current_app.config.get("RATELIMIT_STORAGE") or "memory"
+            if spec.startswith("sqlite:///"):
+                _backend["b"] = SQLiteBackend(spec[len("sqlite:///"):])
+            else:
+                _backend["b"] = MemoryBackend()
+        return _backend["b"]
+
+
+def _limit_for(scope: str) -> Optional[Tuple[int, int]]:
+    spec = (current_app.config.get("RATELIMIT_LIMITS") or {}).get(scope)
+    return parse_limit(spec) if spec else None
+
+
+def _hit(scope: str, ident: str, count: bool) -> Tuple[bool, int]:
+    if not current_app.config.get("RATELIMIT_ENABLED", True):
+        return True, 0
+    lim = _limit_for(scope)
+    if lim is None:
+        return True, 0
+    return _store().hit(f"{scope}:{ident}", lim[0], lim[1], time.time(), count)
+
+
+def hit(scope: str, ident: str) -> Tuple[bool, int]:
+    """Conta uma tentativa. (permitido?, segundos para tentar de novo)"""
+    return _hit(scope, ident, True)
+
+
+def check(scope: str, ident: str) -> Tuple[bool, int]:
+    """Só confere, sem contar (ex.: falhas por conta, contadas depois)."""
+    return _hit(scope, ident, False)
+
+
+def reset(scope: str, ident: str) -> None:
+    if current_app.config.get("RATELIMIT_ENABLED", True):
+        _store().reset(f"{scope}:{ident}")
+
+
+def client_ip() -> str:
+    if current_app.config.get("RATELIMIT_TRUST_PROXY"):
+        fwd = (request.headers.get("X-Forwarded-For") or "").split(",")[0].strip()
+        if fwd:
+            return fwd
+    return request.remote_addr or "-"
+
+
+def too_many(retry_after: int):
+    resp = jsonify({"error": "rate_limited", "retry_after": retry_after})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+
+def rate_limit(scope: str, key: str = "user"):
+    """Decorator: limita a rota por usuário logado ('user', cai para IP) ou por 'ip'."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            ident = None
+            if key == "user" and getattr(current_user, "is_authenticated", False):
+                ident = f"u{current_user.id}"
+            allowed, retry = hit(scope, ident or client_ip())
+            if not allowed:
+                return too_many(retry)
+            return fn(*args, **kwargs)
+        return wrapper
+    return deco
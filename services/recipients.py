@@ -0,0 +1,52 @@
+# services/recipients.py
+"""
+Destinatários das notificações de um chamado numa única consulta.
+
+Solicitante, atendente e autores de mensagens saem de um UNION (que já remove
+repetidos) sobre users — sem carregar ticket.user / ticket.assignee / m.author
+um a um. O custo não cresce com o tamanho da conversa.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, union
+
+from extensions import db
+from models import Ticket, TicketMessage, User
+
+
+def _assignee_col():
+    col = getattr(Ticket, "assignee_id", None)
+    return col if col is not None else getattr(Ticket, "agent_id")
+
+
+def ticket_recipients(ticket_id: int, *, reporter: bool = True, assignee: bool = True,
+                      authors: bool = False, extra: Optional[Iterable[str]] = None,
+                      exclude: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    E-mails distintos (comparação sem maiúsculas) ligados ao chamado.
+    extra: e-mails adicionais; exclude: e-mails a remover (ex.: quem fez a ação).
+    """
+    parts = []
+    if reporter:
+        parts.append(select(User.email).join(Ticket, Ticket.user_id == User.id).where(Ticket.id == ticket_id))
+    if assignee:
+        parts.append(select(User.email).join(Ticket, _assignee_col() == User.id).where(Ticket.id == ticket_id))
+    if authors:
+        parts.append(select(User.email).join(TicketMessage, TicketMessage.author_id == User.id)
+                     .where(TicketMessage.ticket_id == ticket_id))
+    emails: List[str] = []
+    if parts:
+        stmt = parts[0] if len(parts) == 1 else union(*parts)
+        emails = [e for (e,) in db.session.execute(stmt)]
+    emails.extend(extra or ())
+
+    skip = {(e or "").strip().lower() for e in (exclude or ())}
+    out: List[str] = []
+    for e in emails:
+        e2 = (e or "").strip().lower()
+        if e2 and e2 not in skip:
+            skip.add(e2)
+            out.append(e.strip())
+    return out
@@ -0,0 +1,237 @@
+# services/search.py
+"""
+Busca textual de chamados: índice invertido próprio (tabela search_postings).
+
+- campos: título (peso 3), descrição, mensagens públicas e texto extraído dos
+  anexos (job 'text' do `flask worker`)
+- tokenização PT-BR: minúsculas, sem acentos, stopwords, stemmer leve de sufixos
+- uma linha por (termo, chamado) com o peso BM25 já calculado na indexação;
+  a consulta só soma peso * idf no banco e devolve o top-N ordenado
+- incremental: index_ticket() na mesma transação de create_ticket/reply
+
+    flask --app app:app search reindex     # (re)constrói o índice inteiro
+"""
+from __future__ import annotations
+
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, delete, func, insert
+
+from extensions import db
+from models import Ticket, TicketMessage
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_MAX_TERM = 40
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+FIELD_WEIGHTS = {"title": 3, "description": 1, "messages": 1, "attachments": 1}
+
+STOPWORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele
+deles depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta
+estao estas este estes eu foi foram ha isso isto ja la lhe lhes mais mas me mesmo meu
+meus minha minhas muito na nas nao nem no nos nossa nossas nosso nossos num numa o os
+ou para pela pelas pelo pelos por qual quando que quem se sem ser seu seus so sua suas
+tambem te tem tinha to tu tua tuas um uma umas uns voce voces vos
+""".split())
+
+# (sufixo, substituto) — do mais longo para o mais curto; radical mínimo de 3 letras
+_PLURAL = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+           ("ns", "m"), ("res", "r"), ("s", ""))
+_SUFFIXES = ("amentos", "imentos", "amento", "imento", "adoras", "adores", "acoes",
+             "mente", "idade", "adora", "ador", "acao", "ando", "endo", "indo",
+             "avel", "ivel", "ismo", "ista", "ario", "oso", "osa", "ar", "er", "ir",
+             "ao", "a", "e", "o")
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos ('Impressão' -> 'impressao')."""
+    nfkd = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in nfkd if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+    """Stemmer leve para português (plural + sufixos derivacionais comuns)."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suf, rep in _PLURAL:
+        if not word.endswith(suf) or len(word) - len(suf) < 3:
+            continue
+        if suf == "s" and word.endswith(("ss", "us", "is")):
+            break
+        word = word[: -len(suf)] + rep
+        break
+    for suf in _SUFFIXES:
+        if word.endswith(suf) and len(word) - len(suf) >= 3:
+            return word[: -len(suf)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos indexáveis do texto (já com stemming, sem stopwords)."""
+    out = []
+    for w in _WORD_RE.findall(fold(text)):
+        if len(w) < 2 or w in STOPWORDS:
+            continue
+        out.append(stem(w)[:_MAX_TERM])
+    return out
+
+
+class SearchPosting(db.Model):
+    __tablename__ = "search_postings"
+
+    term = db.Column(db.String(_MAX_TERM), primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id", ondelete="CASCADE"),
+                          primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False)  # componente tf do BM25 x 1000
+
+
+# ============================
+# Indexação
+# ============================
+
+def _attachment_texts(ticket_id: int) -> List[str]:
+    from services.jobs import AttachmentJob  # import tardio: jobs também importa este módulo
+    rows = (db.session.query(AttachmentJob.result)
+            .filter(AttachmentJob.ticket_id == ticket_id,
+                    AttachmentJob.kind == "text",
+                    AttachmentJob.status == "done",
+                    AttachmentJob.result.isnot(None)))
+    return [r for (r,) in rows]
+
+
+def _weights(fields: Dict[str, Iterable[str]]) -> Dict[str, int]:
+    tf: Counter = Counter()
+    for field, texts in fields.items():
+        w = FIELD_WEIGHTS.get(field, 1)
+        for text in texts:
+            for term in tokenize(text):
+                tf[term] += w
+    if not tf:
+        return {}
+    dl = sum(tf.values())
+    avg = float(current_app.config.get("SEARCH_AVG_DOC_LEN", 120))
+    norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * dl / avg)
+    return {t: max(1, int(round(1000 * f * (_BM25_K1 + 1) / (f + norm)))) for t, f in tf.items()}
+
+
+def index_ticket(ticket: Ticket) -> int:
+    """Recalcula as linhas do chamado no índice (pendente de commit). Retorna nº de termos."""
+    if ticket.id is None:
+        db.session.flush()
+    messages = [b for (b,) in db.session.query(TicketMessage.body)
+                .filter(TicketMessage.ticket_id == ticket.id, TicketMessage.public.is_(True))]
+    weights = _weights({
+        "title": [ticket.title or ""],
+        "description": [ticket.description or ""],
+        "messages": messages,
+        "attachments": _attachment_texts(ticket.id),
+    })
+    db.session.execute(delete(SearchPosting).where(SearchPosting.ticket_id == ticket.id))
+    if weights:
+        db.session.execute(insert(SearchPosting),
+                           [{"term": t, "ticket_id": ticket.id, "weight": w} for t, w in weights.items()])
+    return len(weights)
+
+
+# ============================
+# Consulta
+# ============================
+
+_doc_count: Dict[str, float] = {"n": 0, "at": 0.0}
+_doc_count_lock = Lock()
+
+
+def _total_docs() -> int:
+    """
+    Total de chamados (N do idf) em cache por SEARCH_DOC_COUNT_TTL s: um COUNT
+    por consulta varreria a tabela inteira; o idf quase não muda entre buscas.
+    """
+    ttl = float(current_app.config.get("SEARCH_DOC_COUNT_TTL", 300))
+    now = time.monotonic()
+    with _doc_count_lock:
+        if _doc_count["at"] and now - _doc_count["at"] < ttl:
+            return int(_doc_count["n"])
+    n = db.session.query(func.count(Ticket.id)).scalar() or 0
+    with _doc_count_lock:
+        _doc_count["n"], _doc_count["at"] = n, now
+    return n
+
+
+def _idf(terms: List[str]) -> Dict[str, float]:
+    total = _total_docs()
+    df = dict(db.session.query(SearchPosting.term, func.count())
+              .filter(SearchPosting.term.in_(terms))
+              .group_by(SearchPosting.term))
+    return {t: math.log(1 + (total - df.get(t, 0) + 0.5) / (df.get(t, 0) + 0.5)) for t in terms}
+
+
+def search_tickets(q: str, *, user_id: Optional[int] = None, status: Optional[str] = None,
+                   page: int = 1, per_page: int = 20) -> Tuple[List[Tuple[Ticket, float]], bool]:
+    """
+    Chamados que contêm TODOS os termos de `q`, do mais relevante para o menos.
+    user_id restringe aos chamados do solicitante. Retorna ([(ticket, score)], has_more).
+    """
+    terms = list(dict.fromkeys(tokenize(q)))[: int(current_app.config.get("SEARCH_MAX_TERMS", 8))]
+    if not terms:
+        return [], False
+    idf = _idf(terms)
+    score = func.sum(SearchPosting.weight * case(
+        {t: int(round(idf[t] * 1000)) for t in terms}, value=SearchPosting.term, else_=0))
+
+    q_ids = (db.session.query(SearchPosting.ticket_id, score.label("score"))
+             .filter(SearchPosting.term.in_(terms)))
+    if user_id is not None or status:
+        q_ids = q_ids.join(Ticket, Ticket.id == SearchPosting.ticket_id)
+        if user_id is not None:
+            q_ids = q_ids.filter(Ticket.user_id == user_id)
+        if status:
+            q_ids = q_ids.filter(Ticket.status == status)
+    rows = (q_ids.group_by(SearchPosting.ticket_id)
+            .having(func.count() == len(terms))
+            .order_by(score.desc(), SearchPosting.ticket_id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
+            .all())
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    by_id = {t.id: t for t in Ticket.query.filter(Ticket.id.in_([r[0] for r in rows]))}
+    return [(by_id[tid], float(s) / 1e6) for tid, s in rows if tid in by_id], has_more
+
+
+# ============================
+# CLI
+# ============================
+
+search_cli = AppGroup("search", help="Índice de busca dos chamados.")
+
+
+@search_cli.command("reindex")
+@click.option("--batch", default=500, show_default=True, help="Chamados por commit.")
+def reindex_command(batch: int):
+    """Reconstrói o índice de busca de todos os chamados."""
+    done = 0
+    last_id = 0
+    while True:
+        tickets = (Ticket.query.filter(Ticket.id > last_id)
+                   .order_by(Ticket.id.asc()).limit(batch).all())
+        if not tickets:
+            break
+        for t in tickets:
+            index_ticket(t)
+        last_id = tickets[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+        done += len(tickets)
+        click.echo(f"search: {done} chamado(s) indexado(s)")
+    click.echo("search: índice atualizado")
@@ -0,0 +1,155 @@
+# services/similar.py
+"""
+Sugestão de chamados parecidos (possíveis duplicados) enquanto o usuário digita.
+
+Índice TF-IDF em memória (por processo) só com chamados NÃO finalizados:
+título (peso 2) + descrição, com a mesma tokenização da busca (services/search).
+
+- montado sob demanda na primeira consulta; reconstruído a cada SIMILAR_INDEX_TTL s
+- incremental: note_ticket() após criar/mudar status, forget_ticket() ao excluir;
+  chamados criados por outros processos entram pelo delta 'id > último id visto'
+- o status dos candidatos é reconferido no banco antes de responder
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from extensions import db
+from models import Ticket
+from services.search import tokenize
+
+_TITLE_WEIGHT = 2
+
+
+class _SimilarIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.postings: Dict[str, Dict[int, int]] = {}  # termo -> {ticket_id: tf}
+        self.docs: Dict[int, Tuple[Optional[int], Counter]] = {}  # ticket_id -> (user_id, tf)
+        self.norms: Dict[int, float] = {}  # |tf*idf| do chamado (idf do momento da inclusão)
+        self.last_id = 0
+        self.built_at = 0.0
+
+    # --- mutação (chamar com lock) ---
+    def _idf(self, term: str) -> float:
+        return math.log(1 + (len(self.docs) or 1) / max(1, len(self.postings.get(term, ()))))
+
+    def _norm(self, tf: Counter) -> float:
+        return math.sqrt(sum((f * self._idf(t)) ** 2 for t, f in tf.items())) or 1.0
+
+    def _add(self, tid: int, user_id: Optional[int], title: str, description: str,
+             *, with_norm: bool = True) -> None:
+        self._remove(tid)
+        tf: Counter = Counter()
+        for t in tokenize(title or ""):
+            tf[t] += _TITLE_WEIGHT
+        for t in tokenize(description or ""):
+            tf[t] += 1
+        if not tf:
+            return
+        self.docs[tid] = (user_id, tf)
+        for t, f in tf.items():
+            self.postings.setdefault(t, {})[tid] = f
+        if with_norm:
+            self.norms[tid] = self._norm(tf)
+        self.last_id = max(self.last_id, tid)
+
+    def _remove(self, tid: int) -> None:
+        doc = self.docs.pop(tid, None)
+        self.norms.pop(tid, None)
+        if not doc:
+            return
+        for t in doc[1]:
+            plist = self.postings.get(t)
+            if plist is not None:
+                plist.pop(tid, None)
+                if not plist:
+                    del self.postings[t]
+
+    def _load(self, since_id: int = 0) -> None:
+        rows = (db.session.query(Ticket.id, Ticket.user_id, Ticket.title, Ticket.description)
+                .filter(Ticket.status != "closed", Ticket.id > since_id)
+                .order_by(Ticket.id.asc()))
+        full = since_id == 0
+        for tid, uid, title, desc in rows.yield_per(1000):
+            self._add(tid, uid, title, desc, with_norm=not full)
+        if full:
+            # carga completa: normas só depois de conhecer todos os df
+            self.norms = {tid: self._norm(doc[1]) for tid, doc in self.docs.items()}
+        # mesmo sem chamados novos abertos, avança o cursor para não reler
+        max_id = db.session.query(db.func.max(Ticket.id)).scalar() or 0
+        self.last_id = max(self.last_id, max_id)
+
+    def sync(self) -> None:
+        ttl = int(current_app.config.get("SIMILAR_INDEX_TTL", 300))
+        with self.lock:
+            if not self.built_at or time.time() - self.built_at > ttl:
+                self.postings.clear()
+                self.docs.clear()
+                self.norms.clear()
+                self.last_id = 0
+                self._load()
+                self.built_at = time.time()
+            else:
+                self._load(self.last_id)
+
+    # --- consulta ---
+    def query(self, text: str, user_id: Optional[int], limit: int) -> List[Tuple[int, float]]:
+        q = Counter(tokenize(text))
+        if not q:
+            return []
+        with self.lock:
+            idf = {t: self._idf(t) for t in q if t in self.postings}
+            if not idf:
+                return []
+            scores: Dict[int, float] = {}
+            for t, w in idf.items():
+                for tid, f in self.postings[t].items():
+                    if user_id is not None and self.docs[tid][0] != user_id:
+                        continue
+                    scores[tid] = scores.get(tid, 0.0) + q[t] * f * w * w
+            q_norm = math.sqrt(sum((q[t] * w) ** 2 for t, w in idf.items())) or 1.0
+            out = [(tid, s / (q_norm * self.norms.get(tid, 1.0))) for tid, s in scores.items()]
+        out.sort(key=lambda x: (-x[1], -x[0]))
+        return out[:limit]
+
+
+_index = _SimilarIndex()
+
+
+def note_ticket(ticket: Ticket) -> None:
+    """Atualiza o índice após commit (entra se não finalizado, sai se finalizado)."""
+    with _index.lock:
+        if not _index.built_at:
+            return  # ainda não montado: a primeira consulta carrega tudo
+        if (ticket.status or "") == "closed":
+            _index._remove(ticket.id)
+        else:
+            _index._add(ticket.id, ticket.user_id, ticket.title, ticket.description)
+
+
+def forget_ticket(ticket_id: int) -> None:
+    with _index.lock:
+        _index._remove(ticket_id)
+
+
+def similar_tickets(text: str, *, user_id: Optional[int] = None,
+                    limit: int = 5) -> List[Tuple[Ticket, float]]:
+    """
+    Chamados abertos mais parecidos com `text` (similaridade do cosseno TF-IDF).
+    user_id restringe aos chamados do solicitante.
+    """
+    _index.sync()
+    min_score = float(current_app.config.get("SIMILAR_MIN_SCORE", 0.2))
+    hits = [(tid, s) for tid, s in _index.query(text, user_id, limit * 2) if s >= min_score]
+    if not hits:
+        return []
+    by_id = {t.id: t for t in Ticket.query.filter(Ticket.id.in_([tid for tid, _ in hits]),
+                                                  Ticket.status != "closed")}
+    return [(by_id[tid], s) for tid, s in hits if tid in by_id][:limit]
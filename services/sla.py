@@ -0,0 +1,292 @@
+# services/sla.py
+"""
+SLA dos chamados: prazos pré-calculados (tabela ticket_sla) + varredura de estouros.
+
+- prazos: 1ª resposta (SLA_RESPONSE_HOURS) e solução (SLA_TARGETS_HOURS) por
+  prioridade, gravados na abertura e recalculados quando a prioridade muda
+- carimbos: 1ª resposta da equipe (reply) e finalização (status 'closed');
+  também em tickets.first_response_at / tickets.resolved_at
+- varredura: consulta por faixa nos índices de prazo, marca *_breached_at e
+  avisa atendente + SLA_ALERT_EMAILS
+- horas contadas em expediente (services/business_hours) se SLA_BUSINESS_HOURS
+
+    flask --app app:app sla scan            # uma passada (cron)
+    flask --app app:app sla scan --loop     # contínuo
+    flask --app app:app sla recompute       # recalcula prazos de todos os chamados
+    flask --app app:app sla holiday 2026-12-25 "Natal"   # cadastra feriado
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, func
+
+from extensions import db
+from models import Ticket
+from services.business_hours import BusinessHoliday, add_business_hours, calendar, invalidate
+from services.recipients import ticket_recipients
+
+STAFF_ROLES = ("agent", "gestor", "admin")
+
+
+class TicketSLA(db.Model):
+    __tablename__ = "ticket_sla"
+    __table_args__ = (
+        db.Index("ix_ticket_sla_response_pending", "responded_at", "response_breached_at", "response_due_at"),
+        db.Index("ix_ticket_sla_resolve_pending", "resolved_at", "resolve_breached_at", "resolve_due_at"),
+    )
+
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    priority = db.Column(db.String(20), nullable=False)
+    response_due_at = db.Column(db.DateTime, nullable=False)
+    resolve_due_at = db.Column(db.DateTime, nullable=False)
+    responded_at = db.Column(db.DateTime, nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    response_breached_at = db.Column(db.DateTime, nullable=True)
+    resolve_breached_at = db.Column(db.DateTime, nullable=True)
+
+    def as_dict(self) -> Dict:
+        iso = lambda d: d.isoformat() if d else None  # noqa: E731
+        return {
+            "ticket_id": self.ticket_id,
+            "priority": self.priority,
+            "response_due_at": iso(self.response_due_at),
+            "resolve_due_at": iso(self.resolve_due_at),
+            "responded_at": iso(self.responded_at),
+            "resolved_at": iso(self.resolved_at),
+            "response_breached": self.response_breached_at is not None,
+            "resolve_breached": self.resolve_breached_at is not None,
+        }
+
+
+# ============================
+# Prazos
+# ============================
+
+def _hours(key: str, priority: str, default: int) -> float:
+    targets = current_app.config.get(key) or {}
+    return float(targets.get((priority or "medium").lower(), targets.get("medium", default)))
+
+
+def due_after(start: datetime, hours: float) -> datetime:
+    """Prazo a partir de `start`: horas úteis (padrão) ou corridas."""
+    if current_app.config.get("SLA_BUSINESS_HOURS", True):
+        return add_business_hours(start, hours)
+    return start + timedelta(hours=hours)
+
+
+def apply_sla(ticket: Ticket) -> TicketSLA:
+    """Grava/recalcula os prazos do chamado (pendente de commit)."""
+    if ticket.id is None:
+        db.session.flush()
+    start = getattr(ticket, "created_at", None) or datetime.utcnow()
+    priority = (ticket.priority or "medium").lower()
+    sla = db.session.get(TicketSLA, ticket.id)
+    if sla is None:
+        sla = TicketSLA(ticket_id=ticket.id)
+        db.session.add(sla)
+    sla.priority = priority
+    sla.response_due_at = due_after(start, _hours("SLA_RESPONSE_HOURS", priority, 4))
+    sla.resolve_due_at = due_after(start, _hours("SLA_TARGETS_HOURS", priority, 48))
+    # novo prazo: estouro volta a ser avaliado pela varredura
+    if sla.responded_at is None:
+        sla.response_breached_at = None
+    if sla.resolved_at is None:
+        sla.resolve_breached_at = None
+    return sla
+
+
+def _sla_for(ticket: Ticket) -> TicketSLA:
+    return db.session.get(TicketSLA, ticket.id) or apply_sla(ticket)
+
+
+def mark_first_response(ticket: Ticket, author) -> None:
+    """Carimba a 1ª resposta se o autor for da equipe e não for o solicitante."""
+    role = (getattr(author, "role", "") or "").lower()
+    if role not in STAFF_ROLES or author.id == ticket.user_id:
+        return
+    now = datetime.utcnow()
+    if hasattr(ticket, "first_response_at") and ticket.first_response_at is None:
+        ticket.first_response_at = now
+    sla = _sla_for(ticket)
+    if sla.responded_at is None:
+        sla.responded_at = now
+
+
+def mark_status(ticket: Ticket) -> None:
+    """Finalização carimba resolved_at; reabertura limpa (o prazo volta a contar)."""
+    sla = _sla_for(ticket)
+    if (ticket.status or "") == "closed":
+        now = datetime.utcnow()
+        if hasattr(ticket, "resolved_at"):
+            ticket.resolved_at = now
+        sla.resolved_at = sla.resolved_at or now
+    else:
+        if hasattr(ticket, "resolved_at"):
+            ticket.resolved_at = None
+        sla.resolved_at = None
+
+
+def summary() -> Dict[str, int]:
+    """Contagens para os relatórios (lidas direto dos prazos gravados)."""
+    now = datetime.utcnow()
+    q = db.session.query(
+        func.count(TicketSLA.ticket_id),
+        func.sum(case((TicketSLA.resolved_at.is_(None) & (TicketSLA.resolve_due_at < now), 1), else_=0)),
+        func.sum(case((TicketSLA.responded_at.is_(None) & (TicketSLA.response_due_at < now), 1), else_=0)),
+        func.sum(case((TicketSLA.resolved_at.isnot(None) & (TicketSLA.resolved_at <= TicketSLA.resolve_due_at), 1), else_=0)),
+        func.sum(case((TicketSLA.resolved_at.isnot(None), 1), else_=0)),
+    ).one()
+    total, resolve_late, response_late, on_time, resolved = (int(v or 0) for v in q)
+    out = {
+        "total": total,
+        "open_resolve_breached": resolve_late,
+        "open_response_breached": response_late,
+        "resolved": resolved,
+        "resolved_on_time": on_time,
+        "on_time_pct": round(100.0 * on_time / resolved, 1) if resolved else None,
+    }
+    out.update(business_durations())
+    return out
+
+
+def business_durations(days: int = 30) -> Dict[str, Optional[float]]:
+    """Medianas (em horas de expediente) de 1ª resposta e solução dos resolvidos em `days` dias."""
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = (db.session.query(Ticket.created_at, TicketSLA.responded_at, TicketSLA.resolved_at)
+            .join(Ticket, Ticket.id == TicketSLA.ticket_id)
+            .filter(TicketSLA.resolved_at >= since)
+            .all())
+    cal = calendar()  # O(1) por linha: diferença de acumulados
+    resp = [cal.between(c, r) for c, r, _ in rows if c and r]
+    res = [cal.between(c, f) for c, _, f in rows if c and f]
+    return {
+        "median_response_hours": round(median(resp), 1) if resp else None,
+        "median_resolve_hours": round(median(res), 1) if res else None,
+    }
+
+
+# ============================
+# Varredura de estouros
+# ============================
+
+def scan_breaches(now: Optional[datetime] = None, batch: int = 500) -> List[Tuple[int, str]]:
+    """Marca os prazos vencidos ainda não sinalizados. Retorna [(ticket_id, 'response'|'resolve')]."""
+    now = now or datetime.utcnow()
+    found: List[Tuple[int, str]] = []
+    checks = (
+        ("response", TicketSLA.responded_at, TicketSLA.response_breached_at, TicketSLA.response_due_at),
+        ("resolve", TicketSLA.resolved_at, TicketSLA.resolve_breached_at, TicketSLA.resolve_due_at),
+    )
+    for kind, done_col, flag_col, due_col in checks:
+        rows = (TicketSLA.query
+                .filter(done_col.is_(None), flag_col.is_(None), due_col < now)
+                .order_by(due_col.asc())
+                .limit(batch)
+                .with_for_update(skip_locked=True)
+                .all())
+        for sla in rows:
+            setattr(sla, flag_col.key, now)
+            found.append((sla.ticket_id, kind))
+    db.session.commit()
+    return found
+
+
+def _alert_recipients(ticket: Ticket) -> List[str]:
+    return ticket_recipients(ticket.id, reporter=False,
+                             extra=current_app.config.get("SLA_ALERT_EMAILS") or [])
+
+
+def notify_breaches(found: List[Tuple[int, str]]) -> int:
+    """E-mail por chamado estourado (após o commit da varredura)."""
+    from services.notify import send_email
+
+    sent = 0
+    base = (current_app.config.get("MAIL_BASE_URL") or "").rstrip("/")
+    for ticket_id, kind in found:
+        ticket = db.session.get(Ticket, ticket_id)
+        if ticket is None:
+            continue
+        recips = _alert_recipients(ticket)
+        if not recips:
+            continue
+        label = "primeira resposta" if kind == "response" else "solução"
+        subject = f"[Chamados] SLA de {label} estourado — #{ticket.id} {ticket.title or ''}".strip()
+        link = f"{base}/tickets/{ticket.id}"
+        text = f"O chamado #{ticket.id} passou do prazo de {label}.\nAbrir: {link}\n"
+        html = f'<p>O chamado <strong>#{ticket.id}</strong> passou do prazo de {label}.</p><p><a href="{link}">Abrir o chamado</a></p>'
+        send_email(subject, recips, html, text)
+        sent += 1
+    return sent
+
+
+# ============================
+# CLI
+# ============================
+
+sla_cli = AppGroup("sla", help="Prazos de atendimento (SLA).")
+
+
+@sla_cli.command("scan")
+@click.option("--loop", is_flag=True, help="Repete a varredura continuamente.")
+@click.option("--interval", default=60.0, show_default=True, help="Segundos entre varreduras.")
+def scan_command(loop: bool, interval: float):
+    """Sinaliza chamados com prazo de SLA vencido e envia os alertas."""
+    while True:
+        found = scan_breaches()
+        if found:
+            notify_breaches(found)
+            click.echo(f"sla: {len(found)} estouro(s) sinalizado(s)")
+        if not loop:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+@sla_cli.command("recompute")
+@click.option("--batch", default=500, show_default=True, help="Chamados por commit.")
+def recompute_command(batch: int):
+    """Recalcula os prazos de todos os chamados (após mudar metas ou calendário)."""
+    last_id = done = 0
+    while True:
+        tickets = Ticket.query.filter(Ticket.id > last_id).order_by(Ticket.id.asc()).limit(batch).all()
+        if not tickets:
+            break
+        for t in tickets:
+            sla = apply_sla(t)
+            if getattr(t, "first_response_at", None):
+                sla.responded_at = t.first_response_at
+            if (t.status or "") == "closed":
+                sla.resolved_at = getattr(t, "resolved_at", None) or sla.resolved_at or getattr(t, "updated_at", None) or datetime.utcnow()
+        last_id = tickets[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+        done += len(tickets)
+    click.echo(f"sla: prazos recalculados para {done} chamado(s)")
+
+
+@sla_cli.command("holiday")
+@click.argument("day")
+@click.argument("name", required=False)
+@click.option("--remove", is_flag=True, help="Remove o feriado.")
+def holiday_command(day: str, name: Optional[str], remove: bool):
+    """Cadastra (ou remove) um feriado no calendário de expediente (AAAA-MM-DD)."""
+    d = date.fromisoformat(day)
+    row = db.session.get(BusinessHoliday, d)
+    if remove:
+        if row is not None:
+            db.session.delete(row)
+    elif row is None:
+        db.session.add(BusinessHoliday(day=d, name=name))
+    else:
+        row.name = name or row.name
+    db.session.commit()
+    invalidate()
+    click.echo(f"sla: feriado {d.isoformat()} {'removido' if remove else 'salvo'} "
+               "(rode 'sla recompute' para ajustar prazos já gravados)")
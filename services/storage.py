@@ -0,0 +1,579 @@
+# services/storage.py
+"""
+Armazenamento de anexos endereçado por conteúdo (SHA-256), com deduplicação.
+
+- arquivo físico: UPLOADS_DIR/blobs/ab/cd/<sha256>   (sem extensão)
+- Attachment.stored_name = "<sha256><ext>"  (nomes antigos "<timestamp>_<hex>.<ext>"
+  continuam em UPLOADS_DIR/tickets/<ticket_id>/ e são resolvidos normalmente)
+- tabela attachment_blobs guarda o contador de referências; o arquivo só sai
+  do disco quando o contador chega a zero.
+- upload em partes (upload_sessions): cada PUT anexa direto em blobs/tmp/<id>.part
+  e o finalize só renomeia para o caminho do blob (sem segunda cópia).
+
+    flask --app app:app uploads dedupe     # migra os arquivos antigos para o blob store
+    flask --app app:app uploads gc         # reconcilia disco x tabela attachments
+
+Exclusões: a requisição só altera o banco (release()); depois do commit,
+schedule_cleanup() entrega a remoção dos arquivos a uma thread em segundo plano.
+Se o processo cair antes, o `uploads gc` recolhe o que sobrou.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+
+_BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]{1,10})?$")
+_CHUNK = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Upload excedeu o limite configurado (o arquivo parcial já foi removido)."""
+
+
+class UploadChunkError(Exception):
+    """Parte fora de ordem/tamanho inválido num upload em partes."""
+
+
+class AttachmentBlob(db.Model):
+    __tablename__ = "attachment_blobs"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class UploadSession(db.Model):
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)
+    ticket_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def as_dict(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "total_size": int(self.total_size),
+            "received": int(self.received or 0),
+            "complete": int(self.received or 0) >= int(self.total_size),
+        }
+
+
+# ============================
+# Caminhos
+# ============================
+
+def uploads_base() -> Path:
+    return Path(current_app.config.get("UPLOADS_DIR", "uploads"))
+
+
+def blob_sha(stored_name: Optional[str]) -> Optional[str]:
+    """SHA-256 do blob se stored_name estiver no formato do blob store; senão None."""
+    m = _BLOB_NAME_RE.match(stored_name or "")
+    return m.group(1) if m else None
+
+
+def blob_path(sha: str) -> Path:
+    return uploads_base() / "blobs" / sha[:2] / sha[2:4] / sha
+
+
+def attachment_path(ticket_id: int, stored_name: str) -> Path:
+    """Caminho físico de um anexo (blob ou legado)."""
+    sha = blob_sha(stored_name)
+    if sha:
+        return blob_path(sha)
+    return uploads_base() / "tickets" / str(ticket_id) / stored_name
+
+
+def resolve_upload(relpath: str) -> Optional[Path]:
+    """
+    Converte 'tickets/<id>/<stored_name>' (formato usado nas URLs /uploads/...)
+    no caminho físico. Outros caminhos retornam None (servidos como estão).
+    """
+    parts = Path(relpath).parts
+    if len(parts) == 3 and parts[0] == "tickets" and blob_sha(parts[2]):
+        return blob_path(blob_sha(parts[2]))
+    return None
+
+
+# ============================
+# Gravação (hash durante o streaming)
+# ============================
+
+def _stream_to_tmp(src, max_bytes: int) -> Tuple[Path, str, int]:
+    tmp_dir = uploads_base() / "blobs" / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_dir / f"{secrets.token_hex(8)}.part"
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as out:
+            for chunk in iter(lambda: src.read(_CHUNK), b""):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge()
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, h.hexdigest(), size
+
+
+def _commit_tmp(tmp: Path, sha: str) -> None:
+    """Move o temporário para o blob. Chamar DEPOIS de add_ref(): com a linha do
+    blob travada, um purge() concorrente não apaga o arquivo reaproveitado."""
+    dst = blob_path(sha)
+    if dst.exists():
+        tmp.unlink(missing_ok=True)
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp, dst)
+
+
+def add_ref(sha: str, size: int) -> None:
+    """
+    Incrementa o contador do blob (cria a linha na primeira referência).
+    O UPDATE/INSERT trava a linha até o commit: purge() espera e não remove o blob.
+    """
+    res = db.session.execute(
+        update(AttachmentBlob)
+        .where(AttachmentBlob.sha256 == sha)
+        .values(refcount=AttachmentBlob.refcount + 1)
+    )
+    if res.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(AttachmentBlob(sha256=sha, size=size, refcount=1))
+    except IntegrityError:
+        # outro upload criou a linha no meio do caminho
+        db.session.execute(
+            update(AttachmentBlob)
+            .where(AttachmentBlob.sha256 == sha)
+            .values(refcount=AttachmentBlob.refcount + 1)
+        )
+
+
+def store_stream(src, ext: str, *, max_bytes: int = 0) -> Tuple[str, int, str]:
+    """
+    Grava o stream no blob store calculando o SHA-256 na mesma passada.
+    Retorna (stored_name, size, sha256). Contador incrementado (pendente de commit).
+    """
+    tmp, sha, size = _stream_to_tmp(src, max_bytes)
+    add_ref(sha, size)
+    _commit_tmp(tmp, sha)
+    return f"{sha}{ext}", size, sha
+
+
+def store_upload(file_storage, ext: str, *, max_bytes: int = 0) -> Tuple[str, int, str]:
+    """Versão para werkzeug.FileStorage."""
+    return store_stream(file_storage.stream, ext, max_bytes=max_bytes)
+
+
+# ============================
+# Upload em partes
+# ============================
+
+# hash incremental por sessão (neste processo). Se a próxima parte cair em outro
+# worker, o finalize recalcula lendo o arquivo uma vez.
+_hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+_hashers_lock = Lock()
+
+
+def chunk_path(upload_id: str) -> Path:
+    return uploads_base() / "blobs" / "tmp" / f"{upload_id}.part"
+
+
+def new_upload_session(ticket_id: int, user_id: int, filename: str,
+                       content_type: Optional[str], total_size: int) -> UploadSession:
+    """Cria a sessão e o arquivo parcial vazio (pendente de commit)."""
+    sess = UploadSession(id=secrets.token_hex(16), ticket_id=ticket_id, user_id=user_id,
+                         filename=filename, content_type=content_type,
+                         total_size=total_size, received=0)
+    path = chunk_path(sess.id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    db.session.add(sess)
+    return sess
+
+
+def append_chunk(sess: UploadSession, src, offset: int) -> int:
+    """
+    Anexa o corpo da requisição ao arquivo parcial, em blocos de 1 MB.
+    `offset` precisa ser igual ao que já foi recebido (retomada após falha).
+    Retorna o novo total recebido (pendente de commit).
+    """
+    received = int(sess.received or 0)
+    if offset != received:
+        raise UploadChunkError(f"offset esperado {received}")
+    path = chunk_path(sess.id)
+    with _hashers_lock:
+        state = _hashers.get(sess.id)
+    h = state[1] if (state and state[0] == received) else None
+    if h is None and received == 0:
+        h = hashlib.sha256()
+
+    written = 0
+    with path.open("r+b") as out:
+        out.seek(received)
+        out.truncate()  # descarta restos de uma parte interrompida
+        for chunk in iter(lambda: src.read(_CHUNK), b""):
+            written += len(chunk)
+            if received + written > int(sess.total_size):
+                out.truncate(received)
+                raise UploadChunkError("parte excede o tamanho declarado")
+            out.write(chunk)
+            if h is not None:
+                h.update(chunk)
+
+    sess.received = received + written
+    sess.updated_at = datetime.utcnow()
+    with _hashers_lock:
+        if h is not None:
+            _hashers[sess.id] = (int(sess.received), h)
+        else:
+            _hashers.pop(sess.id, None)
+    return int(sess.received)
+
+
+def finalize_upload(sess: UploadSession, ext: str) -> Tuple[str, int, str]:
+    """
+    Move o arquivo completo para o blob store e incrementa a referência.
+    Retorna (stored_name, size, sha256). A sessão é removida (pendente de commit).
+    """
+    size = int(sess.received or 0)
+    if size != int(sess.total_size):
+        raise UploadChunkError(f"upload incompleto ({size}/{int(sess.total_size)} bytes)")
+    path = chunk_path(sess.id)
+    with _hashers_lock:
+        state = _hashers.pop(sess.id, None)
+    if state and state[0] == size:
+        sha = state[1].hexdigest()
+    else:
+        h = hashlib.sha256()
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(_CHUNK), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+    add_ref(sha, size)
+    _commit_tmp(path, sha)
+    db.session.delete(sess)
+    return f"{sha}{ext}", size, sha
+
+
+def abort_upload(sess: UploadSession) -> None:
+    with _hashers_lock:
+        _hashers.pop(sess.id, None)
+    chunk_path(sess.id).unlink(missing_ok=True)
+    db.session.delete(sess)
+
+
+# ============================
+# Liberação
+# ============================
+
+def release(stored_name: Optional[str]) -> Optional[str]:
+    """
+    Decrementa o contador do blob (pendente de commit). Retorna o sha para
+    ser passado a purge() DEPOIS do commit; None para anexos legados.
+    """
+    sha = blob_sha(stored_name)
+    if not sha:
+        return None
+    db.session.execute(
+        update(AttachmentBlob)
+        .where(AttachmentBlob.sha256 == sha, AttachmentBlob.refcount > 0)
+        .values(refcount=AttachmentBlob.refcount - 1)
+    )
+    return sha
+
+
+def purge(shas: Iterable[Optional[str]]) -> int:
+    """Remove do disco (e da tabela) os blobs sem referência. Chamar após o commit."""
+    removed = 0
+    for sha in {s for s in shas if s}:
+        # DELETE condicional: se outro upload reutilizou o blob, a linha fica.
+        # O arquivo sai ainda DENTRO da transação (linha travada pelo DELETE):
+        # um add_ref() concorrente espera o commit e então recria blob e linha.
+        res = db.session.execute(
+            delete(AttachmentBlob)
+            .where(AttachmentBlob.sha256 == sha, AttachmentBlob.refcount <= 0)
+        )
+        if not res.rowcount:
+            db.session.commit()
+            continue
+        try:
+            blob_path(sha).unlink(missing_ok=True)
+        except Exception:
+            db.session.rollback()  # mantém a linha; o `uploads gc` tenta de novo
+            current_app.logger.warning("BLOB_UNLINK_FAIL %s", sha)
+            continue
+        db.session.commit()
+        removed += 1
+    return removed
+
+
+# ============================
+# Limpeza em segundo plano
+# ============================
+
+_cleanup_pool: Optional[ThreadPoolExecutor] = None
+_cleanup_lock = Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _cleanup_pool
+    with _cleanup_lock:
+        if _cleanup_pool is None:
+            _cleanup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uploads-gc")
+        return _cleanup_pool
+
+
+def _remove_paths(paths: Iterable[Path]) -> None:
+    for p in paths:
+        try:
+            if p.is_dir():
+                for child in p.iterdir():
+                    child.unlink(missing_ok=True)
+                p.rmdir()
+            else:
+                p.unlink(missing_ok=True)
+        except Exception:
+            current_app.logger.warning("UPLOAD_UNLINK_FAIL %s", p)
+
+
+def _run_cleanup(app, shas: List[str], paths: List[Path]) -> None:
+    with app.app_context():
+        try:
+            purge(shas)
+            _remove_paths(paths)
+        except Exception:
+            app.logger.exception("UPLOAD_CLEANUP_FAIL")
+        finally:
+            db.session.remove()
+
+
+def schedule_cleanup(shas: Iterable[Optional[str]] = (), paths: Iterable[Path] = ()) -> None:
+    """
+    Remove blobs liberados e arquivos legados fora da requisição.
+    Chamar SOMENTE depois do commit: se a transação falhar nada é apagado.
+    """
+    shas = [s for s in shas if s]
+    paths = list(paths)
+    if not shas and not paths:
+        return
+    app = current_app._get_current_object()
+    if app.config.get("UPLOADS_CLEANUP_INLINE"):
+        _run_cleanup(app, shas, paths)  # testes / scripts
+        return
+    _pool().submit(_run_cleanup, app, shas, paths)
+
+
+# ============================
+# CLI
+# ============================
+
+uploads_cli = AppGroup("uploads", help="Manutenção dos arquivos de anexos.")
+
+
+@uploads_cli.command("dedupe")
+@click.option("--dry-run", is_flag=True, help="Só mostra o que seria feito.")
+def dedupe_command(dry_run: bool):
+    """Move anexos antigos (tickets/<id>/...) para o blob store deduplicado."""
+    from models import Attachment
+
+    moved = dup = missing = saved = 0
+    rows = Attachment.query.order_by(Attachment.id.asc()).all()
+    for att in rows:
+        if blob_sha(att.stored_name):
+            continue
+        src = uploads_base() / "tickets" / str(att.ticket_id) / att.stored_name
+        if not src.exists():
+            missing += 1
+            continue
+        ext = os.path.splitext(att.stored_name)[1].lower()
+        h = hashlib.sha256()
+        with src.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(_CHUNK), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+        size = src.stat().st_size
+        if dry_run:
+            already = blob_path(sha).exists()
+            click.echo(f"#{att.id} {att.stored_name} -> {sha}{' (duplicado)' if already else ''}")
+            continue
+        already = True
+        try:
+            add_ref(sha, size)  # trava a linha antes de decidir reaproveitar o blob
+            already = blob_path(sha).exists()
+            if not already:
+                blob_path(sha).parent.mkdir(parents=True, exist_ok=True)
+                os.replace(src, blob_path(sha))
+            att.stored_name = f"{sha}{ext}"
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if not already and not src.exists():
+                os.replace(blob_path(sha), src)
+            click.echo(f"#{att.id}: falha ({e})", err=True)
+            continue
+        if already:
+            src.unlink(missing_ok=True)
+            dup += 1
+            saved += size
+        moved += 1
+    click.echo(f"migrados: {moved} · duplicados: {dup} ({saved // 1024} KB liberados) · ausentes: {missing}")
+
+
+def _old_files(folder: Path, cutoff: float) -> Iterable[Path]:
+    """Arquivos de `folder` modificados antes de `cutoff` (uploads em andamento ficam de fora)."""
+    if not folder.is_dir():
+        return
+    for p in folder.iterdir():
+        try:
+            if p.is_file() and p.stat().st_mtime < cutoff:
+                yield p
+        except OSError:
+            continue
+
+
+@uploads_cli.command("gc")
+@click.option("--dry-run", is_flag=True, help="Só mostra o que seria feito.")
+@click.option("--min-age", default=60, show_default=True, help="Ignora arquivos mais novos que N minutos.")
+@click.option("--delete-missing-rows", is_flag=True,
+              help="Apaga as linhas de attachments cujo arquivo sumiu (padrão: só lista).")
+def gc_command(dry_run: bool, min_age: int, delete_missing_rows: bool):
+    """Reconcilia uploads/ com a tabela attachments e remove órfãos nos dois sentidos."""
+    from models import Attachment
+    from services.thumbs import thumbs_base
+
+    cutoff = time.time() - min_age * 60
+    base = uploads_base()
+    # UPLOADS_DIR relativo ao cwd ou volume não montado: tudo pareceria "sem arquivo"
+    if not base.is_dir() or not any(p.is_file() for p in base.rglob("*")):
+        raise click.ClickException(f"{base.resolve()} não existe ou está vazio; confira UPLOADS_DIR e o volume")
+
+    def drop(p: Path, why: str) -> None:
+        click.echo(f"{'[dry-run] ' if dry_run else ''}remove {p.relative_to(base)} ({why})")
+        if not dry_run:
+            p.unlink(missing_ok=True)
+
+    # 1) banco -> disco: anexos cujo arquivo sumiu
+    refs: Set[str] = set()
+    legacy: Dict[str, Set[str]] = {}
+    missing: List[Tuple[int, str]] = []
+    rows = db.session.query(Attachment.id, Attachment.ticket_id, Attachment.stored_name)
+    for att_id, ticket_id, name in rows.yield_per(1000):
+        if not attachment_path(ticket_id, name).exists():
+            missing.append((att_id, name))
+            continue
+        sha = blob_sha(name)
+        if sha:
+            refs.add(sha)
+        else:
+            legacy.setdefault(str(ticket_id), set()).add(name)
+
+    released: List[Optional[str]] = []
+    remove_rows = delete_missing_rows and not dry_run
+    for att_id, name in missing:
+        click.echo(f"{'' if remove_rows else '[só listado] '}anexo #{att_id} sem arquivo ({name})")
+        if remove_rows:
+            released.append(release(name))
+            db.session.execute(delete(Attachment).where(Attachment.id == att_id))
+    if remove_rows:
+        db.session.commit()
+    elif missing:
+        click.echo(f"{len(missing)} anexo(s) sem arquivo mantidos; use --delete-missing-rows para apagá-los")
+
+    # 2) blobs sem referência (contador zerado)
+    zero = [sha for (sha,) in db.session.query(AttachmentBlob.sha256).filter(AttachmentBlob.refcount <= 0)]
+    purged = 0 if dry_run else purge(released + zero)
+    known = {sha for (sha,) in db.session.query(AttachmentBlob.sha256)}
+
+    # 3) disco -> banco: blobs sem linha em attachment_blobs
+    orphans = 0
+    blobs = base / "blobs"
+    if blobs.is_dir():
+        for d1 in blobs.iterdir():
+            if d1.name == "tmp" or not d1.is_dir():
+                continue
+            for d2 in d1.iterdir():
+                for p in _old_files(d2, cutoff):
+                    if p.name not in known and p.name not in refs:
+                        drop(p, "blob sem referência")
+                        orphans += 1
+
+    # 4) arquivos legados sem linha em attachments
+    tickets_dir = base / "tickets"
+    if tickets_dir.is_dir():
+        for folder in tickets_dir.iterdir():
+            keep = legacy.get(folder.name, set())
+            for p in _old_files(folder, cutoff):
+                if p.name not in keep:
+                    drop(p, "sem anexo")
+                    orphans += 1
+            if not dry_run:
+                try:
+                    folder.rmdir()  # só sai se ficou vazia
+                except OSError:
+                    pass
+
+    # 5) uploads em partes abandonados
+    ttl = int(current_app.config.get("UPLOAD_SESSION_TTL_HOURS", 24))
+    stale = UploadSession.query.filter(
+        UploadSession.updated_at < datetime.utcnow() - timedelta(hours=ttl)).all()
+    for sess in stale:
+        click.echo(f"{'[dry-run] ' if dry_run else ''}upload abandonado {sess.id} ({sess.filename})")
+        if not dry_run:
+            abort_upload(sess)
+    if not dry_run:
+        db.session.commit()
+    live = {sid for (sid,) in db.session.query(UploadSession.id)}
+    for p in _old_files(blobs / "tmp", cutoff):
+        if p.stem not in live:
+            drop(p, "parcial sem sessão")
+            orphans += 1
+
+    # 6) miniaturas cujo original não existe mais
+    for kind in ("blobs", "tickets"):
+        root = thumbs_base() / kind
+        if not root.is_dir():
+            continue
+        for folder in root.iterdir():
+            if not folder.is_dir():
+                continue
+            if kind == "blobs":
+                valid = refs | known
+            else:
+                valid = {Path(n).stem for n in legacy.get(folder.name, ())}
+            for p in _old_files(folder, cutoff):
+                if p.stem.rsplit("_", 1)[0] not in valid:
+                    drop(p, "miniatura órfã")
+                    orphans += 1
+
+    click.echo(f"anexos sem arquivo: {len(missing)} · blobs liberados: {purged} · "
+               f"órfãos no disco: {orphans} · uploads abandonados: {len(stale)}")
@@ -0,0 +1,152 @@
+# services/thumbs.py
+"""
+Miniaturas de anexos de imagem (JPEG), com cache em disco e cota LRU.
+
+- variantes: THUMBNAIL_SIZES (lado máximo em px); geradas sob demanda na primeira
+  requisição ou antecipadamente pelo `flask worker` (THUMBNAIL_EAGER_SIZES)
+- local: UPLOADS_DIR/thumbs/blobs/<sha[:2]>/<sha>_<size>.jpg para blobs (uma
+  miniatura por conteúdo) e UPLOADS_DIR/thumbs/tickets/<ticket_id>/<stem>_<size>.jpg
+  para legados
+- LRU: o mtime é "tocado" ao servir; ao passar de THUMBNAIL_CACHE_MB os mais
+  antigos são removidos (varredura limitada a uma a cada THUMBNAIL_EVICT_INTERVAL s)
+"""
+from __future__ import annotations
+
+import os
+import secrets
+import time
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional
+
+from flask import current_app
+
+from services.storage import attachment_path, blob_sha, uploads_base
+
+try:
+    from PIL import Image  # Pillow (opcional)
+except Exception:
+    Image = None
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+_TOUCH_EVERY = 3600  # s: evita um utime() a cada visualização
+_evict_lock = Lock()
+_last_evict = 0.0
+
+
+def sizes() -> List[int]:
+    return [int(s) for s in current_app.config.get("THUMBNAIL_SIZES", (128, 320, 1024))]
+
+
+def pick_size(requested) -> int:
+    """Menor variante configurada >= requested (ou a maior)."""
+    avail = sorted(sizes())
+    try:
+        req = int(requested)
+    except Exception:
+        return avail[0]
+    return next((s for s in avail if s >= req), avail[-1])
+
+
+def is_image(att) -> bool:
+    ctype = (getattr(att, "content_type", None) or "").lower()
+    ext = Path(att.original_name or att.stored_name or "").suffix.lower()
+    return ctype.startswith("image/") or ext in IMAGE_EXTS
+
+
+def thumbs_base() -> Path:
+    return uploads_base() / "thumbs"
+
+
+def thumb_path(att, size: int) -> Path:
+    sha = blob_sha(att.stored_name)
+    if sha:
+        return thumbs_base() / "blobs" / sha[:2] / f"{sha}_{size}.jpg"
+    return thumbs_base() / "tickets" / str(att.ticket_id) / f"{Path(att.stored_name).stem}_{size}.jpg"
+
+
+def _render(src: Path, dst: Path, size: int) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        with Image.open(src) as im:
+            im.draft("RGB", (size, size))  # JPEG: decodifica já reduzido
+            im.thumbnail((size, size))
+            if im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            im.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def ensure_thumbnail(att, size: int) -> Optional[Path]:
+    """Caminho da miniatura, gerando se ainda não existir. None se não for possível."""
+    if Image is None or not is_image(att):
+        return None
+    dst = thumb_path(att, size)
+    if dst.exists():
+        _touch(dst)
+        return dst
+    src = attachment_path(att.ticket_id, att.stored_name)
+    if not src.exists():
+        return None
+    try:
+        _render(src, dst, size)
+    except Exception as e:
+        current_app.logger.warning("THUMB_FAIL att=%s size=%s: %s", getattr(att, "id", None), size, e)
+        return None
+    evict_if_needed()
+    return dst
+
+
+def _touch(path: Path) -> None:
+    try:
+        now = time.time()
+        if now - path.stat().st_mtime > _TOUCH_EVERY:
+            os.utime(path, (now, now))
+    except OSError:
+        pass
+
+
+def evict_if_needed(force: bool = False) -> int:
+    """Remove as miniaturas menos usadas até ficar abaixo de 90% da cota."""
+    global _last_evict
+    cfg = current_app.config
+    quota = int(cfg.get("THUMBNAIL_CACHE_MB", 512)) * 1024 * 1024
+    interval = int(cfg.get("THUMBNAIL_EVICT_INTERVAL", 300))
+    if not _evict_lock.acquire(blocking=False):
+        return 0
+    try:
+        if not force and time.time() - _last_evict < interval:
+            return 0
+        _last_evict = time.time()
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(thumbs_base()):
+            for name in files:
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        if total <= quota:
+            return 0
+        target = int(quota * 0.9)
+        removed = 0
+        for _mtime, fsize, p in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(p)
+                total -= fsize
+                removed += 1
+            except OSError:
+                pass
+        current_app.logger.info("THUMB_EVICT removed=%s", removed)
+        return removed
+    finally:
+        _evict_lock.release()
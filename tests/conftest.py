@@ -0,0 +1,35 @@
+# tests/conftest.py
+"""
+Fixtures comuns: aplicação sem rotas (create_app(web=False)) sobre SQLite em memória.
+
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# antes de importar config: a classe Config lê o ambiente na importação
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("FLASK_ENV", "development")
+
+
+@pytest.fixture()
+def app():
+    pytest.importorskip("models")  # modelos do sistema (User, Ticket, ...)
+    from app import create_app
+    from extensions import db
+
+    app = create_app(web=False)
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
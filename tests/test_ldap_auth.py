@@ -0,0 +1,91 @@
+# tests/test_ldap_auth.py
+"""LdapBackend (services/ldap_auth.py) contra o servidor simulado do ldap3 (MOCK_SYNC), sem banco."""
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+ldap3 = pytest.importorskip("ldap3")
+
+BASE_DN = "ou=people,dc=empresa,dc=local"
+SERVICE_DN = "cn=svc,dc=empresa,dc=local"
+
+
+@pytest.fixture()
+def server():
+    server = ldap3.Server("mock")
+    seed = ldap3.Connection(server, client_strategy=ldap3.MOCK_SYNC)
+    seed.strategy.add_entry(SERVICE_DN, {"userPassword": "svc-pw", "objectClass": "person"})
+    seed.strategy.add_entry(f"uid=joao,{BASE_DN}", {
+        "uid": "joao", "mail": "joao@empresa.local", "cn": "Joao Silva",
+        "userPassword": "segredo", "objectClass": "inetOrgPerson",
+    })
+    return server
+
+
+def _backend(server, **kw):
+    from services.ldap_auth import LdapBackend
+
+    opts = dict(client_strategy=ldap3.MOCK_SYNC, base_dn=BASE_DN, pool_size=2,
+                negative_ttl=30, max_failures=3)
+    opts.update(kw)
+    return LdapBackend(server, **opts)
+
+
+def test_lookup_and_bind(server):
+    b = _backend(server, bind_dn=SERVICE_DN, bind_password="svc-pw")
+    u = b.authenticate("joao", "segredo")
+    assert u is not None and u.dn == f"uid=joao,{BASE_DN}"
+    assert u.email == "joao@empresa.local" and u.name == "Joao Silva"
+    assert b.authenticate("JOAO ", "segredo") is not None, "usuário deve ser normalizado"
+    assert b.authenticate("joao@empresa.local", "segredo") is not None, "busca por e-mail"
+    assert b.authenticate("joao", "errada") is None
+    assert b.authenticate("ninguem", "x") is None
+    assert b.authenticate("joao", "") is None, "senha vazia não pode virar bind anônimo"
+
+
+def test_negative_cache_locks_out(server):
+    b = _backend(server, bind_dn=SERVICE_DN, bind_password="svc-pw", max_failures=2)
+    assert b.authenticate("joao", "errada1") is None
+    assert b.authenticate("joao", "errada2") is None
+    # janela de falhas estourada: recusa até a senha certa, sem ir ao servidor
+    assert b.authenticate("joao", "segredo") is None
+
+
+@pytest.mark.parametrize("suffix", ["empresa.local", "@empresa.local"])
+def test_direct_bind_with_domain_suffix(server, suffix):
+    # modo sem LDAP_BIND_DN: bind com usuario + sufixo (UPN estilo AD). O servidor
+    # simulado só aceita DNs, então aqui conferimos o principal usado no bind.
+    b = _backend(server, domain_suffix=suffix)
+    principals: List[str] = []
+    b._bind_as = lambda who, pw: principals.append(who) or pw == "senha-ad"
+    u = b.authenticate("maria", "senha-ad")
+    assert principals == ["maria@empresa.local"]
+    assert u is not None and u.email == "maria@empresa.local"
+    assert b.authenticate("maria", "errada") is None
+
+
+def test_service_connection_returns_to_pool(server):
+    b = _backend(server, bind_dn=SERVICE_DN, bind_password="svc-pw", pool_size=1)
+    for _ in range(3):
+        b.forget()
+        assert b.authenticate("joao", "segredo") is not None
+    assert b._pool.qsize() == 1, "conexão de serviço deve voltar ao pool"
+
+
+def test_special_characters_are_escaped_in_search_filter(server, monkeypatch):
+    filters: List[str] = []
+    real_search = ldap3.Connection.search
+
+    def search(self, search_base, search_filter, *args, **kwargs):
+        filters.append(search_filter)
+        return real_search(self, search_base, search_filter, *args, **kwargs)
+
+    monkeypatch.setattr(ldap3.Connection, "search", search)
+    b = _backend(server, bind_dn=SERVICE_DN, bind_password="svc-pw")
+    # sem escape, "*" casaria com qualquer uid e o login viraria o do joao
+    assert b.authenticate("*", "segredo") is None
+    assert b.authenticate("joao*)(uid=*", "segredo") is None
+    assert b.authenticate("a\\b", "segredo") is None
+    assert filters == ["(uid=\\2a)", "(uid=joao\\2a\\29\\28uid=\\2a)", "(uid=a\\5cb)"]
@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+"""Medianas por atendente (services/metrics.py) em SQLite: funções de janela e fallback em Python."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+
+@pytest.fixture()
+def seeded(app):
+    """Dois atendentes: 1ª resposta em 1h/3h/8h (mediana 3h) e 2h/6h (mediana 4h)."""
+    from extensions import db
+    from models import Ticket, User
+    from services.assignment import set_assignee
+    from services.sla import TicketSLA
+
+    db.create_all()  # ticket_sla é declarada em services/sla.py, importado só agora
+    requester = User(name="Solicitante", email="user@empresa.local", role="user", is_active=True,
+                     password_hash="-")
+    a = User(name="Ana", email="ana@empresa.local", role="agent", is_active=True, password_hash="-")
+    b = User(name="Bruno", email="bruno@empresa.local", role="agent", is_active=True, password_hash="-")
+    db.session.add_all([requester, a, b])
+    db.session.flush()
+
+    created = datetime.utcnow() - timedelta(days=2)
+    for agent, hours in ((a, (1, 3, 8)), (b, (2, 6))):
+        for h in hours:
+            t = Ticket(title=f"chamado {agent.name} {h}h", description="-", priority="medium",
+                       status="open", user_id=requester.id)
+            t.created_at = created
+            set_assignee(t, agent.id)
+            db.session.add(t)
+            db.session.flush()
+            db.session.add(TicketSLA(ticket_id=t.id, priority="medium",
+                                     response_due_at=created + timedelta(hours=8),
+                                     resolve_due_at=created + timedelta(days=3),
+                                     responded_at=created + timedelta(hours=h)))
+    db.session.commit()
+    return {a.id: 3.0, b.id: 4.0}
+
+
+def _first_response_medians():
+    from services.metrics import _medians
+    from services.sla import TicketSLA
+
+    return _medians(TicketSLA.responded_at, datetime.utcnow() - timedelta(days=30))
+
+
+def test_medians_with_window_functions(seeded):
+    assert _first_response_medians() == seeded
+
+
+def test_medians_fallback_without_window_functions(seeded, monkeypatch):
+    from extensions import db
+
+    real_execute = db.session.execute
+    calls = []
+
+    def execute(stmt, *args, **kwargs):
+        calls.append(stmt)
+        if len(calls) == 1:  # consulta com ROW_NUMBER() OVER: simula MySQL 5.7
+            raise DBAPIError(str(stmt), {}, Exception("window functions not supported"))
+        return real_execute(stmt, *args, **kwargs)
+
+    monkeypatch.setattr(db.session, "execute", execute)
+    assert _first_response_medians() == seeded
+    assert len(calls) == 2, "fallback deve ler as durações numa única consulta"
+
+
+def test_seconds_rejects_unknown_dialect(app, monkeypatch):
+    from extensions import db
+    from models import Ticket
+    from services.metrics import _seconds
+    from services.sla import TicketSLA
+
+    oracle = SimpleNamespace(dialect=SimpleNamespace(name="oracle"))
+    monkeypatch.setattr(db.session, "get_bind", lambda *a, **kw: oracle)
+    with pytest.raises(ValueError, match="oracle"):
+        _seconds(Ticket.created_at, TicketSLA.resolved_at)
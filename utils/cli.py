@@ -0,0 +1,61 @@
+# utils/cli.py
+"""
+Comandos `flask ...` registrados sem importar o módulo que os implementa.
+
+O módulo (services.sla, services.jobs, ...) só é importado quando o comando é
+listado no --help ou executado; `flask db upgrade` e `flask run` não pagam
+pelos demais.
+
+    app.cli.add_command(LazyGroup("sla", "services.sla:sla_cli", help="..."))
+"""
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Optional
+
+import click
+
+
+def _load(target: str):
+    mod, _, attr = target.partition(":")
+    return getattr(import_module(mod), attr)
+
+
+class LazyCommand(click.Command):
+    """Comando simples (ex.: `flask worker`) carregado no primeiro uso."""
+
+    def __init__(self, name: str, target: str, help: Optional[str] = None):
+        super().__init__(name, help=help)
+        self.target = target
+        self._real: Optional[click.Command] = None
+
+    def real(self) -> click.Command:
+        if self._real is None:
+            self._real = _load(self.target)
+        return self._real
+
+    def get_params(self, ctx):
+        return self.real().get_params(ctx)
+
+    def invoke(self, ctx):
+        return self.real().invoke(ctx)
+
+
+class LazyGroup(click.Group):
+    """Grupo de comandos (AppGroup) carregado no primeiro uso."""
+
+    def __init__(self, name: str, target: str, help: Optional[str] = None):
+        super().__init__(name, help=help)
+        self.target = target
+        self._real: Optional[click.Group] = None
+
+    def real(self) -> click.Group:
+        if self._real is None:
+            self._real = _load(self.target)
+        return self._real
+
+    def list_commands(self, ctx):
+        return self.real().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self.real().get_command(ctx, cmd_name)
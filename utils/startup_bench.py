@@ -0,0 +1,76 @@
+# utils/startup_bench.py
+"""
+Mede o boot da aplicação (import + create_app) em processos novos.
+
+    python -m utils.startup_bench                  # web, web=False e só o import, 5 rodadas
+    python -m utils.startup_bench -n 10 --top 15
+
+Cada rodada roda `python -X importtime` num processo limpo; mostra a mediana do
+tempo até a aplicação pronta e os módulos que mais pesam no import.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_SNIPPET = (
+    "import time; t0 = time.perf_counter()\n"
+    "from app import create_app\n"
+    "{call}\n"
+    "print(f'{{(time.perf_counter() - t0) * 1000:.1f}}')\n"
+)
+TARGETS = (("web", "create_app()"), ("web=False", "create_app(web=False)"), ("import", "None"))
+
+
+def _run(call: str) -> Tuple[float, Dict[str, int]]:
+    """(ms até create_app terminar, módulo -> tempo próprio de import em µs)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SNIPPET.format(call=call)],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    mods: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # import time:  self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        mods[name.strip()] = int(self_us)
+    return float(proc.stdout.strip().splitlines()[-1]), mods
+
+
+def bench(runs: int, top: int) -> None:
+    for label, call in TARGETS:
+        times: List[float] = []
+        totals: Dict[str, List[int]] = {}
+        try:
+            for _ in range(runs):
+                ms, mods = _run(call)
+                times.append(ms)
+                for name, us in mods.items():
+                    totals.setdefault(name, []).append(us)
+        except RuntimeError as e:
+            print(f"{label:<10} falhou: {e}")
+            continue
+        print(f"{label:<10} boot {statistics.median(times):8.1f} ms (mediana de {runs}), "
+              f"{len(totals)} módulos importados")
+        heavy = sorted(((statistics.median(v), k) for k, v in totals.items()), reverse=True)[:top]
+        for us, name in heavy:
+            print(f"    {us / 1000:7.1f} ms  {name}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", "--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10, help="Módulos mais lentos a listar.")
+    a = ap.parse_args()
+    bench(a.runs, a.top)
+
+
+if __name__ == "__main__":
+    main()
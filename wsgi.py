@@ -1 +1,3 @@
-from app import app as application
+from app import create_app
+
+application = create_app()